@@ -0,0 +1,81 @@
+# app/api/http_cache.py
+"""
+ETag + GET conditionnel pour les recos stables sur la journée.
+
+L'ETag dépend des ids servis (dans l'ordre), du jour et d'une version des
+données partagée par tous les workers / hôtes: _primary_term/_seq_no ES de
+chaque event servi (bougent à chaque ré-indexation, carte dénormalisée et
+boost compris), plus le built_day du fichier matérialisé le cas échéant.
+Il se calcule avant l'hydratation: un If-None-Match identique => 304 sans
+hydratation ni corps.
+"""
+import hashlib
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from app.core.config import RECO_HTTP_MAX_AGE_S
+from app.core.metrics import incr
+
+
+def reco_etag(kind: str, user_id: int, ids: Sequence[int], version: Any) -> str:
+    raw = f"{kind}:{user_id}:{date.today().isoformat()}:{version}:{','.join(map(str, ids))}"
+    return '"' + hashlib.blake2b(raw.encode(), digest_size=12).hexdigest() + '"'
+
+
+def doc_versions(docs: Optional[Iterable[Dict[str, Any]]]) -> Dict[int, str]:
+    """event_id -> "primary_term.seq_no" (ou _version) des hits / docs mget ES qui les portent."""
+    versions: Dict[int, str] = {}
+    for doc in docs or ():
+        if doc.get("found") is False:
+            continue
+        if "_seq_no" in doc:
+            version = f"{doc.get('_primary_term')}.{doc['_seq_no']}"
+        elif "_version" in doc:
+            version = f"v{doc['_version']}"
+        else:
+            continue
+        try:
+            versions[int(doc.get("_id"))] = version
+        except Exception:
+            continue
+    return versions
+
+
+def data_version(source: str, ids: Sequence[int], versions: Dict[int, str]) -> str:
+    """Version des données servies, dans l'ordre des ids ("-": doc absent de l'index)."""
+    return source + ":" + ",".join(versions.get(i, "-") for i in ids)
+
+
+def cache_control() -> str:
+    # privé (par user); max-age 0 => le client revalide à chaque ouverture (304 si inchangé)
+    if RECO_HTTP_MAX_AGE_S > 0:
+        return f"private, max-age={RECO_HTTP_MAX_AGE_S}"
+    return "private, no-cache"
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparaison faible (RFC 9110 pour If-None-Match): W/"x" correspond à "x"."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def not_modified_or_none(kind: str, if_none_match: Optional[str], etag: Optional[str]) -> Optional[Response]:
+    """Réponse 304 si le client a déjà cette version, sinon None (pas d'ETag => jamais de 304)."""
+    if etag is None or not matches(if_none_match, etag):
+        return None
+    incr(f"http.{kind}.not_modified")
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control()})
+
+
+def json_with_etag(content: Any, etag: Optional[str]) -> JSONResponse:
+    response = JSONResponse(content=content)
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = cache_control()
+    return response
@@ -84,3 +84,21 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     )
 
     return R * (2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)))
+
+
+def ids_boost_clauses(weights: Dict[int, float], precision: int = 2) -> List[Dict[str, Any]]:
+    """
+    Clauses `should` qui ajoutent un score fixe à des ids donnés (id -> poids).
+    Les ids de même poids (arrondi) partagent une clause => peu de clauses même
+    pour quelques centaines d'ids.
+    """
+    by_weight: Dict[float, List[str]] = {}
+    for doc_id, weight in weights.items():
+        w = round(float(weight), precision)
+        if w > 0:
+            by_weight.setdefault(w, []).append(str(doc_id))
+
+    return [
+        {"constant_score": {"filter": {"ids": {"values": ids}}, "boost": w}}
+        for w, ids in sorted(by_weight.items(), reverse=True)
+    ]
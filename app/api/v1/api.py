@@ -1,8 +1,22 @@
+import importlib
+
 from fastapi import APIRouter
-from .endpoints import indexing, recommendations, embedding, events
+from app.core.config import API_ROUTERS
+
+# (module dans .endpoints, prefix, tags) — importés seulement si activés
+ROUTERS = [
+    ("indexing", "/index", ["indexing"]),
+    ("recommendations", "/recommendations", ["recommendations"]),
+    ("recommendations_async", "/recommendations/async", ["recommendations"]),
+    ("recommendations_batch", "/recommendations/batch", ["recommendations"]),
+    ("recommendations_feed", "/recommendations/feed", ["recommendations"]),
+    ("embedding", "/recommendations", ["recommendations"]),
+    ("events", "/events", ["events"]),
+]
 
 api_router = APIRouter()
-api_router.include_router(indexing.router, prefix="/index", tags=["indexing"])
-api_router.include_router(recommendations.router, prefix="/recommendations", tags=["recommendations"])
-api_router.include_router(embedding.router, prefix="/recommendations", tags=["recommendations"])
-api_router.include_router(events.router, prefix="/events", tags=["events"])
+for module_name, prefix, tags in ROUTERS:
+    if API_ROUTERS and module_name not in API_ROUTERS:
+        continue
+    module = importlib.import_module(f".endpoints.{module_name}", __package__)
+    api_router.include_router(module.router, prefix=prefix, tags=tags)
@@ -3,11 +3,10 @@ from typing import Optional, Any, Dict, List, Tuple
 from elasticsearch import ApiError
 
 from app.core.es import es_client
+from app.core.metrics import timed
 from app.embeddings.service import embed_text
 
-# 👉 tu l'as déjà
-from app.core.db import get_conn  # adapte si besoin
-from app.api.v1.sql.fetch_events_with_relations_by_ids import *
+from app.services.event_hydration import event_source_filter, hydrate_events
 
 router = APIRouter()
 
@@ -173,7 +172,7 @@ def _build_es_query(
         "track_total_hits": True,
         "from": from_,
         "size": size,
-        "_source": False,  # on ne veut pas les sources ES, on récupère en DB
+        "_source": event_source_filter(),  # carte ES en mode dénormalisé, sinon DB
         "query": {
             "function_score": {
                 "query": base_query,
@@ -218,7 +217,8 @@ def search_events_and_hydrate(
     )
 
     try:
-        res = es_client.search(index=INDEX, body=body)
+        with timed("es.search.events_semantic"):
+            res = es_client.search(index=INDEX, body=body)
     except ApiError as e:
         detail = getattr(e, "info", None) or str(e)
         raise HTTPException(status_code=400, detail={"elasticsearch_error": detail})
@@ -253,8 +253,8 @@ def search_events_and_hydrate(
             "distance_km": distance_km,  # None si pas de geo ou si event n'a pas de localisation
         }
 
-    # 2) Fetch full events from DB for those IDs
-    events = fetch_events_with_relations_by_ids(es_order_ids)
+    # 2) Fetch full events (carte ES ou DB) for those IDs
+    events = hydrate_events(es_order_ids, hits)
 
     # 3) Map DB events by id (adapte si ton champ s'appelle autrement)
     # On essaye plusieurs clés possibles par sécurité.
@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Query, HTTPException
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Dict, List, Tuple
 from elasticsearch import ApiError
 
-from app.core.es import es_client
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import SIMILAR_EVENTS_PATH
+from app.core.es import es_client, get_async_es_client
+from app.core.metrics import timed
+from app.core.singleflight import body_key, coalesce, coalesce_async
 from app.embeddings.service import embed_text
-from app.api.v1.sql.fetch_events_with_relations_by_ids import fetch_events_with_relations_by_ids
+from app.services.event_hydration import event_source_filter, hydrate_events, hydrate_events_async
+from app.services.neighbors import get_neighbor_store
 
 router = APIRouter()
 
@@ -79,8 +85,6 @@ def _build_query(
 
     has_geo = lat is not None and lon is not None
 
-    source_includes = ["event_id"]
-
     functions: List[Dict[str, Any]] = []
 
     # 1) VECTEURS
@@ -200,7 +204,7 @@ def _build_query(
         "track_total_hits": True,
         "from": from_,
         "size": size,
-        "_source": {"includes": source_includes},
+        "_source": event_source_filter("event_id"),
         "query": {
             "function_score": {
                 "query": base_query,
@@ -217,41 +221,8 @@ def _build_query(
     return body
 
 
-def search_events_paginated(
-    q: str,
-    page: int,
-    per_page: int,
-    lat: Optional[float],
-    lon: Optional[float],
-    sigma_km: float,
-    geo_weight: float,
-    vec_weight: float,
-    soft_radius_km: float,
-    hard_max_radius_km: Optional[float],
-) -> Dict[str, Any]:
-    page = max(1, page)
-    per_page = max(1, min(per_page, 100))
-    from_ = (page - 1) * per_page
-
-    body = _build_query(
-        q=q,
-        from_=from_,
-        size=per_page,
-        lat=lat,
-        lon=lon,
-        sigma_km=sigma_km,
-        geo_weight=geo_weight,
-        vec_weight=vec_weight,
-        soft_radius_km=soft_radius_km,
-        hard_max_radius_km=hard_max_radius_km,
-    )
-
-    try:
-        res = es_client.search(index=INDEX, body=body)
-    except ApiError as e:
-        detail = getattr(e, "info", None) or str(e)
-        raise HTTPException(status_code=400, detail={"elasticsearch_error": detail})
-
+def _hits_meta(res: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int, List[int], Dict[int, Dict[str, Any]]]:
+    """Réponse ES -> (hits, total_count, event_ids dans l'ordre ES, score/distance par id)."""
     hits = res.get("hits", {}).get("hits", [])
     total = res.get("hits", {}).get("total", {})
     total_count = int(total.get("value", 0)) if isinstance(total, dict) else int(total or 0)
@@ -282,8 +253,19 @@ def search_events_paginated(
         event_ids.append(eid)
         meta_by_id[eid] = {"score": score, "distance_km": distance_km}
 
-    events_db = fetch_events_with_relations_by_ids(event_ids)
+    return hits, total_count, event_ids, meta_by_id
+
 
+def _merge_results(
+    hits: List[Dict[str, Any]],
+    total_count: int,
+    event_ids: List[int],
+    meta_by_id: Dict[int, Dict[str, Any]],
+    events_db: List[Dict[str, Any]],
+    from_: int,
+    per_page: int,
+    soft_radius_km: float,
+) -> Dict[str, Any]:
     db_by_id: Dict[int, dict] = {}
     for ev in events_db:
         raw_id = ev.get("id") or ev.get("event_id") or ev.get("eventId") or ev.get("_id")
@@ -329,6 +311,51 @@ def search_events_paginated(
     }
 
 
+def search_events_paginated(
+    q: str,
+    page: int,
+    per_page: int,
+    lat: Optional[float],
+    lon: Optional[float],
+    sigma_km: float,
+    geo_weight: float,
+    vec_weight: float,
+    soft_radius_km: float,
+    hard_max_radius_km: Optional[float],
+) -> Dict[str, Any]:
+    page = max(1, page)
+    per_page = max(1, min(per_page, 100))
+    from_ = (page - 1) * per_page
+
+    body = _build_query(
+        q=q,
+        from_=from_,
+        size=per_page,
+        lat=lat,
+        lon=lon,
+        sigma_km=sigma_km,
+        geo_weight=geo_weight,
+        vec_weight=vec_weight,
+        soft_radius_km=soft_radius_km,
+        hard_max_radius_km=hard_max_radius_km,
+    )
+
+    try:
+        # même requête en vol (ex: recherche par défaut après une notif push): un seul appel ES
+        with timed("es.search.events"):
+            res = coalesce("es.events", body_key(body), lambda: es_client.search(index=INDEX, body=body))
+    except ApiError as e:
+        detail = getattr(e, "info", None) or str(e)
+        raise HTTPException(status_code=400, detail={"elasticsearch_error": detail})
+
+    hits, total_count, event_ids, meta_by_id = _hits_meta(res)
+
+    # carte ES (mode dénormalisé) sinon SQL
+    events_db = hydrate_events(event_ids, hits)
+
+    return _merge_results(hits, total_count, event_ids, meta_by_id, events_db, from_, per_page, soft_radius_km)
+
+
 @router.get("/search")
 def search(
     q: str = Query("", description="Texte de recherche (peut être vide)"),
@@ -368,6 +395,101 @@ def search(
     )
 
 
+async def search_events_paginated_async(
+    q: str,
+    page: int,
+    per_page: int,
+    lat: Optional[float],
+    lon: Optional[float],
+    sigma_km: float,
+    geo_weight: float,
+    vec_weight: float,
+    soft_radius_km: float,
+    hard_max_radius_km: Optional[float],
+) -> Dict[str, Any]:
+    """search_events_paginated sans bloquer la boucle: embedding en threadpool, ES + SQL async."""
+    page = max(1, page)
+    per_page = max(1, min(per_page, 100))
+    from_ = (page - 1) * per_page
+
+    # _build_query embed le texte (CPU) => threadpool
+    body = await run_in_threadpool(
+        _build_query,
+        q=q,
+        from_=from_,
+        size=per_page,
+        lat=lat,
+        lon=lon,
+        sigma_km=sigma_km,
+        geo_weight=geo_weight,
+        vec_weight=vec_weight,
+        soft_radius_km=soft_radius_km,
+        hard_max_radius_km=hard_max_radius_km,
+    )
+
+    try:
+        with timed("es.search.events_async"):
+            res = await coalesce_async(
+                "es.events", body_key(body), lambda: get_async_es_client().search(index=INDEX, body=body)
+            )
+    except ApiError as e:
+        detail = getattr(e, "info", None) or str(e)
+        raise HTTPException(status_code=400, detail={"elasticsearch_error": detail})
+
+    hits, total_count, event_ids, meta_by_id = _hits_meta(res)
+    events_db = await hydrate_events_async(event_ids, hits)
+
+    return _merge_results(hits, total_count, event_ids, meta_by_id, events_db, from_, per_page, soft_radius_km)
+
+
+@router.get("/async/search")
+async def search_async(
+    q: str = Query("", description="Texte de recherche (peut être vide)"),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+    lat: Optional[float] = Query(None),
+    lon: Optional[float] = Query(None),
+    sigma_km: float = Query(15.0, ge=0.1, le=100.0),
+    geo_weight: float = Query(1.0, ge=0.0, le=10.0),
+    vec_weight: float = Query(1.0, ge=0.0, le=10.0),
+    soft_radius_km: float = Query(10.0, ge=1.0, le=300.0),
+    hard_max_radius_km: Optional[float] = Query(None, ge=1.0, le=1000.0),
+):
+    """Version async de /events/search (mêmes paramètres, même réponse)."""
+    return await search_events_paginated_async(
+        q=q,
+        page=page,
+        per_page=per_page,
+        lat=lat,
+        lon=lon,
+        sigma_km=sigma_km,
+        geo_weight=geo_weight,
+        vec_weight=vec_weight,
+        soft_radius_km=soft_radius_km,
+        hard_max_radius_km=hard_max_radius_km,
+    )
+
+
+@router.get("/{event_id}/similar")
+def similar_events(event_id: int, limit: int = Query(10, ge=1, le=50)):
+    """
+    "Plus comme celui-ci": voisins précalculés par app/jobs/similar_events.py
+    (events à venir, proches géographiquement), lus en mémoire puis hydratés.
+    Pas de kNN à la requête.
+    """
+    neighbors = get_neighbor_store(SIMILAR_EVENTS_PATH).get(event_id, limit=limit)
+    if not neighbors:
+        return {"event_id": event_id, "results": []}
+
+    scores = dict(neighbors)
+    events = hydrate_events([eid for eid, _ in neighbors])
+    results = []
+    for ev in events:
+        eid = ev.get("id")
+        results.append({**ev, "similarity": scores.get(eid)})
+    return {"event_id": event_id, "results": results}
+
+
 @router.get("/debug/es")
 def debug_es():
     info = es_client.info()
@@ -379,3 +501,15 @@ def debug_es():
         "es_version": (info.get("version") or {}).get("number"),
         "count": count.get("count"),
     }
+
+
+@router.get("/debug/es/diagnostics")
+def debug_es_diagnostics(last_n: int = Query(50, ge=1, le=500)):
+    """
+    Segments, mémoire vectorielle estimée, hit ratio des caches, refresh/merge,
+    version du mapping + latences des dernières requêtes de ce worker.
+    Réponse en cache ~30s: sans danger en prod.
+    """
+    from app.core.diagnostics import collect_diagnostics
+
+    return collect_diagnostics(last_n=last_n)
@@ -1,10 +1,18 @@
-from typing import List
-from fastapi import APIRouter
+import logging
+import threading
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Query
 from app.schemas import WinkerIn, EventIn
 from app.repositories.winkers import index_winker, bulk_index_winkers
 from app.repositories.events import index_event, bulk_index_events
+from app.services.event_hydration import invalidate_events
+from app.services.profiles import invalidate_requester_profiles
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# un seul recalcul de boost à la fois par worker
+_boost_lock = threading.Lock()
 
 
 # --------- WINKERS ---------
@@ -16,6 +24,7 @@ def index_single_winker(winker: WinkerIn):
     Idéal pour un job Airflow incrémental (un user).
     """
     index_winker(winker)
+    invalidate_requester_profiles([winker.id])
     return {"status": "ok", "indexed_id": winker.id}
 
 
@@ -26,6 +35,7 @@ def index_winkers_bulk_endpoint(winkers: List[WinkerIn]):
     Idéal pour un DAG Airflow qui fait un batch.
     """
     bulk_index_winkers(winkers)
+    invalidate_requester_profiles([w.id for w in winkers])
     return {"status": "ok", "count": len(winkers)}
 
 
@@ -37,6 +47,7 @@ def index_single_event(event: EventIn):
     Indexe / met à jour un seul Event dans Elasticsearch.
     """
     index_event(event)
+    invalidate_events([event.id])
     return {"status": "ok", "indexed_id": event.id}
 
 
@@ -46,4 +57,32 @@ def index_events_bulk_endpoint(events: List[EventIn]):
     Indexation bulk de plusieurs Events.
     """
     bulk_index_events(events)
+    invalidate_events([e.id for e in events])
     return {"status": "ok", "count": len(events)}
+
+
+def _recompute_boosts(half_life_days: Optional[float]) -> None:
+    from app.jobs.popularity import recompute_event_boosts
+
+    try:
+        logger.info("event boosts recomputed: %s", recompute_event_boosts(half_life_days=half_life_days))
+    except Exception:
+        logger.exception("event boosts recompute failed")
+    finally:
+        _boost_lock.release()
+
+
+@router.post("/events/boost", tags=["indexing"], status_code=202)
+def recompute_events_boost_endpoint(
+    background_tasks: BackgroundTasks,
+    half_life_days: Optional[float] = Query(None, gt=0),
+):
+    """
+    Recalcule la popularité (décroissance temporelle) de tous les events
+    et l'écrit dans le champ ES `boost`. À planifier côté Airflow.
+    Scan SQL + bulk de tout le catalogue: lancé en tâche de fond (202).
+    """
+    if not _boost_lock.acquire(blocking=False):
+        return {"status": "already_running"}
+    background_tasks.add_task(_recompute_boosts, half_life_days)
+    return {"status": "accepted"}
@@ -1,15 +1,48 @@
-from typing import Any, Dict, List, Optional
-from fastapi import APIRouter, HTTPException, Query
-import requests
-from elasticsearch import Elasticsearch
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from fastapi import APIRouter, Header, HTTPException, Query
+from functools import lru_cache
+from pydantic import BaseModel, Field
 import os
-from app.core.db import *
-from app.mappings import *
-from app.schemas import *
-from app.api.v1.sql.fetch_events_with_relations_by_ids import *
+from app.core.config import (
+    CF_BOOST,
+    CF_CANDIDATES,
+    CF_NEIGHBORS_PATH,
+    CF_USER_HISTORY,
+    FOF_BOOST,
+    FOF_CANDIDATES,
+    FOF_MAX_FANOUT,
+    GEO_POOLS_ENDPOINTS,
+    GEO_POOLS_PATH,
+    MATERIALIZED_EVENTS_PATH,
+    MATERIALIZED_WINKERS_PATH,
+    MMR_EVENTS_CANDIDATES,
+    MMR_EVENTS_LAMBDA,
+    MMR_WINKERS_LAMBDA,
+    RERANK_MODE,
+    VECTOR_ENGINE_ES_FALLBACK,
+    WINKERS_FOR_WINKER_LIMIT,
+    WINKERS_FOR_WINKER_RADIUS_KM,
+)
+from app.core.metrics import incr, timed
+from app.core.singleflight import body_key, coalesce
+from app.schemas import EventOut
 from app.embeddings.service import embed_text
-from app.api.v1.sql.fetch_winkers_by_ids import *
-from app.api.utils import *
+from app.api.v1.sql.fetch_participations import fetch_participated_event_ids
+from app.api.v1.sql.fetch_winker_profile import fetch_winker_row
+from app.api.v1.sql.fetch_winkers_by_ids import fetch_winkers_by_ids, fetch_winkers_with_follow_flags
+from app.services.diversity import VECTOR_FIELD, hit_vectors, mmr_order
+from app.services.event_hydration import event_source_filter, hydrate_events
+from app.services.follow_graph import get_follow_graph
+from app.services.geo_pools import get_geo_pool_store
+from app.services.impressions import KINDS, overfetch, record_impressions, unseen_first
+from app.services.materialized import materialized_built_day, materialized_ids
+from app.services.neighbors import get_neighbor_store
+from app.services.profiles import get_requester_profile, pack_vector, profile_vectors, unpack_vector
+from app.services.reranking import WINKER_DOCVALUE_FIELDS, rerank_winkers
+from app.services.vector_engine import get_vector_engine, use_vector_engine
+from app.api.http_cache import data_version, doc_versions, json_with_etag, not_modified_or_none, reco_etag
+from app.api.utils import haversine_km, ids_boost_clauses
 from datetime import datetime, timezone, date
 import hashlib
 
@@ -17,6 +50,9 @@ router = APIRouter()
 
 # ---- Config ----
 ES_INDEX = "nisu_events"
+EVENTS_FOR_WINKER_SIZE = 4
+EVENT_ID_LT = 656
+EVENTS_RADIUS_KM = 200
 ES_HOST = os.getenv("ES_HOST", "http://192.168.1.213:9200")
 ES_USER = os.getenv("ES_USER")
 ES_PASS = os.getenv("ES_PASS")
@@ -24,12 +60,16 @@ ES_PASS = os.getenv("ES_PASS")
 EMBEDDINGS_URL = "https://recommendation.nisu.fr/api/v1/recommendations/embeddings"
 EMBEDDINGS_TIMEOUT = 60
 
-es = Elasticsearch(
-    [ES_HOST],
-    basic_auth=(ES_USER, ES_PASS) if ES_USER and ES_PASS else None,
-)
 
-# ---- Helpers ----
+@lru_cache(maxsize=1)
+def get_es():
+    """Client ES des recos, créé au premier appel (pas à l'import)."""
+    from elasticsearch import Elasticsearch
+
+    return Elasticsearch(
+        [ES_HOST],
+        basic_auth=(ES_USER, ES_PASS) if ES_USER and ES_PASS else None,
+    )
 
 
 def get_embedding(text: str) -> List[float]:
@@ -74,65 +114,93 @@ def parse_geo(w: Dict[str, Any]) -> Optional[Dict[str, float]]:
         return None
 
 
-# ---- Ta route existante (inchangée) ----
+# ---- Ta route existante (inchangée: ligne complète) ----
+# le ranking passe par get_requester_profile (colonnes projetées + cache)
 @router.get("/get_rencontre_from_winker/{user_id}")
 def get_profil_winker_raw(user_id: int):
-
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM profil_winker WHERE id = %s", (user_id,))
-            row = cur.fetchone()
-            if row is None:
-                raise HTTPException(status_code=404, detail="Profil introuvable")
-            columns = [desc[0] for desc in cur.description]
-
-    return dict(zip(columns, row))
+    winker = fetch_winker_row(user_id)
+    if winker is None:
+        raise HTTPException(status_code=404, detail="Profil introuvable")
+    return winker
 
 
-# ---- Nouvelle route : top 4 events ----
+def get_requester_winker(user_id: int) -> Dict[str, Any]:
+    """Profil demandeur (projeté + cache court), commun aux endpoints de reco."""
+    winker = get_requester_profile(user_id)
+    if winker is None:
+        raise HTTPException(status_code=404, detail="Profil introuvable")
+    return winker
 
-@router.get("/get_events_for_winker/{user_id}", response_model=List[EventOut])
-def get_events_for_winker(user_id: int) -> List[EventOut]:
-    winker = get_profil_winker_raw(user_id)
 
+def requester_profile_and_vector(user_id: int, empty_detail: str) -> Tuple[Dict[str, Any], List[float]]:
+    """Profil + embedding (vecteur en cache réutilisé tant que le texte du profil est inchangé)."""
+    winker = get_requester_winker(user_id)
     profile_text = build_winker_profile_text(winker)
     if not profile_text:
-        raise HTTPException(status_code=400, detail="Profil trop vide pour recommander des events.")
+        raise HTTPException(status_code=400, detail=empty_detail)
+
+    cached = profile_vectors.get(user_id)
+    if cached and cached[0] == profile_text:
+        return winker, unpack_vector(cached[1])
 
-    qvec = get_embedding(profile_text)
+    with timed("embed.profile"):
+        qvec = get_embedding(profile_text)
     if not qvec:
         raise HTTPException(status_code=500, detail="Impossible de générer l'embedding du profil.")
+    profile_vectors.set(user_id, (profile_text, pack_vector(qvec)))
+    return winker, qvec
 
-    user_geo = parse_geo(winker)
 
+# ---- Nouvelle route : top 4 events ----
+
+def build_events_for_winker_body(
+    user_id: int,
+    qvec: List[float],
+    user_geo: Optional[Dict[str, float]],
+    cf_scores: Optional[Dict[int, float]] = None,
+    size: int = EVENTS_FOR_WINKER_SIZE,
+    with_vectors: bool = False,
+) -> Dict[str, Any]:
+    """
+    Requête ES (kNN + rescore) des events recommandés, partagée sync/async.
+    cf_scores (event -> score de co-participation) ajoute ces candidats à ceux du kNN.
+    size > 4 (feed) élargit k / num_candidates / fenêtre de rescore en proportion.
+    with_vectors: embeddings dans le _source des hits (passe MMR).
+    """
+    window = max(50, size)
     knn_query: Dict[str, Any] = {
         "field": "embedding_vector",
         "query_vector": qvec,
-        "k": 50,
-        "num_candidates": 200,
+        "k": window,
+        "num_candidates": max(200, 4 * window),
     }
 
     # ✅ Filtre commun: event_id < 678
-    base_filters: List[Dict[str, Any]] = [{"range": {"event_id": {"lt": 656}}}]
+    base_filters: List[Dict[str, Any]] = [{"range": {"event_id": {"lt": EVENT_ID_LT}}}]
 
     # ✅ Filtre geo optionnel
     if user_geo:
         base_filters.append(
-            {"geo_distance": {"distance": "200km", "localisation": user_geo}}
+            {"geo_distance": {"distance": f"{EVENTS_RADIUS_KM}km", "localisation": user_geo}}
         )
 
     base_query: Dict[str, Any] = {"bool": {"filter": base_filters}}
+    if cf_scores:
+        top = max(cf_scores.values())
+        base_query["bool"]["should"] = ids_boost_clauses(
+            {eid: CF_BOOST * score / top for eid, score in cf_scores.items()}
+        )
 
     # seed stable "par jour" et par user (même résultats dans la journée, change le lendemain)
     seed_str = f"{user_id}-{date.today().isoformat()}"  # ex: "123-2025-12-17"
     seed = int(hashlib.md5(seed_str.encode()).hexdigest()[:8], 16)  # int 32-bit
 
     body: Dict[str, Any] = {
-        "size": 4,
+        "size": size,
         "query": base_query,
         "knn": knn_query,
         "rescore": {
-            "window_size": 50,
+            "window_size": window,
             "query": {
                 "rescore_query": {
                     "function_score": {
@@ -182,34 +250,234 @@ def get_events_for_winker(user_id: int) -> List[EventOut]:
                 "rescore_query_weight": 1.6,
             },
         },
-        "_source": False,
+        "_source": event_source_filter(*([VECTOR_FIELD] if with_vectors else [])),
+        # version de chaque hit, reprise par l'ETag (sans mget supplémentaire)
+        "seq_no_primary_term": True,
     }
 
-    resp = es.search(index=ES_INDEX, body=body)
-    hits = resp.get("hits", {}).get("hits", [])
+    return body
+
+
+def cf_scores_from_history(history: List[int]) -> Dict[int, float]:
+    """Voisins de co-participation des events déjà faits (hors ceux-ci) -> score cumulé."""
+    if not history:
+        return {}
+    store = get_neighbor_store(CF_NEIGHBORS_PATH)
+    return dict(store.aggregate(history, CF_CANDIDATES, exclude=history))
+
 
-    event_ids: List[int] = []
+def collaborative_candidates(user_id: int) -> Dict[int, float]:
+    """Candidats du filtrage collaboratif (vide si le job n'a pas encore tourné)."""
+    if not get_neighbor_store(CF_NEIGHBORS_PATH).is_loaded():
+        return {}
+    with timed("db.participations"):
+        history = fetch_participated_event_ids(user_id, CF_USER_HISTORY)
+    return cf_scores_from_history(history)
+
+
+def hit_ids(hits: List[Dict[str, Any]]) -> List[int]:
+    ids: List[int] = []
     for h in hits:
         # Si ton ES _id est ton event_id numérique, ça marche.
         # Sinon, adapte pour lire h["_source"]["event_id"] (et mets _source=True ou includes)
         try:
-            event_ids.append(int(h.get("_id")))
+            ids.append(int(h.get("_id")))
         except Exception:
             continue
+    return ids
 
-    if not event_ids:
-        return []
-    
-    if True:
-        event_ids = [590, 565, 535]
 
-    # (Le reste de ton code: fetch DB / sérialisation EventOut à partir de event_ids)
-    # Exemple (à adapter à ton projet) :
-    # events = get_events_by_ids(event_ids)
-    # return [EventOut.from_orm(e) for e in events]
+def hit_scores(hits: List[Dict[str, Any]]) -> List[Tuple[int, float]]:
+    """[(id, _score)] dans l'ordre ES."""
+    ranked: List[Tuple[int, float]] = []
+    for h in hits:
+        try:
+            ranked.append((int(h.get("_id")), float(h.get("_score") or 0.0)))
+        except (TypeError, ValueError):
+            continue
+    return ranked
+
+
+def diversified_ids(
+    ranked: List[Tuple[int, float]],
+    hits: List[Dict[str, Any]],
+    lambda_: float,
+    k: Optional[int] = None,
+) -> List[int]:
+    """
+    Passe MMR sur la fenêtre de candidats (vecteurs lus dans les hits); no-op à lambda 1.
+    k: nb d'items choisis par MMR (ce qui sera servi, sur-échantillonnage compris), le reste
+    garde l'ordre du score => O(k·n) au lieu de O(n²).
+    """
+    if lambda_ >= 1.0 or not hits:
+        return [item_id for item_id, _ in ranked]
+    with timed("rerank.mmr", n=len(ranked)):
+        return mmr_order(ranked, hit_vectors(hits), lambda_, k=k)
+
+
+def local_event_ids(qvec: List[float], user_geo: Optional[Dict[str, float]], size: int) -> Optional[List[int]]:
+    """
+    Mêmes préfiltres que build_events_for_winker_body, classés par cosinus par le
+    moteur vectoriel en process (pas de rescore), events passés exclus comme dans
+    les pools géo. None si aucun snapshot n'est chargé.
+    """
+    engine = get_vector_engine()
+    if engine is None:
+        return None
+    with timed("vector_engine.search.events", size=size):
+        found = engine.search(
+            qvec,
+            size,
+            geo=user_geo,
+            radius_km=EVENTS_RADIUS_KM if user_geo else None,
+            min_day=date.today().toordinal(),
+            id_lt=EVENT_ID_LT,
+        )
+    return [event_id for event_id, _ in found]
+
+
+def geo_pool_event_ids(qvec: List[float], user_geo: Dict[str, float], size: int) -> Optional[List[int]]:
+    """Top events du pool de la tuile geohash du demandeur (None si les pools ne sont pas chargés)."""
+    with timed("geo_pools.search.events", size=size):
+        found = get_geo_pool_store(GEO_POOLS_PATH).search(qvec, user_geo, EVENTS_RADIUS_KM, size, id_lt=EVENT_ID_LT)
+    if found is None:
+        return None
+    return [event_id for event_id, _ in found]
+
+
+def has_local_event_source(endpoint: str, user_geo: Optional[Dict[str, float]]) -> bool:
+    """Un calcul en process est configuré pour cet endpoint (sinon ES directement)."""
+    return bool(user_geo and endpoint in GEO_POOLS_ENDPOINTS) or use_vector_engine(endpoint)
+
+
+def local_event_candidates(
+    endpoint: str,
+    qvec: List[float],
+    user_geo: Optional[Dict[str, float]],
+    size: int,
+) -> Optional[List[int]]:
+    """
+    Candidats calculés en process pour cet endpoint, si configuré:
+    pools par tuile (GEO_POOLS_ENDPOINTS, profil géolocalisé) puis moteur vectoriel
+    (VECTOR_ENGINE_ENDPOINTS). None => passer par ES.
+    """
+    if user_geo and endpoint in GEO_POOLS_ENDPOINTS:
+        ids = geo_pool_event_ids(qvec, user_geo, size)
+        if ids is not None:
+            return ids
+    if use_vector_engine(endpoint):
+        return local_event_ids(qvec, user_geo, size)
+    return None
+
+
+def search_event_ids(
+    endpoint: str,
+    user_id: int,
+    qvec: List[float],
+    user_geo: Optional[Dict[str, float]],
+    size: int,
+    with_vectors: bool = False,
+) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """
+    (ids, hits) des events candidats: calcul en process si configuré pour
+    l'endpoint (local_event_candidates), sinon ES (repli local si ES est en erreur).
+    Le chemin local ne renvoie pas de hits: l'hydratation passe par le cache / Postgres.
+    """
+    ids = local_event_candidates(endpoint, qvec, user_geo, size)
+    if ids is not None:
+        return ids, []
+
+    body = build_events_for_winker_body(
+        user_id, qvec, user_geo, collaborative_candidates(user_id), size=size, with_vectors=with_vectors
+    )
+    try:
+        with timed(f"es.search.{endpoint}"):
+            resp = coalesce("es.reco_events", body_key(body), lambda: get_es().search(index=ES_INDEX, body=body))
+    except Exception:
+        ids = local_event_ids(qvec, user_geo, size) if VECTOR_ENGINE_ES_FALLBACK else None
+        if ids is None:
+            raise
+        incr(f"vector_engine.es_fallback.{endpoint}")
+        return ids, []
+
+    hits = resp.get("hits", {}).get("hits", [])
+    return hit_ids(hits), hits
+
+
+def live_event_ids(user_id: int) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """Recherche live des events du winker -> (ids à servir, hits ES éventuels)."""
+    winker, qvec = requester_profile_and_vector(user_id, "Profil trop vide pour recommander des events.")
+
+    # sur-échantillonnage: les events déjà vus sont écartés ensuite, en mémoire
+    diversify = MMR_EVENTS_LAMBDA < 1.0
+    size = overfetch(EVENTS_FOR_WINKER_SIZE)
+    candidate_ids, hits = search_event_ids(
+        "events_for_winker",
+        user_id,
+        qvec,
+        parse_geo(winker),
+        max(size, MMR_EVENTS_CANDIDATES) if diversify else size,
+        with_vectors=diversify,
+    )
+    if diversify and hits:  # chemin local: pas de vecteurs, ordre inchangé
+        candidate_ids = diversified_ids(hit_scores(hits), hits, MMR_EVENTS_LAMBDA, k=size)
 
-    events = fetch_events_with_relations_by_ids(event_ids)
-    return [EventOut.model_validate(e) for e in events]  # pydantic v2, sinon from_orm
+    return unseen_first(user_id, "events", candidate_ids, keep=EVENTS_FOR_WINKER_SIZE), hits
+
+
+def event_versions(event_ids: Sequence[int], hits: List[Dict[str, Any]]) -> Dict[int, str]:
+    """Versions ES des events servis: celles des hits, un mget sans _source pour le reste."""
+    versions = doc_versions(hits)
+    missing = [str(eid) for eid in event_ids if eid not in versions]
+    if missing:
+        with timed("es.mget.event_versions", ids=len(missing)):
+            resp = get_es().mget(index=ES_INDEX, ids=missing, source=False)
+        versions.update(doc_versions(resp.get("docs", [])))
+    return versions
+
+
+def events_etag(user_id: int, event_ids: Sequence[int], source: str, versions: Dict[int, str]) -> str:
+    return reco_etag("events_for_winker", user_id, event_ids, data_version(source, event_ids, versions))
+
+
+def events_source(materialized: bool) -> str:
+    """Origine des ids pour l'ETag: fichier matérialisé (et son built_day) ou ranking live."""
+    if materialized:
+        return f"materialized.{materialized_built_day(MATERIALIZED_EVENTS_PATH)}"
+    return "live"
+
+
+@router.get("/get_events_for_winker/{user_id}", response_model=List[EventOut])
+def get_events_for_winker(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    ETag = ids servis (ordre) + jour + versions ES des events (+ built_day si matérialisé),
+    calculé avant l'hydratation: un If-None-Match identique renvoie 304 sans hydrater.
+    """
+    # top-K du jour précalculé (même contrat "stable sur la journée"), sinon live
+    hits: List[Dict[str, Any]] = []
+    event_ids = materialized_ids(MATERIALIZED_EVENTS_PATH, "events", user_id)
+    source = events_source(event_ids is not None)
+    if event_ids is not None:
+        event_ids = unseen_first(user_id, "events", event_ids, keep=EVENTS_FOR_WINKER_SIZE)
+    else:
+        event_ids, hits = live_event_ids(user_id)
+
+    try:
+        etag: Optional[str] = events_etag(user_id, event_ids, source, event_versions(event_ids, hits))
+    except Exception:
+        # versions indisponibles: réponse servie normalement, sans ETag
+        incr("http.events_for_winker.etag_unavailable")
+        etag = None
+    not_modified = not_modified_or_none("events_for_winker", if_none_match, etag)
+    if not_modified is not None:
+        return not_modified
+
+    events = hydrate_events(event_ids, hits) if event_ids else []
+    payload = [EventOut.model_validate(e).model_dump(mode="json") for e in events]  # pydantic v2
+    return json_with_etag(payload, etag)
 
 
 def age_from_birth_year(birth_year: Any) -> int:
@@ -225,36 +493,24 @@ def age_from_birth_year(birth_year: Any) -> int:
         return 0
 
 
-@router.get("/get_winkers_for_winker/{user_id}")
-def get_winkers_for_winker(
+def build_winkers_for_winker_body(
     user_id: int,
-    limit: int = Query(12, ge=1, le=50),
-    radius_km: int = Query(30, ge=1, le=300),
-) -> List[Dict[str, Any]]:
+    qvec: List[float],
+    user_geo: Dict[str, float],
+    user_age: int,
+    limit: int,
+    radius_km: int,
+    mutual_counts: Optional[Dict[int, int]] = None,
+    with_vectors: bool = False,
+) -> Dict[str, Any]:
     """
-    Reco: winkers proches + similarité profil (KNN embeddings).
-    Puis re-ranking (rescore) avec:
-      - activité récente (gauss sur lastConnection)
-      - proximité géographique (gauss sur localisation)
-      - proximité d'âge (gauss sur age, origin = âge calculé depuis birthYear du demandeur)
+    Requête ES (kNN + rescore activité/geo/âge) des winkers recommandés, partagée sync/async.
+    mutual_counts (amis d'amis -> nb de connexions communes) ajoute ces candidats à
+    ceux du kNN, avec un bonus croissant (log) avec le nombre de connexions communes.
+    RERANK_MODE=python: pas de rescore, toute la fenêtre revient avec les doc values
+    et rank_winker_hits la re-classe en process.
+    with_vectors: embeddings dans le _source des hits (passe MMR).
     """
-    winker = get_profil_winker_raw(user_id)
-
-    profile_text = build_winker_profile_text(winker)
-    if not profile_text:
-        raise HTTPException(status_code=400, detail="Profil trop vide pour recommander des winkers.")
-
-    qvec = get_embedding(profile_text)
-    if not qvec:
-        raise HTTPException(status_code=500, detail="Impossible de générer l'embedding du profil.")
-
-    user_geo = parse_geo(winker)
-    if not user_geo:
-        raise HTTPException(status_code=400, detail="Pas de localisation (lat/lon) sur le profil winker.")
-
-    # âge du demandeur à partir de birthYear
-    user_age = age_from_birth_year(winker.get("birthYear"))
-
     # ------- Filtres métier minimum -------
     must_filters: List[Dict[str, Any]] = [
         {"term": {"is_active": True}},
@@ -264,14 +520,29 @@ def get_winkers_for_winker(
     ]
 
     base_query: Dict[str, Any] = {"bool": {"filter": must_filters}}
+    if mutual_counts:
+        top = math.log1p(max(mutual_counts.values()))
+        base_query["bool"]["should"] = ids_boost_clauses(
+            {wid: FOF_BOOST * math.log1p(n) / top for wid, n in mutual_counts.items()}
+        )
 
+    window = max(200, limit)
     knn_query: Dict[str, Any] = {
         "field": "embedding_vector",
         "query_vector": qvec,
-        "k": 200,                 # on récupère large
-        "num_candidates": 1000,   # selon taille index
+        "k": window,                          # on récupère large
+        "num_candidates": max(1000, window),  # ES exige num_candidates >= k
     }
 
+    if RERANK_MODE == "python":
+        return {
+            "size": window,
+            "query": base_query,
+            "knn": knn_query,
+            "docvalue_fields": WINKER_DOCVALUE_FIELDS,
+            "_source": [VECTOR_FIELD] if with_vectors else False,
+        }
+
     # ------- Rescore: gauss activité + gauss geo + gauss âge (+ boost) -------
     functions: List[Dict[str, Any]] = [
         # 1) Récence de connexion: plus récent = mieux
@@ -329,7 +600,7 @@ def get_winkers_for_winker(
         "query": base_query,
         "knn": knn_query,
         "rescore": {
-            "window_size": 200,
+            "window_size": window,
             "query": {
                 "rescore_query": {
                     "function_score": {
@@ -343,34 +614,81 @@ def get_winkers_for_winker(
                 "rescore_query_weight": 1.0,
             }
         },
-        "_source": False,  # on veut juste les ids (puis SQL)
+        "_source": [VECTOR_FIELD] if with_vectors else False,  # on veut juste les ids (puis SQL)
     }
 
-    resp = es.search(index="nisu_winkers", body=body)
-    hits = resp.get("hits", {}).get("hits", [])
-
-    winker_ids: List[int] = []
-    for h in hits:
-        try:
-            winker_ids.append(int(h.get("_id")))
-        except Exception:
-            continue
+    return body
 
-    if not winker_ids:
-        return []
 
-    winkers_sql = fetch_winkers_by_ids(winker_ids)
+def rank_winker_hits(
+    hits: List[Dict[str, Any]],
+    user_geo: Dict[str, float],
+    user_age: int,
+    explain: bool = False,
+) -> Tuple[List[Tuple[int, float]], Dict[int, Dict[str, float]]]:
+    """
+    Hits winkers -> ([(id, score)] classés, détail par feature si explain).
+    Ordre ES tel quel en RERANK_MODE=es (détail indisponible).
+    """
+    if RERANK_MODE != "python":
+        return hit_scores(hits), {}
+    with timed("rerank.winkers", n=len(hits)):
+        return rerank_winkers(hits, user_geo, user_age, explain=explain)
+
+
+def social_candidates(user_id: int) -> Dict[int, int]:
+    """Amis d'amis -> nb de connexions communes (vide tant que le graphe n'est pas chargé)."""
+    graph = get_follow_graph()
+    if graph is None:
+        return {}
+    return dict(graph.friends_of_friends(user_id, FOF_CANDIDATES, FOF_MAX_FANOUT))
+
+
+def fetch_winkers_for_reco(user_id: int, winker_ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """Winkers hydratés (ordre ES) + flags de follow: graphe en mémoire si chargé, sinon SQL."""
+    graph = get_follow_graph()
+    if graph is None:
+        return fetch_winkers_with_follow_flags(user_id, winker_ids)
+
+    rows = fetch_winkers_by_ids(winker_ids)
+    following_ids, follow_back_ids = graph.follow_flags(user_id, [w.get("id") for w in rows])
+    for w in rows:
+        w["isFollowing"] = w.get("id") in following_ids
+        w["isFollowBack"] = w.get("id") in follow_back_ids
+    return rows
+
+
+def materialized_winkers(user_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Winkers matérialisés du jour (paramètres par défaut), None => chemin live."""
+    winker_ids = materialized_ids(MATERIALIZED_WINKERS_PATH, "winkers", user_id)
+    if winker_ids is None:
+        return None
+    user_geo = parse_geo(get_requester_winker(user_id))
+    if not user_geo:
+        return None
+    winker_ids = unseen_first(user_id, "winkers", winker_ids, keep=WINKERS_FOR_WINKER_LIMIT)
+    with timed("db.hydrate.winkers", ids=len(winker_ids)):
+        rows = fetch_winkers_for_reco(user_id, winker_ids)
+    return serialize_winkers(rows, user_geo, social_candidates(user_id))
 
-    # préserver ordre ES
-    by_id = {w["id"]: w for w in winkers_sql if "id" in w}
-    ordered = [by_id[i] for i in winker_ids if i in by_id]
 
+def serialize_winkers(
+    rows: List[Dict[str, Any]],
+    user_geo: Dict[str, float],
+    mutual_counts: Optional[Dict[int, int]] = None,
+    breakdown: Optional[Dict[int, Dict[str, float]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Lignes hydratées (ordre ES) -> payload de l'API (+ distance_km, mutualCount).
+    breakdown (mode debug): contribution de chaque feature du re-ranking, en rankBreakdown.
+    """
+    mutual_counts = mutual_counts or {}
     safe_out: List[Dict[str, Any]] = []
 
     user_lat = float(user_geo["lat"])
     user_lon = float(user_geo["lon"])
 
-    for w in ordered:
+    for w in rows:
         lat = w.get("lat")
         lon = w.get("lon")
 
@@ -383,8 +701,6 @@ def get_winkers_for_winker(
                 )
         except Exception:
             pass
-        following_ids, follow_back_ids = fetch_follow_flags(user_id, winker_ids)
-
 
         safe_out.append({
             **w,
@@ -396,12 +712,90 @@ def get_winkers_for_winker(
             "sexe": w.get("sexe"),
             "photoProfil": w.get("photoProfil"),
             "distance_km": distance_km,
-            "isFollowing": int(w.get("id")) in following_ids,
-            "isFollowBack": int(w.get("id")) in follow_back_ids,
+            "isFollowing": bool(w.get("isFollowing")),
+            "isFollowBack": bool(w.get("isFollowBack")),
+            "mutualCount": mutual_counts.get(w.get("id"), 0),
         })
+        if breakdown is not None:
+            safe_out[-1]["rankBreakdown"] = breakdown.get(w.get("id"))
 
     return safe_out
 
+
+@router.get("/get_winkers_for_winker/{user_id}")
+def get_winkers_for_winker(
+    user_id: int,
+    limit: int = Query(WINKERS_FOR_WINKER_LIMIT, ge=1, le=50),
+    radius_km: int = Query(WINKERS_FOR_WINKER_RADIUS_KM, ge=1, le=300),
+    debug: bool = Query(False),
+) -> List[Dict[str, Any]]:
+    """
+    Reco: winkers proches + similarité profil (KNN embeddings).
+    Puis re-ranking (rescore) avec:
+      - activité récente (gauss sur lastConnection)
+      - proximité géographique (gauss sur localisation)
+      - proximité d'âge (gauss sur age, origin = âge calculé depuis birthYear du demandeur)
+    Les amis d'amis (graphe de follow en mémoire) s'ajoutent aux candidats kNN.
+    Avec les paramètres par défaut, servi depuis les recos matérialisées du jour si présentes.
+    RERANK_MODE=python: re-ranking en process; debug=true ajoute le détail par feature.
+    """
+    if not debug and limit == WINKERS_FOR_WINKER_LIMIT and radius_km == WINKERS_FOR_WINKER_RADIUS_KM:
+        served = materialized_winkers(user_id)
+        if served is not None:
+            return served
+
+    winker, qvec = requester_profile_and_vector(user_id, "Profil trop vide pour recommander des winkers.")
+
+    user_geo = parse_geo(winker)
+    if not user_geo:
+        raise HTTPException(status_code=400, detail="Pas de localisation (lat/lon) sur le profil winker.")
+
+    # âge du demandeur à partir de birthYear
+    user_age = age_from_birth_year(winker.get("birthYear"))
+
+    mutual_counts = social_candidates(user_id)
+    diversify = MMR_WINKERS_LAMBDA < 1.0
+    body = build_winkers_for_winker_body(
+        user_id, qvec, user_geo, user_age, overfetch(limit), radius_km, mutual_counts, with_vectors=diversify
+    )
+
+    with timed("es.search.winkers_for_winker"):
+        resp = coalesce("es.reco_winkers", body_key(body), lambda: get_es().search(index="nisu_winkers", body=body))
+    hits = resp.get("hits", {}).get("hits", [])
+    ranked, breakdown = rank_winker_hits(hits, user_geo, user_age, explain=debug)
+
+    winker_ids = unseen_first(
+        user_id, "winkers", diversified_ids(ranked, hits, MMR_WINKERS_LAMBDA, k=overfetch(limit)), keep=limit
+    )
+
+    if not winker_ids:
+        return []
+
+    # winkers + fichiers (ordre ES préservé) + flags de follow
+    with timed("db.hydrate.winkers", ids=len(winker_ids)):
+        ordered = fetch_winkers_for_reco(user_id, winker_ids)
+
+    return serialize_winkers(ordered, user_geo, mutual_counts, breakdown if debug else None)
+
+class ImpressionsIn(BaseModel):
+    user_id: int
+    events: List[int] = Field(default_factory=list, max_length=500)
+    winkers: List[int] = Field(default_factory=list, max_length=500)
+
+
+@router.post("/impressions")
+def post_impressions(payload: ImpressionsIn):
+    """
+    Items affichés au winker: exclus (en priorité) de ses prochaines recos.
+    À appeler par l'app quand les cartes sont réellement vues.
+    """
+    recorded = {
+        kind: record_impressions(payload.user_id, kind, getattr(payload, kind))
+        for kind in KINDS
+    }
+    return {"user_id": payload.user_id, "recorded": recorded}
+
+
 class EmbeddingRequest(BaseModel):
     text: str = Field(..., min_length=1, description="Texte à vectoriser")
 
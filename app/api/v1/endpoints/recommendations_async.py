@@ -0,0 +1,256 @@
+"""
+Versions async des endpoints de recommandation.
+
+Même logique/ranking que recommendations.py, mais:
+  - SQL via le pool psycopg async, ES via AsyncElasticsearch
+  - l'embedding (CPU) et le filtre des déjà vus (SQLite) tournent dans le threadpool,
+    sans bloquer la boucle
+  - les étapes indépendantes partent en parallèle (asyncio.gather):
+      * profil (+ embedding)  ||  historique de participations (events)
+      * lignes winkers        ||  flags de follow (si le graphe de follow n'est pas chargé)
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import (
+    CF_NEIGHBORS_PATH,
+    CF_USER_HISTORY,
+    MATERIALIZED_EVENTS_PATH,
+    MATERIALIZED_WINKERS_PATH,
+    MMR_EVENTS_CANDIDATES,
+    MMR_EVENTS_LAMBDA,
+    MMR_WINKERS_LAMBDA,
+    VECTOR_ENGINE_ES_FALLBACK,
+    WINKERS_FOR_WINKER_LIMIT,
+    WINKERS_FOR_WINKER_RADIUS_KM,
+)
+from app.core.es import get_async_es_client
+from app.core.metrics import incr, timed
+from app.core.singleflight import body_key, coalesce_async
+from app.schemas import EventOut
+from app.api.http_cache import doc_versions, json_with_etag, not_modified_or_none
+from app.api.v1.sql.fetch_participations import fetch_participated_event_ids_async
+from app.api.v1.sql.fetch_winkers_by_ids import fetch_follow_flags_async, fetch_winkers_by_ids_async
+from app.services.event_hydration import hydrate_events_async
+from app.services.follow_graph import get_follow_graph
+from app.services.impressions import overfetch, unseen_first
+from app.services.materialized import materialized_ids
+from app.services.neighbors import get_neighbor_store
+from app.services.profiles import get_requester_profile_async, pack_vector, profile_vectors, unpack_vector
+from app.api.v1.endpoints.recommendations import (
+    ES_INDEX,
+    EVENTS_FOR_WINKER_SIZE,
+    age_from_birth_year,
+    build_events_for_winker_body,
+    build_winker_profile_text,
+    build_winkers_for_winker_body,
+    cf_scores_from_history,
+    diversified_ids,
+    events_etag,
+    events_source,
+    get_embedding,
+    has_local_event_source,
+    hit_ids,
+    hit_scores,
+    local_event_candidates,
+    local_event_ids,
+    parse_geo,
+    rank_winker_hits,
+    serialize_winkers,
+    social_candidates,
+)
+
+router = APIRouter()
+
+async def _requester(user_id: int) -> Dict[str, Any]:
+    winker = await get_requester_profile_async(user_id)
+    if winker is None:
+        raise HTTPException(status_code=404, detail="Profil introuvable")
+    return winker
+
+
+async def _profile_and_vector(user_id: int, empty_detail: str) -> Tuple[Dict[str, Any], List[float]]:
+    """Profil + embedding (vecteur en cache réutilisé tant que le texte du profil est inchangé)."""
+    winker = await _requester(user_id)
+    cached = profile_vectors.get(user_id)
+
+    profile_text = build_winker_profile_text(winker)
+    if not profile_text:
+        raise HTTPException(status_code=400, detail=empty_detail)
+
+    if cached and cached[0] == profile_text:
+        return winker, unpack_vector(cached[1])
+
+    with timed("embed.profile"):
+        qvec = await run_in_threadpool(get_embedding, profile_text)
+    if not qvec:
+        raise HTTPException(status_code=500, detail="Impossible de générer l'embedding du profil.")
+
+    profile_vectors.set(user_id, (profile_text, pack_vector(qvec)))
+    return winker, qvec
+
+
+async def _participation_history(user_id: int) -> List[int]:
+    if not get_neighbor_store(CF_NEIGHBORS_PATH).is_loaded():
+        return []
+    return await fetch_participated_event_ids_async(user_id, CF_USER_HISTORY)
+
+
+async def _live_event_ids(user_id: int) -> Tuple[List[int], List[Dict[str, Any]]]:
+    # historique de participations en parallèle du profil / de l'embedding
+    (winker, qvec), history = await asyncio.gather(
+        _profile_and_vector(user_id, "Profil trop vide pour recommander des events."),
+        _participation_history(user_id),
+    )
+
+    user_geo = parse_geo(winker)
+    diversify = MMR_EVENTS_LAMBDA < 1.0
+    size = overfetch(EVENTS_FOR_WINKER_SIZE)
+    # pools par tuile / moteur vectoriel (produits NumPy, libèrent le GIL): dans le threadpool,
+    # seulement si l'un des deux est configuré (sinon pas de saut de thread pour rien)
+    candidate_ids: Optional[List[int]] = None
+    if has_local_event_source("events_for_winker", user_geo):
+        candidate_ids = await run_in_threadpool(local_event_candidates, "events_for_winker", qvec, user_geo, size)
+    hits: List[Dict[str, Any]] = []
+
+    if candidate_ids is None:
+        body = build_events_for_winker_body(
+            user_id,
+            qvec,
+            user_geo,
+            cf_scores_from_history(history),
+            size=max(size, MMR_EVENTS_CANDIDATES) if diversify else size,
+            with_vectors=diversify,
+        )
+        try:
+            with timed("es.search.events_for_winker_async"):
+                resp = await coalesce_async(
+                    "es.reco_events", body_key(body), lambda: get_async_es_client().search(index=ES_INDEX, body=body)
+                )
+            hits = resp.get("hits", {}).get("hits", [])
+            candidate_ids = hit_ids(hits)
+        except Exception:
+            if VECTOR_ENGINE_ES_FALLBACK:
+                candidate_ids = await run_in_threadpool(local_event_ids, qvec, user_geo, size)
+            if candidate_ids is None:
+                raise
+            incr("vector_engine.es_fallback.events_for_winker_async")
+
+    if diversify and hits:  # chemin local: pas de vecteurs, ordre inchangé
+        candidate_ids = diversified_ids(hit_scores(hits), hits, MMR_EVENTS_LAMBDA, k=size)
+    ids = await run_in_threadpool(unseen_first, user_id, "events", candidate_ids, keep=EVENTS_FOR_WINKER_SIZE)
+    return ids, hits
+
+
+async def _event_versions(event_ids: List[int], hits: List[Dict[str, Any]]) -> Dict[int, str]:
+    versions = doc_versions(hits)
+    missing = [str(eid) for eid in event_ids if eid not in versions]
+    if missing:
+        with timed("es.mget.event_versions_async", ids=len(missing)):
+            resp = await get_async_es_client().mget(index=ES_INDEX, ids=missing, source=False)
+        versions.update(doc_versions(resp.get("docs", [])))
+    return versions
+
+
+@router.get("/get_events_for_winker/{user_id}", response_model=List[EventOut])
+async def get_events_for_winker_async(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+):
+    hits: List[Dict[str, Any]] = []
+    event_ids = materialized_ids(MATERIALIZED_EVENTS_PATH, "events", user_id)
+    source = events_source(event_ids is not None)
+    if event_ids is not None:
+        event_ids = await run_in_threadpool(unseen_first, user_id, "events", event_ids, keep=EVENTS_FOR_WINKER_SIZE)
+    else:
+        event_ids, hits = await _live_event_ids(user_id)
+
+    # même ETag / 304 que la version sync, vérifié avant l'hydratation
+    try:
+        etag: Optional[str] = events_etag(user_id, event_ids, source, await _event_versions(event_ids, hits))
+    except Exception:
+        incr("http.events_for_winker.etag_unavailable")
+        etag = None
+    not_modified = not_modified_or_none("events_for_winker", if_none_match, etag)
+    if not_modified is not None:
+        return not_modified
+
+    events = await hydrate_events_async(event_ids, hits) if event_ids else []
+    payload = [EventOut.model_validate(e).model_dump(mode="json") for e in events]
+    return json_with_etag(payload, etag)
+
+
+async def _winker_rows(user_id: int, winker_ids: List[int]) -> List[Dict[str, Any]]:
+    """Winkers hydratés (ordre ES) + flags de follow."""
+    graph = get_follow_graph()
+    with timed("db.hydrate.winkers_async", ids=len(winker_ids)):
+        if graph is not None:
+            # flags lus dans le graphe en mémoire: une seule requête SQL
+            rows = await fetch_winkers_by_ids_async(winker_ids)
+            following_ids, follow_back_ids = graph.follow_flags(user_id, winker_ids)
+        else:
+            # 2 connexions du pool en parallèle: latence = la plus lente des deux requêtes
+            rows, (following_ids, follow_back_ids) = await asyncio.gather(
+                fetch_winkers_by_ids_async(winker_ids),
+                fetch_follow_flags_async(user_id, winker_ids),
+            )
+
+    for w in rows:
+        w["isFollowing"] = w.get("id") in following_ids
+        w["isFollowBack"] = w.get("id") in follow_back_ids
+    return rows
+
+
+async def _materialized_winkers(user_id: int) -> Optional[List[Dict[str, Any]]]:
+    winker_ids = materialized_ids(MATERIALIZED_WINKERS_PATH, "winkers", user_id)
+    if winker_ids is None:
+        return None
+    user_geo = parse_geo(await _requester(user_id))
+    if not user_geo:
+        return None
+    winker_ids = await run_in_threadpool(unseen_first, user_id, "winkers", winker_ids, keep=WINKERS_FOR_WINKER_LIMIT)
+    rows = await _winker_rows(user_id, winker_ids)
+    return serialize_winkers(rows, user_geo, social_candidates(user_id))
+
+
+@router.get("/get_winkers_for_winker/{user_id}")
+async def get_winkers_for_winker_async(
+    user_id: int,
+    limit: int = Query(WINKERS_FOR_WINKER_LIMIT, ge=1, le=50),
+    radius_km: int = Query(WINKERS_FOR_WINKER_RADIUS_KM, ge=1, le=300),
+    debug: bool = Query(False),
+) -> List[Dict[str, Any]]:
+    if not debug and limit == WINKERS_FOR_WINKER_LIMIT and radius_km == WINKERS_FOR_WINKER_RADIUS_KM:
+        served = await _materialized_winkers(user_id)
+        if served is not None:
+            return served
+
+    winker, qvec = await _profile_and_vector(user_id, "Profil trop vide pour recommander des winkers.")
+
+    user_geo = parse_geo(winker)
+    if not user_geo:
+        raise HTTPException(status_code=400, detail="Pas de localisation (lat/lon) sur le profil winker.")
+
+    user_age = age_from_birth_year(winker.get("birthYear"))
+    mutual_counts = social_candidates(user_id)
+    diversify = MMR_WINKERS_LAMBDA < 1.0
+    body = build_winkers_for_winker_body(
+        user_id, qvec, user_geo, user_age, overfetch(limit), radius_km, mutual_counts, with_vectors=diversify
+    )
+
+    with timed("es.search.winkers_for_winker_async"):
+        resp = await coalesce_async(
+            "es.reco_winkers", body_key(body), lambda: get_async_es_client().search(index="nisu_winkers", body=body)
+        )
+    hits = resp.get("hits", {}).get("hits", [])
+    ranked, breakdown = rank_winker_hits(hits, user_geo, user_age, explain=debug)
+    ranked_ids = diversified_ids(ranked, hits, MMR_WINKERS_LAMBDA, k=overfetch(limit))
+    winker_ids = await run_in_threadpool(unseen_first, user_id, "winkers", ranked_ids, keep=limit)
+    if not winker_ids:
+        return []
+
+    rows = await _winker_rows(user_id, winker_ids)
+    return serialize_winkers(rows, user_geo, mutual_counts, breakdown if debug else None)
@@ -0,0 +1,215 @@
+"""
+Recos d'events pour beaucoup de winkers d'un coup (push / digests mail).
+
+Par paquet de `chunk_size` winkers, au lieu de N x (profil + encode + search + SQL) :
+  - profils chargés en une requête, hors des caches interactifs
+  - profils non encodés (ou modifiés) encodés en un seul batch (cache batch séparé)
+  - une requête _msearch ES pour tout le paquet
+  - une hydratation (cache / SQL) pour l'union des events trouvés
+Résultats streamés en NDJSON: une ligne par winker, dans l'ordre de la demande.
+"""
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.core.config import (
+    BATCH_RECO_CHUNK_SIZE,
+    BATCH_RECO_MAX_USERS,
+    CF_NEIGHBORS_PATH,
+    CF_USER_HISTORY,
+    MMR_EVENTS_CANDIDATES,
+    MMR_EVENTS_LAMBDA,
+)
+from app.core.metrics import incr, timed
+from app.embeddings.service import embed_texts
+from app.schemas import EventOut
+from app.api.v1.sql.fetch_participations import fetch_participated_event_ids_many
+from app.services.event_hydration import hydrate_events
+from app.services.impressions import overfetch, unseen_first
+from app.services.neighbors import get_neighbor_store
+from app.services.profiles import batch_profile_vectors, get_requester_profiles, pack_vector, unpack_vector
+from app.api.v1.endpoints.recommendations import (
+    ES_INDEX,
+    EVENTS_FOR_WINKER_SIZE,
+    build_events_for_winker_body,
+    build_winker_profile_text,
+    cf_scores_from_history,
+    diversified_ids,
+    get_es,
+    hit_scores,
+    parse_geo,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class BatchEventsRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=BATCH_RECO_MAX_USERS)
+    chunk_size: int = Field(BATCH_RECO_CHUNK_SIZE, ge=1, le=1000)
+
+
+def _profile_vectors(profiles: Dict[int, Dict[str, Any]]) -> Dict[int, List[float]]:
+    """user_id -> vecteur; seuls les profils absents du cache batch (ou modifiés) sont encodés."""
+    texts = {uid: build_winker_profile_text(p) for uid, p in profiles.items()}
+    texts = {uid: t for uid, t in texts.items() if t}
+
+    vectors: Dict[int, List[float]] = {}
+    for uid, cached in batch_profile_vectors.get_many(texts.keys()).items():
+        if cached and cached[0] == texts[uid]:
+            vectors[uid] = unpack_vector(cached[1])
+
+    incr("batch.embed.cached", len(vectors))
+    todo = [uid for uid in texts if uid not in vectors]
+    if todo:
+        with timed("embed.profiles_batch", n=len(todo)):
+            embeddings = embed_texts([texts[uid] for uid in todo])
+        for uid, vec in zip(todo, embeddings):
+            if vec:
+                vectors[uid] = vec
+                batch_profile_vectors.set(uid, (texts[uid], pack_vector(vec)))
+    return vectors
+
+
+def load_profiles_and_vectors(user_ids: List[int]) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, List[float]]]:
+    with timed("batch.profiles", n=len(user_ids)):
+        profiles = get_requester_profiles(user_ids)
+    return profiles, _profile_vectors(profiles)
+
+
+def msearch_per_user(
+    index: str,
+    bodies: Dict[int, Dict[str, Any]],
+    metric: str,
+) -> Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, Any]]:
+    """Un _msearch pour toutes les requêtes -> (hits par user, erreurs ES par user)."""
+    hits_by_user: Dict[int, List[Dict[str, Any]]] = {}
+    errors: Dict[int, Any] = {}
+    if not bodies:
+        return hits_by_user, errors
+
+    searches: List[Dict[str, Any]] = []
+    for body in bodies.values():
+        searches.extend([{"index": index}, body])
+
+    with timed(metric, n=len(bodies)):
+        resp = get_es().msearch(searches=searches)
+    for uid, item in zip(bodies, resp.get("responses", [])):
+        if item.get("error"):
+            errors[uid] = item["error"]
+        else:
+            hits_by_user[uid] = item.get("hits", {}).get("hits", [])
+    return hits_by_user, errors
+
+
+def search_events_for_users(
+    user_ids: List[int],
+    profiles: Dict[int, Dict[str, Any]],
+    vectors: Dict[int, List[float]],
+    size: int = EVENTS_FOR_WINKER_SIZE,
+    with_vectors: bool = False,
+) -> Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, Any]]:
+    """Requête de get_events_for_winker pour chaque user encodé, en un seul _msearch."""
+    histories: Dict[int, List[int]] = {}
+    if get_neighbor_store(CF_NEIGHBORS_PATH).is_loaded():
+        with timed("batch.participations", n=len(vectors)):
+            histories = fetch_participated_event_ids_many(list(vectors), CF_USER_HISTORY)
+
+    bodies = {
+        uid: build_events_for_winker_body(
+            uid,
+            vectors[uid],
+            parse_geo(profiles[uid]),
+            cf_scores_from_history(histories.get(uid, [])),
+            size=size,
+            with_vectors=with_vectors,
+        )
+        for uid in user_ids
+        if uid in vectors
+    }
+    return msearch_per_user(ES_INDEX, bodies, "es.msearch.events_for_winkers")
+
+
+def _events_for_chunk(user_ids: List[int]) -> List[Dict[str, Any]]:
+    """Une ligne de résultat par user_id (ordre conservé)."""
+    profiles, vectors = load_profiles_and_vectors(user_ids)
+    diversify = MMR_EVENTS_LAMBDA < 1.0
+    size = overfetch(EVENTS_FOR_WINKER_SIZE)
+    hits_by_user, errors = search_events_for_users(
+        user_ids,
+        profiles,
+        vectors,
+        size=max(size, MMR_EVENTS_CANDIDATES) if diversify else size,
+        with_vectors=diversify,
+    )
+    # MMR comme en live, puis déjà vus écartés par user avant l'hydratation
+    ids_by_user = {
+        uid: unseen_first(
+            uid,
+            "events",
+            diversified_ids(hit_scores(hits), hits, MMR_EVENTS_LAMBDA, k=size),
+            keep=EVENTS_FOR_WINKER_SIZE,
+        )
+        for uid, hits in hits_by_user.items()
+    }
+
+    # une seule hydratation pour l'union des events du paquet
+    all_hits = [h for hits in hits_by_user.values() for h in hits]
+    all_ids = list(dict.fromkeys(i for ids in ids_by_user.values() for i in ids))
+    events_by_id = {e.get("id"): e for e in hydrate_events(all_ids, all_hits)}
+
+    lines: List[Dict[str, Any]] = []
+    for uid in user_ids:
+        if uid not in profiles:
+            lines.append({"user_id": uid, "error": "Profil introuvable"})
+        elif uid not in vectors:
+            lines.append({"user_id": uid, "error": "Profil trop vide pour recommander des events."})
+        elif uid in errors:
+            lines.append({"user_id": uid, "error": {"elasticsearch_error": errors[uid]}})
+        else:
+            events = [events_by_id[eid] for eid in ids_by_user.get(uid, []) if eid in events_by_id]
+            lines.append({
+                "user_id": uid,
+                "events": [EventOut.model_validate(e).model_dump(mode="json") for e in events],
+            })
+    return lines
+
+
+def iter_events_for_winkers(user_ids: List[int], chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Générateur commun à l'endpoint et au CLI (app/jobs/digest_recommendations.py)."""
+    chunk_size = chunk_size or BATCH_RECO_CHUNK_SIZE
+    ordered = list(dict.fromkeys(int(uid) for uid in user_ids))
+    for start in range(0, len(ordered), chunk_size):
+        chunk = ordered[start:start + chunk_size]
+        try:
+            with timed("batch.events_for_winkers.chunk", n=len(chunk)):
+                lines = _events_for_chunk(chunk)
+        except Exception as e:
+            # le statut 200 est déjà parti: une ligne d'erreur par winker du paquet, on continue
+            incr("batch.events_for_winkers.chunk_errors")
+            logger.exception("batch chunk failed (%d users)", len(chunk))
+            lines = [{"user_id": uid, "error": str(e)} for uid in chunk]
+        incr("batch.events_for_winkers.users", len(chunk))
+        yield from lines
+
+
+def to_ndjson(lines: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for line in lines:
+        yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+
+
+@router.post("/events_for_winkers")
+def events_for_winkers(req: BatchEventsRequest):
+    """
+    Même reco que /recommendations/get_events_for_winker/{user_id}, pour une liste
+    de winkers. Réponse NDJSON: {"user_id": ..., "events": [...]} ou {"user_id": ..., "error": ...}.
+    """
+    return StreamingResponse(
+        to_ndjson(iter_events_for_winkers(req.user_ids, req.chunk_size)),
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,137 @@
+"""
+Feed infini de recommandations (events / winkers), paginé par curseur opaque.
+
+La 1re page calcule une liste classée large (une seule recherche kNN + rescore)
+et l'enregistre en session (app/services/feed_sessions.py). Les pages suivantes
+ne font qu'un découpage de la liste (déjà vus sautés) + l'hydratation des ids de la page.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.config import FEED_EVENT_CANDIDATES, FEED_WINKER_CANDIDATES, WINKERS_FOR_WINKER_RADIUS_KM
+from app.core.metrics import incr, timed
+from app.schemas import EventOut
+from app.services.event_hydration import hydrate_events
+from app.services.feed_sessions import InvalidCursor, create_session, decode_cursor, encode_cursor, get_session
+from app.services.impressions import unseen_page
+from app.api.v1.endpoints.recommendations import (
+    age_from_birth_year,
+    build_winkers_for_winker_body,
+    fetch_winkers_for_reco,
+    get_es,
+    parse_geo,
+    rank_winker_hits,
+    requester_profile_and_vector,
+    search_event_ids,
+    serialize_winkers,
+    social_candidates,
+)
+
+router = APIRouter()
+
+Ranker = Callable[[int], Tuple[List[int], Dict[str, Any]]]
+
+
+def _rank_events(user_id: int) -> Tuple[List[int], Dict[str, Any]]:
+    winker, qvec = requester_profile_and_vector(user_id, "Profil trop vide pour recommander des events.")
+    event_ids, _ = search_event_ids("feed_events", user_id, qvec, parse_geo(winker), FEED_EVENT_CANDIDATES)
+    return event_ids, {}
+
+
+def _winkers_ranker(radius_km: int) -> Ranker:
+    def rank(user_id: int) -> Tuple[List[int], Dict[str, Any]]:
+        winker, qvec = requester_profile_and_vector(user_id, "Profil trop vide pour recommander des winkers.")
+        user_geo = parse_geo(winker)
+        if not user_geo:
+            raise HTTPException(status_code=400, detail="Pas de localisation (lat/lon) sur le profil winker.")
+
+        mutual_counts = social_candidates(user_id)
+        user_age = age_from_birth_year(winker.get("birthYear"))
+        body = build_winkers_for_winker_body(
+            user_id,
+            qvec,
+            user_geo,
+            user_age,
+            FEED_WINKER_CANDIDATES,
+            radius_km,
+            mutual_counts,
+        )
+        with timed("es.search.feed_winkers"):
+            resp = get_es().search(index="nisu_winkers", body=body)
+        ranked, _ = rank_winker_hits(resp.get("hits", {}).get("hits", []), user_geo, user_age)
+        return [wid for wid, _ in ranked], {"user_geo": user_geo, "mutual_counts": mutual_counts}
+
+    return rank
+
+
+def _impressions_kind(kind: str) -> str:
+    """"winkers:<rayon>" -> "winkers" (filtre des déjà vus par type d'item)."""
+    return kind.split(":", 1)[0]
+
+
+def _page(user_id: int, kind: str, cursor: Optional[str], page_size: int, rank: Ranker) -> Tuple[Dict[str, Any], List[int], Optional[str]]:
+    """-> (session, ids de la page, curseur suivant ou None)."""
+    session = None
+    offset = 0
+    if cursor:
+        try:
+            parsed = decode_cursor(cursor, user_id, kind)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        offset = parsed["o"]
+        session = get_session(parsed["s"], user_id, kind)
+        if session is None:
+            # session expirée / autre worker: liste brute recalculée (ranking stable sur
+            # la journée), l'offset y garde donc sa position
+            incr("feed.session.rebuilt")
+            ids, context = rank(user_id)
+            session = create_session(user_id, kind, ids, context, session_id=parsed["s"])
+        else:
+            incr("feed.session.hit")
+    else:
+        incr("feed.session.created")
+        ids, context = rank(user_id)
+        session = create_session(user_id, kind, ids, context)
+
+    ids = session["ids"]
+    # déjà vus filtrés ici et pas à la création: le filtre évolue pendant la session
+    page_ids, next_offset = unseen_page(user_id, _impressions_kind(kind), ids, offset, page_size)
+    next_cursor = encode_cursor(session["id"], user_id, kind, next_offset) if next_offset < len(ids) else None
+    return session, page_ids, next_cursor
+
+
+@router.get("/events/{user_id}")
+def events_feed(
+    user_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor de la page précédente"),
+    page_size: int = Query(10, ge=1, le=50),
+) -> Dict[str, Any]:
+    _, page_ids, next_cursor = _page(user_id, "events", cursor, page_size, _rank_events)
+    events = hydrate_events(page_ids)
+    return {
+        "items": [EventOut.model_validate(e) for e in events],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/winkers/{user_id}")
+def winkers_feed(
+    user_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor de la page précédente"),
+    page_size: int = Query(12, ge=1, le=50),
+    radius_km: int = Query(WINKERS_FOR_WINKER_RADIUS_KM, ge=1, le=300),
+) -> Dict[str, Any]:
+    # le rayon fait partie du feed: un curseur n'est valable que pour le même rayon
+    kind = f"winkers:{radius_km}"
+    session, page_ids, next_cursor = _page(user_id, kind, cursor, page_size, _winkers_ranker(radius_km))
+    if not page_ids:
+        return {"items": [], "next_cursor": None}
+
+    context = session["context"]
+    with timed("db.hydrate.winkers", ids=len(page_ids)):
+        rows = fetch_winkers_for_reco(user_id, page_ids)
+    return {
+        "items": serialize_winkers(rows, context["user_geo"], context.get("mutual_counts")),
+        "next_cursor": next_cursor,
+    }
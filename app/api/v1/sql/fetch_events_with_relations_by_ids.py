@@ -1,4 +1,5 @@
-from app.core.db import *
+from psycopg.rows import dict_row
+from app.core.db import get_async_read_conn, get_read_conn
 
 FETCH_EVENTS_SQL = """
 WITH input_ids AS (
@@ -49,7 +50,22 @@ SELECT
     e."nb_conversations",
     e."nbStories",
 
-    to_jsonb(cw.*) AS "creatorWinker",
+    -- créateur projeté sur WinkerOut (au lieu de to_jsonb(cw.*))
+    CASE WHEN cw.id IS NULL THEN NULL ELSE jsonb_build_object(
+        'id', cw.id,
+        'username', cw.username,
+        'email', cw.email,
+        'photoProfil', cw."photoProfil",
+        'sexe', cw.sexe,
+        'city', cw.city,
+        'region', cw.region,
+        'subregion', cw.subregion,
+        'pays', cw.pays,
+        'codePostal', cw."codePostal",
+        'lon', cw.lon,
+        'lat', cw.lat,
+        'currentLangue', cw."currentLangue"
+    ) END AS "creatorWinker",
     '[]'::jsonb AS participants,
 
     COALESCE(
@@ -80,11 +96,20 @@ def fetch_events_with_relations_by_ids(event_ids: list[int]) -> list[dict]:
     if not event_ids:
         return []
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(FETCH_EVENTS_SQL, (event_ids,))
-            columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
+    # prepare=True: plus de re-parse/re-plan du multi-join à chaque appel (connexions du pool)
+    # binary=True: jsonb / numériques décodés sans passer par le texte
+    with get_read_conn() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(FETCH_EVENTS_SQL, (event_ids,), prepare=True, binary=True)
+            return cur.fetchall()
 
-    return [dict(zip(columns, row)) for row in rows]
 
+
+async def fetch_events_with_relations_by_ids_async(event_ids: list[int]) -> list[dict]:
+    if not event_ids:
+        return []
+
+    async with get_async_read_conn() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(FETCH_EVENTS_SQL, (event_ids,), prepare=True, binary=True)
+            return await cur.fetchall()
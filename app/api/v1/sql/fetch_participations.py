@@ -0,0 +1,54 @@
+from typing import Dict, List
+from app.core.db import get_async_read_conn, get_read_conn
+
+# Derniers events auxquels le winker a participé (historique pour le filtrage collaboratif)
+FETCH_PARTICIPATED_EVENT_IDS_SQL = """
+SELECT p.event_id
+FROM profil_participeWinker p
+WHERE p."participeWinker_id" = %s
+  AND p.event_id IS NOT NULL
+ORDER BY p.id DESC
+LIMIT %s
+"""
+
+FETCH_PARTICIPATED_EVENT_IDS_MANY_SQL = """
+SELECT user_id, event_id
+FROM (
+    SELECT
+        p."participeWinker_id" AS user_id,
+        p.event_id,
+        row_number() OVER (PARTITION BY p."participeWinker_id" ORDER BY p.id DESC) AS rn
+    FROM profil_participeWinker p
+    WHERE p."participeWinker_id" = ANY(%s)
+      AND p.event_id IS NOT NULL
+) t
+WHERE t.rn <= %s
+ORDER BY t.user_id, t.rn
+"""
+
+
+def fetch_participated_event_ids(user_id: int, limit: int) -> List[int]:
+    with get_read_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(FETCH_PARTICIPATED_EVENT_IDS_SQL, (user_id, limit), prepare=True)
+            return [row[0] for row in cur.fetchall()]
+
+
+async def fetch_participated_event_ids_async(user_id: int, limit: int) -> List[int]:
+    async with get_async_read_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(FETCH_PARTICIPATED_EVENT_IDS_SQL, (user_id, limit), prepare=True)
+            return [row[0] for row in await cur.fetchall()]
+
+
+def fetch_participated_event_ids_many(user_ids: List[int], limit: int) -> Dict[int, List[int]]:
+    """Historique de plusieurs winkers en une requête: user_id -> [event_id] (plus récent d'abord)."""
+    if not user_ids:
+        return {}
+    out: Dict[int, List[int]] = {}
+    with get_read_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(FETCH_PARTICIPATED_EVENT_IDS_MANY_SQL, (list(user_ids), limit), prepare=True)
+            for user_id, event_id in cur.fetchall():
+                out.setdefault(user_id, []).append(event_id)
+    return out
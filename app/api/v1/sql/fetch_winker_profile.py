@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, Tuple
+from psycopg.rows import dict_row
+from app.core.db import get_async_read_conn, get_read_conn
+
+# Seuls les champs utilisés par le texte de profil et le ranking (geo, âge)
+WINKER_PROFILE_COLUMNS = """
+    w.id,
+    w.bio,
+    w.city,
+    w.region,
+    w.subregion,
+    w.lat,
+    w.lon,
+    w."birthYear",
+    w."derniereRechercheEvent"
+"""
+
+# Ligne complète, pour la route publique /get_rencontre_from_winker (contrat client inchangé)
+FETCH_WINKER_ROW_SQL = "SELECT * FROM profil_winker WHERE id = %s"
+
+# xmin change à chaque UPDATE de la ligne => version gratuite pour le cache
+FETCH_REQUESTER_PROFILE_SQL = f"""
+SELECT {WINKER_PROFILE_COLUMNS}, w.xmin::text AS "_version"
+FROM profil_winker w
+WHERE w.id = %s
+"""
+
+FETCH_REQUESTER_PROFILES_SQL = f"""
+SELECT {WINKER_PROFILE_COLUMNS}, w.xmin::text AS "_version"
+FROM profil_winker w
+WHERE w.id = ANY(%s)
+"""
+
+FETCH_WINKER_PROFILE_VERSION_SQL = """
+SELECT w.xmin::text
+FROM profil_winker w
+WHERE w.id = %s
+"""
+
+
+def fetch_winker_row(user_id: int) -> Optional[Dict[str, Any]]:
+    """Ligne profil_winker complète (toutes les colonnes), None si absente."""
+    with get_read_conn() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(FETCH_WINKER_ROW_SQL, (user_id,))
+            return cur.fetchone()
+
+
+def fetch_requester_profile(user_id: int) -> Optional[Tuple[Dict[str, Any], str]]:
+    """(profil projeté, version de la ligne) ou None."""
+    with get_read_conn() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(FETCH_REQUESTER_PROFILE_SQL, (user_id,), prepare=True)
+            row = cur.fetchone()
+    if row is None:
+        return None
+    version = row.pop("_version")
+    return row, version
+
+
+def fetch_requester_profiles(user_ids: List[int]) -> Dict[int, Tuple[Dict[str, Any], str]]:
+    """Version bulk de fetch_requester_profile: id -> (profil projeté, version). Ids absents omis."""
+    if not user_ids:
+        return {}
+    with get_read_conn() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(FETCH_REQUESTER_PROFILES_SQL, (list(user_ids),), prepare=True)
+            rows = cur.fetchall()
+    out: Dict[int, Tuple[Dict[str, Any], str]] = {}
+    for row in rows:
+        version = row.pop("_version")
+        out[row["id"]] = (row, version)
+    return out
+
+
+def fetch_winker_profile_version(user_id: int) -> Optional[str]:
+    with get_read_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(FETCH_WINKER_PROFILE_VERSION_SQL, (user_id,), prepare=True)
+            row = cur.fetchone()
+    return row[0] if row else None
+
+
+async def fetch_requester_profile_async(user_id: int) -> Optional[Tuple[Dict[str, Any], str]]:
+    async with get_async_read_conn() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(FETCH_REQUESTER_PROFILE_SQL, (user_id,), prepare=True)
+            row = await cur.fetchone()
+    if row is None:
+        return None
+    version = row.pop("_version")
+    return row, version
+
+
+async def fetch_winker_profile_version_async(user_id: int) -> Optional[str]:
+    async with get_async_read_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(FETCH_WINKER_PROFILE_VERSION_SQL, (user_id,), prepare=True)
+            row = await cur.fetchone()
+    return row[0] if row else None
@@ -1,18 +1,47 @@
-from typing import Any, Dict, List, Sequence
-from app.core.db import *
+from typing import Any, Dict, List, Sequence, Set, Tuple
+from psycopg.rows import dict_row
+from app.core.db import get_async_read_conn, get_read_conn
 
+# Colonnes renvoyées aux clients (WinkerOut + bio), au lieu de w.*
+WINKER_CARD_COLUMNS = """
+    w.id,
+    w.username,
+    w.email,
+    w."photoProfil",
+    w.sexe,
+    w.bio,
+    w.city,
+    w.region,
+    w.subregion,
+    w.pays,
+    w."codePostal",
+    w.lon,
+    w.lat,
+    w."currentLangue"
+"""
 
-def fetch_winkers_by_ids(ids: Sequence[int]) -> List[Dict[str, Any]]:
-    """
-    Récupère les winkers + leurs fichiers (profil_filesWinker) en 1 query.
-    - Préserve l'ordre des ids d'entrée
-    - Déduplique les ids
-    - Ajoute un champ 'filesWinker' = liste de fichiers [{id, image}, ...]
-    """
-    if not ids:
-        return []
+FETCH_WINKERS_BY_IDS_SQL = f"""
+SELECT
+    {WINKER_CARD_COLUMNS},
+    COALESCE(
+        json_agg(
+            json_build_object(
+                'id', f.id,
+                'image', f.image
+            )
+        ) FILTER (WHERE f.id IS NOT NULL),
+        '[]'::json
+    ) AS "filesWinker"
+FROM profil_winker w
+LEFT JOIN profil_filesWinker f
+    ON f.winker_id = w.id
+WHERE w.id = ANY(%s)
+GROUP BY w.id
+"""
 
-    # Dedup + preserve order
+
+def _dedup_ids(ids: Sequence[int]) -> List[int]:
+    """Déduplique en préservant l'ordre (ordre ES), ignore les ids non entiers."""
     seen = set()
     ordered_ids: List[int] = []
     for i in ids:
@@ -23,7 +52,21 @@ def fetch_winkers_by_ids(ids: Sequence[int]) -> List[Dict[str, Any]]:
         if ii not in seen:
             seen.add(ii)
             ordered_ids.append(ii)
+    return ordered_ids
 
+
+def fetch_winkers_by_ids(ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    Récupère les winkers + leurs fichiers (profil_filesWinker) en 1 query.
+    - Préserve l'ordre des ids d'entrée
+    - Déduplique les ids
+    - Ajoute un champ 'filesWinker' = liste de fichiers [{id, image}, ...]
+    """
+    if not ids:
+        return []
+
+    # Dedup + preserve order
+    ordered_ids = _dedup_ids(ids)
     if not ordered_ids:
         return []
 
@@ -33,75 +76,109 @@ def fetch_winkers_by_ids(ids: Sequence[int]) -> List[Dict[str, Any]]:
     # - profil_fileswinker
     # - files_winker
     # etc.
-    sql = """
-        SELECT
-            w.*,
-            COALESCE(
-                json_agg(
-                    json_build_object(
-                        'id', f.id,
-                        'image', f.image
-                    )
-                ) FILTER (WHERE f.id IS NOT NULL),
-                '[]'::json
-            ) AS "filesWinker"
-        FROM profil_winker w
-        LEFT JOIN profil_filesWinker f
-            ON f.winker_id = w.id
-        WHERE w.id = ANY(%s)
-        GROUP BY w.id
+    with get_read_conn() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(FETCH_WINKERS_BY_IDS_SQL, (ordered_ids,), prepare=True, binary=True)
+            winkers = cur.fetchall()
+
+    # Re-order to match ES order
+    by_id = {w.get("id"): w for w in winkers}
+    return [by_id[i] for i in ordered_ids if i in by_id]
+
+
+FETCH_WINKERS_WITH_FOLLOW_FLAGS_SQL = f"""
+WITH input_ids AS (
+    SELECT *
+    FROM unnest(%(ids)s::int[]) WITH ORDINALITY AS t(id, ord)
+)
+SELECT
+    {WINKER_CARD_COLUMNS},
+    COALESCE(
+        (
+            SELECT json_agg(json_build_object('id', f.id, 'image', f.image) ORDER BY f.id)
+            FROM profil_filesWinker f
+            WHERE f.winker_id = w.id
+        ),
+        '[]'::json
+    ) AS "filesWinker",
+    -- user_id suit w  (Friends(winker=target, friends=follower))
+    EXISTS (
+        SELECT 1 FROM profil_friends pf
+        WHERE pf.friends_id = %(user_id)s AND pf.winker_id = w.id
+    ) AS "isFollowing",
+    -- w suit user_id
+    EXISTS (
+        SELECT 1 FROM profil_friends pf
+        WHERE pf.winker_id = %(user_id)s AND pf.friends_id = w.id
+    ) AS "isFollowBack"
+FROM input_ids i
+JOIN profil_winker w ON w.id = i.id
+ORDER BY i.ord
+"""
+
+
+def fetch_winkers_with_follow_flags(user_id: int, ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    Hydratation complète des winkers recommandés en 1 seul aller-retour:
+    lignes winker + 'filesWinker' + 'isFollowing' / 'isFollowBack' vis-à-vis de user_id.
+    - Préserve l'ordre des ids d'entrée (ordre ES)
+    - Déduplique les ids
     """
+    ordered_ids = _dedup_ids(ids)
+    if not ordered_ids:
+        return []
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (ordered_ids,))
-            rows = cur.fetchall()
-            cols = [desc[0] for desc in cur.description]
+    # prepare=True: plan préparé côté serveur, réutilisé par la connexion du pool
+    with get_read_conn() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                FETCH_WINKERS_WITH_FOLLOW_FLAGS_SQL,
+                {"ids": ordered_ids, "user_id": user_id},
+                prepare=True,
+                binary=True,
+            )
+            return cur.fetchall()
 
-    winkers = [dict(zip(cols, row)) for row in rows]
 
-    # Re-order to match ES order
+async def fetch_winkers_by_ids_async(ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """Version async de fetch_winkers_by_ids (même SQL, ordre des ids préservé)."""
+    ordered_ids = _dedup_ids(ids)
+    if not ordered_ids:
+        return []
+
+    async with get_async_read_conn() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(FETCH_WINKERS_BY_IDS_SQL, (ordered_ids,), prepare=True, binary=True)
+            winkers = await cur.fetchall()
+
     by_id = {w.get("id"): w for w in winkers}
     return [by_id[i] for i in ordered_ids if i in by_id]
 
 
+FETCH_FOLLOW_FLAGS_SQL = """
+SELECT
+    COALESCE(array_agg(winker_id) FILTER (WHERE friends_id = %(user_id)s), '{}') AS following,
+    COALESCE(array_agg(friends_id) FILTER (WHERE winker_id = %(user_id)s), '{}') AS follow_back
+FROM profil_friends
+WHERE (friends_id = %(user_id)s AND winker_id = ANY(%(ids)s))
+   OR (winker_id = %(user_id)s AND friends_id = ANY(%(ids)s))
+"""
 
-from typing import Set, Tuple
 
-def fetch_follow_flags(user_id: int, target_ids: List[int]) -> Tuple[Set[int], Set[int]]:
+async def fetch_follow_flags_async(user_id: int, target_ids: List[int]) -> Tuple[Set[int], Set[int]]:
     """
-    Retourne:
+    Retourne, en une requête:
       - following: ids que user_id suit
       - follow_back: ids qui suivent user_id
-    Modèle Django: Friends(winker=target, friends=follower) :contentReference[oaicite:1]{index=1}
+    Modèle Django: Friends(winker=target, friends=follower)
     """
     if not target_ids:
         return set(), set()
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            # user_id -> target (user suit target)
-            cur.execute(
-                """
-                SELECT winker_id
-                FROM profil_friends
-                WHERE friends_id = %s
-                  AND winker_id = ANY(%s)
-                """,
-                (user_id, target_ids),
-            )
-            following = {row[0] for row in cur.fetchall()}
-
-            # target -> user_id (target suit user)
-            cur.execute(
-                """
-                SELECT friends_id
-                FROM profil_friends
-                WHERE winker_id = %s
-                  AND friends_id = ANY(%s)
-                """,
-                (user_id, target_ids),
-            )
-            follow_back = {row[0] for row in cur.fetchall()}
+    async with get_async_read_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(FETCH_FOLLOW_FLAGS_SQL, {"user_id": user_id, "ids": list(target_ids)}, prepare=True)
+            row = await cur.fetchone()
 
-    return following, follow_back
+    following, follow_back = row if row else ([], [])
+    return set(following or []), set(follow_back or [])
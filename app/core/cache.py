@@ -0,0 +1,107 @@
+# app/core/cache.py
+"""
+Cache mémoire borné (LRU) avec TTL par entrée, thread-safe.
+Local au worker: l'invalidation ne traverse pas les process, le TTL sert de filet.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl_s: float):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl_s = float(ttl_s)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_locked(self, key: Hashable, now: float) -> Tuple[bool, Any]:
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+        expires_at, value = item
+        if expires_at < now:
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            found, value = self._get_locked(key, now)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        now = time.monotonic()
+        out: Dict[Hashable, Any] = {}
+        with self._lock:
+            for key in keys:
+                found, value = self._get_locked(key, now)
+                if found:
+                    self.hits += 1
+                    out[key] = value
+                else:
+                    self.misses += 1
+        return out
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl_s if ttl_s is None else ttl_s)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set_many(self, items: Dict[Hashable, Any], ttl_s: Optional[float] = None) -> None:
+        for key, value in items.items():
+            self.set(key, value, ttl_s=ttl_s)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys: Iterable[Hashable]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+_registry: Dict[str, TTLCache] = {}
+
+
+def register_cache(name: str, cache: TTLCache) -> TTLCache:
+    """Rend le cache visible dans les diagnostics (hit ratio, taille)."""
+    _registry[name] = cache
+    return cache
+
+
+def caches_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _registry.items()}
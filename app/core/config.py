@@ -11,4 +11,153 @@ USERS_INDEX = "nisu_users"
 INDEX_WINKERS = "nisu_winkers"
 INDEX_EVENTS = "nisu_events"
 EVENTS_INDEX = "nisu_events"
-INDEX_CONVERSATIONS = "nisu_conversations"
\ No newline at end of file
+INDEX_CONVERSATIONS = "nisu_conversations"
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Mode dénormalisé: la "carte" de l'event (champs EventOut + créateur + fichiers)
+# est stockée dans le document ES à l'indexation et relue via _source
+# => plus de SQL d'hydratation sur le chemin de lecture.
+EVENTS_DENORMALIZED = _env_bool("EVENTS_DENORMALIZED", False)
+EVENT_CARD_FIELD = "card"
+
+# Popularité (champ ES "boost" des events), cf. app/jobs/popularity.py
+POPULARITY_HALF_LIFE_DAYS = float(os.getenv("POPULARITY_HALF_LIFE_DAYS", "14"))
+POPULARITY_BOOST_SCALE = float(os.getenv("POPULARITY_BOOST_SCALE", "10"))
+POPULARITY_WEIGHTS = {
+    "currentNbParticipants": 1.0,
+    "nbComment": 0.5,
+    "numberView": 0.2,
+    "nbStories": 0.5,
+}
+
+# Démarrage non bloquant (app/core/readiness.py)
+STARTUP_RETRY_INITIAL_S = float(os.getenv("STARTUP_RETRY_INITIAL_S", "1"))
+STARTUP_RETRY_MAX_S = float(os.getenv("STARTUP_RETRY_MAX_S", "30"))
+WARMUP_QUERIES = int(os.getenv("WARMUP_QUERIES", "3"))
+WARMUP_EMBEDDINGS = _env_bool("WARMUP_EMBEDDINGS", True)
+
+# Routers montés par ce worker (vide = tous). Ex: API_ROUTERS=indexing pour un
+# worker d'indexation seule, qui n'importe alors pas les modules de reco.
+API_ROUTERS = [r.strip() for r in os.getenv("API_ROUTERS", "").split(",") if r.strip()]
+
+# Cache d'hydratation des events (app/services/event_hydration.py)
+EVENT_CACHE_ENABLED = _env_bool("EVENT_CACHE_ENABLED", True)
+EVENT_CACHE_MAX = int(os.getenv("EVENT_CACHE_MAX", "5000"))
+EVENT_CACHE_TTL_S = float(os.getenv("EVENT_CACHE_TTL_S", "300"))
+
+# Cache du profil demandeur (app/services/profiles.py)
+# - servi depuis la mémoire pendant PROFILE_CACHE_TTL_S
+# - ensuite revalidé par la version de la ligne (xmin), gardé au plus PROFILE_CACHE_MAX_AGE_S
+PROFILE_CACHE_MAX = int(os.getenv("PROFILE_CACHE_MAX", "20000"))
+PROFILE_CACHE_TTL_S = float(os.getenv("PROFILE_CACHE_TTL_S", "30"))
+PROFILE_CACHE_MAX_AGE_S = float(os.getenv("PROFILE_CACHE_MAX_AGE_S", "3600"))
+
+# Graphe de follow en mémoire (app/services/follow_graph.py)
+FOLLOW_GRAPH_ENABLED = _env_bool("FOLLOW_GRAPH_ENABLED", True)
+FOLLOW_GRAPH_REFRESH_S = float(os.getenv("FOLLOW_GRAPH_REFRESH_S", "30"))
+# au-delà de ce nombre d'ajouts / suppressions en attente, le delta est fusionné dans le CSR
+FOLLOW_GRAPH_DELTA_MAX = int(os.getenv("FOLLOW_GRAPH_DELTA_MAX", "50000"))
+# ids relus sous le dernier id vu à chaque refresh (lignes commitées dans le désordre)
+FOLLOW_GRAPH_REREAD_IDS = int(os.getenv("FOLLOW_GRAPH_REREAD_IDS", "1000"))
+# rechargement complet depuis PG (filet de sécurité: les unfollows sont suivis en incrémental)
+FOLLOW_GRAPH_FULL_REFRESH_S = float(os.getenv("FOLLOW_GRAPH_FULL_REFRESH_S", "3600"))
+# Candidats "amis d'amis" ajoutés aux candidats kNN de get_winkers_for_winker
+FOF_CANDIDATES = int(os.getenv("FOF_CANDIDATES", "100"))
+FOF_MAX_FANOUT = int(os.getenv("FOF_MAX_FANOUT", "500"))
+FOF_BOOST = float(os.getenv("FOF_BOOST", "1.5"))
+
+# Artefacts des jobs batch (listes de voisins .npz), cf. app/services/neighbors.py
+RECO_DATA_DIR = os.getenv("RECO_DATA_DIR", "data")
+NEIGHBORS_RELOAD_CHECK_S = float(os.getenv("NEIGHBORS_RELOAD_CHECK_S", "30"))
+
+# Filtrage collaboratif item-item par co-participation (app/jobs/coparticipation.py)
+CF_NEIGHBORS_PATH = os.path.join(RECO_DATA_DIR, "event_coparticipation.npz")
+CF_TOP_N = int(os.getenv("CF_TOP_N", "50"))
+CF_MIN_COPARTICIPATION = int(os.getenv("CF_MIN_COPARTICIPATION", "2"))
+# historique de participations du demandeur pris en compte / candidats injectés
+CF_USER_HISTORY = int(os.getenv("CF_USER_HISTORY", "50"))
+CF_CANDIDATES = int(os.getenv("CF_CANDIDATES", "50"))
+CF_BOOST = float(os.getenv("CF_BOOST", "1.5"))
+
+# "Events similaires" précalculés (app/jobs/similar_events.py)
+SIMILAR_EVENTS_PATH = os.path.join(RECO_DATA_DIR, "similar_events.npz")
+SIMILAR_EVENTS_TOP_K = int(os.getenv("SIMILAR_EVENTS_TOP_K", "20"))
+SIMILAR_EVENTS_RADIUS_KM = float(os.getenv("SIMILAR_EVENTS_RADIUS_KM", "50"))
+SIMILAR_EVENTS_MIN_SCORE = float(os.getenv("SIMILAR_EVENTS_MIN_SCORE", "0.3"))
+
+# Recos en masse (notifications / digests), cf. /recommendations/batch
+BATCH_RECO_CHUNK_SIZE = int(os.getenv("BATCH_RECO_CHUNK_SIZE", "200"))
+BATCH_RECO_MAX_USERS = int(os.getenv("BATCH_RECO_MAX_USERS", "20000"))
+# cache des vecteurs de profil propre au batch (distinct du cache des requêtes interactives)
+BATCH_PROFILE_VECTORS_MAX = int(os.getenv("BATCH_PROFILE_VECTORS_MAX", "20000"))
+
+# Recos matérialisées par user (app/jobs/materialize_recommendations.py)
+MATERIALIZED_ENABLED = _env_bool("MATERIALIZED_ENABLED", True)
+MATERIALIZED_EVENTS_PATH = os.path.join(RECO_DATA_DIR, "materialized_events.npz")
+MATERIALIZED_WINKERS_PATH = os.path.join(RECO_DATA_DIR, "materialized_winkers.npz")
+# winkers actifs (lastConnection) sur cette fenêtre
+MATERIALIZE_ACTIVE_DAYS = int(os.getenv("MATERIALIZE_ACTIVE_DAYS", "30"))
+# défauts (Query) de get_winkers_for_winker: seuls ces paramètres-là sont matérialisés
+WINKERS_FOR_WINKER_LIMIT = 12
+WINKERS_FOR_WINKER_RADIUS_KM = 30
+
+# Feed infini (app/services/feed_sessions.py): liste classée calculée une fois par session
+FEED_EVENT_CANDIDATES = int(os.getenv("FEED_EVENT_CANDIDATES", "200"))
+FEED_WINKER_CANDIDATES = int(os.getenv("FEED_WINKER_CANDIDATES", "200"))
+FEED_SESSIONS_MAX = int(os.getenv("FEED_SESSIONS_MAX", "10000"))
+FEED_SESSION_TTL_S = float(os.getenv("FEED_SESSION_TTL_S", "1800"))
+
+# Items déjà vus (app/services/impressions.py): Bloom 2 générations par user et par type
+IMPRESSIONS_ENABLED = _env_bool("IMPRESSIONS_ENABLED", True)
+IMPRESSIONS_DB_PATH = os.path.join(RECO_DATA_DIR, "impressions.sqlite3")
+# 8192 bits / 5 hash: ~1 % de faux positifs à 800 items par génération
+IMPRESSIONS_BLOOM_BITS = int(os.getenv("IMPRESSIONS_BLOOM_BITS", "8192"))
+IMPRESSIONS_BLOOM_HASHES = int(os.getenv("IMPRESSIONS_BLOOM_HASHES", "5"))
+IMPRESSIONS_ROTATE_AFTER = int(os.getenv("IMPRESSIONS_ROTATE_AFTER", "500"))
+IMPRESSIONS_CACHE_TTL_S = float(os.getenv("IMPRESSIONS_CACHE_TTL_S", "5"))
+# ES renvoie OVERFETCH x plus de candidats, filtrés ensuite en mémoire
+IMPRESSIONS_OVERFETCH = int(os.getenv("IMPRESSIONS_OVERFETCH", "3"))
+
+# Moteur vectoriel en process (app/services/vector_engine.py)
+VECTOR_SNAPSHOT_DIR = os.path.join(RECO_DATA_DIR, "event_vectors")
+# endpoints servis par le moteur local (sinon ES), ex: "events_for_winker,feed_events"
+VECTOR_ENGINE_ENDPOINTS = [e.strip() for e in os.getenv("VECTOR_ENGINE_ENDPOINTS", "").split(",") if e.strip()]
+# repli sur le moteur local quand ES est en erreur
+VECTOR_ENGINE_ES_FALLBACK = _env_bool("VECTOR_ENGINE_ES_FALLBACK", True)
+# "exact" (produits matriciels par blocs) ou "hnsw" (hnswlib si installé)
+VECTOR_ENGINE_INDEX = os.getenv("VECTOR_ENGINE_INDEX", "exact").strip().lower()
+VECTOR_ENGINE_REFRESH_S = float(os.getenv("VECTOR_ENGINE_REFRESH_S", "60"))
+
+# Re-ranking des winkers: "es" (rescore function_score côté cluster) ou "python" (app/services/reranking.py)
+RERANK_MODE = os.getenv("RERANK_MODE", "es").strip().lower()
+# poids du re-ranking python, ex: "knn:1,recency:3,geo:2,age:1.5,boost:1" (manquants = défauts)
+RERANK_WINKER_WEIGHTS = os.getenv("RERANK_WINKER_WEIGHTS", "")
+
+# Diversité MMR (app/services/diversity.py): 1.0 = pur score (désactivé), plus bas = plus divers
+MMR_EVENTS_LAMBDA = float(os.getenv("MMR_EVENTS_LAMBDA", "1.0"))
+MMR_WINKERS_LAMBDA = float(os.getenv("MMR_WINKERS_LAMBDA", "1.0"))
+# fenêtre de candidats events demandée à ES quand le MMR est actif
+MMR_EVENTS_CANDIDATES = int(os.getenv("MMR_EVENTS_CANDIDATES", "30"))
+
+# Pools de candidats events par tuile geohash (app/jobs/geo_tile_pools.py)
+GEO_POOLS_PATH = os.path.join(RECO_DATA_DIR, "event_geo_pools.npz")
+# précision geohash des tuiles (3 ~ 156 x 156 km à l'équateur)
+GEO_POOLS_PRECISION = int(os.getenv("GEO_POOLS_PRECISION", "3"))
+# endpoints servis depuis les pools (sinon moteur vectoriel / ES), ex: "events_for_winker,feed_events"
+GEO_POOLS_ENDPOINTS = [e.strip() for e in os.getenv("GEO_POOLS_ENDPOINTS", "").split(",") if e.strip()]
+# fichier plus vieux (job nocturne en échec): events récents absents des pools => repli ES
+GEO_POOLS_MAX_AGE_S = float(os.getenv("GEO_POOLS_MAX_AGE_S", str(36 * 3600)))
+
+# Single-flight (app/core/singleflight.py): un seul calcul par clé identique en cours
+SINGLEFLIGHT_ENABLED = _env_bool("SINGLEFLIGHT_ENABLED", True)
+
+# ETag / GET conditionnel des recos (app/api/http_cache.py)
+# max-age du Cache-Control des recos (0 = revalidation à chaque ouverture, 304 si inchangé)
+RECO_HTTP_MAX_AGE_S = int(os.getenv("RECO_HTTP_MAX_AGE_S", "0"))
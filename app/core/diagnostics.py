@@ -0,0 +1,165 @@
+# app/core/diagnostics.py
+"""
+Diagnostics cluster / index pour comprendre une dérive de latence des recos.
+Lecture seule (stats + mappings), réponse mise en cache pour rester
+appelable en prod sans charger le cluster.
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+from .cache import TTLCache, caches_stats
+from .config import INDEX_CONVERSATIONS, INDEX_EVENTS, INDEX_WINKERS
+from .db import pool_stats
+from .es import es_client
+from .metrics import latency_summary, recent_latencies, snapshot
+from .singleflight import singleflight_stats
+
+DIAGNOSTICS_TTL_S = 30.0
+_cache = TTLCache(maxsize=8, ttl_s=DIAGNOSTICS_TTL_S)
+
+_STATS_METRICS = "docs,store,segments,query_cache,request_cache,refresh,merge,search"
+
+# HNSW par défaut côté ES (index_options.m)
+_DEFAULT_HNSW_M = 16
+
+
+def _ratio(hits: int, misses: int) -> Optional[float]:
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def _vector_memory_estimate(num_vectors: int, prop: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Estimation off-heap (page cache) d'un champ dense_vector, formules de la doc ES:
+      float: n * dims * 4   | int8: n * (dims + 4)   | + graphe HNSW: n * 4 * m * 2
+    """
+    dims = int(prop.get("dims") or 0)
+    options = prop.get("index_options") or {}
+    kind = options.get("type") or ("hnsw" if prop.get("index", True) else "flat")
+    m = int(options.get("m") or _DEFAULT_HNSW_M)
+
+    if kind.startswith("int8"):
+        vectors_bytes = num_vectors * (dims + 4)
+    elif kind.startswith("int4"):
+        vectors_bytes = num_vectors * (dims // 2 + 4)
+    else:
+        vectors_bytes = num_vectors * dims * 4
+
+    graph_bytes = num_vectors * 4 * m * 2 if "hnsw" in kind else 0
+    return {
+        "dims": dims,
+        "index_type": kind,
+        "vectors_bytes": vectors_bytes,
+        "hnsw_graph_bytes": graph_bytes,
+        "total_mb": round((vectors_bytes + graph_bytes) / (1024 * 1024), 2),
+    }
+
+
+def _index_diagnostics(index: str) -> Dict[str, Any]:
+    stats = es_client.indices.stats(index=index, metric=_STATS_METRICS)
+    total = ((stats.get("indices") or {}).get(index) or {}).get("total") or stats.get("_all", {}).get("total", {})
+
+    docs = total.get("docs") or {}
+    segments = total.get("segments") or {}
+    qc = total.get("query_cache") or {}
+    rc = total.get("request_cache") or {}
+    refresh = total.get("refresh") or {}
+    merges = total.get("merges") or {}
+    search = total.get("search") or {}
+
+    mapping = es_client.indices.get_mapping(index=index)
+    mappings = next(iter(mapping.values()), {}).get("mappings") or {}
+    props = mappings.get("properties") or {}
+
+    num_docs = int(docs.get("count") or 0)
+    vectors = {
+        name: _vector_memory_estimate(num_docs, prop)
+        for name, prop in props.items()
+        if prop.get("type") == "dense_vector"
+    }
+
+    refresh_total = int(refresh.get("total") or 0)
+    query_total = int(search.get("query_total") or 0)
+
+    return {
+        "docs": num_docs,
+        "store_mb": round(int((total.get("store") or {}).get("size_in_bytes") or 0) / (1024 * 1024), 2),
+        "segments": {
+            "count": segments.get("count"),
+            "memory_bytes": segments.get("memory_in_bytes"),
+        },
+        "vectors": vectors,
+        "vectors_total_mb": round(sum(v["total_mb"] for v in vectors.values()), 2),
+        "query_cache": {
+            "hit_ratio": _ratio(int(qc.get("hit_count") or 0), int(qc.get("miss_count") or 0)),
+            "evictions": qc.get("evictions"),
+            "memory_bytes": qc.get("memory_size_in_bytes"),
+        },
+        "request_cache": {
+            "hit_ratio": _ratio(int(rc.get("hit_count") or 0), int(rc.get("miss_count") or 0)),
+            "evictions": rc.get("evictions"),
+            "memory_bytes": rc.get("memory_size_in_bytes"),
+        },
+        "refresh": {
+            "total": refresh_total,
+            "avg_ms": round(int(refresh.get("total_time_in_millis") or 0) / refresh_total, 2) if refresh_total else None,
+        },
+        "merges": {
+            "current": merges.get("current"),
+            "total": merges.get("total"),
+            "total_time_ms": merges.get("total_time_in_millis"),
+        },
+        "search": {
+            "query_total": query_total,
+            "avg_query_ms": round(int(search.get("query_time_in_millis") or 0) / query_total, 2) if query_total else None,
+        },
+        "mapping_version": (mappings.get("_meta") or {}).get("mapping_version"),
+    }
+
+
+def collect_diagnostics(last_n: int = 50) -> Dict[str, Any]:
+    from app.services.follow_graph import follow_graph_stats
+    from app.services.neighbors import neighbor_stores_stats
+    from app.services.vector_engine import vector_engine_stats
+
+    key = ("diagnostics", last_n)
+    cached = _cache.get(key)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    info = es_client.info()
+    health = es_client.cluster.health()
+
+    indices: Dict[str, Any] = {}
+    for index in (INDEX_WINKERS, INDEX_EVENTS, INDEX_CONVERSATIONS):
+        try:
+            indices[index] = _index_diagnostics(index)
+        except Exception as e:
+            indices[index] = {"error": str(e)}
+
+    result: Dict[str, Any] = {
+        "generated_at": time.time(),
+        "cluster": {
+            "name": info.get("cluster_name"),
+            "version": (info.get("version") or {}).get("number"),
+            "status": health.get("status"),
+            "nodes": health.get("number_of_nodes"),
+            "active_shards": health.get("active_shards"),
+            "relocating_shards": health.get("relocating_shards"),
+            "unassigned_shards": health.get("unassigned_shards"),
+        },
+        "indices": indices,
+        "db_pool": pool_stats(),
+        "caches": caches_stats(),
+        "follow_graph": follow_graph_stats(),
+        "neighbor_stores": neighbor_stores_stats(),
+        "vector_engine": vector_engine_stats(),
+        "singleflight": singleflight_stats(),
+        "service": {
+            "latency_summary": latency_summary(),
+            "recent": recent_latencies(limit=last_n),
+            **snapshot(),
+        },
+    }
+    _cache.set(key, result)
+    return {**result, "cached": False}
@@ -1,4 +1,7 @@
-from elasticsearch import Elasticsearch
+from typing import Any, Dict, List
+import math
+
+from elasticsearch import ApiError, Elasticsearch
 from .config import (
     ELASTICSEARCH_URL,
     ELASTICSEARCH_USERNAME,
@@ -6,6 +9,7 @@ from .config import (
     INDEX_WINKERS,
     INDEX_EVENTS,
     INDEX_CONVERSATIONS,
+    EVENT_CARD_FIELD,
 )
 
 es_client = Elasticsearch(
@@ -14,8 +18,35 @@ es_client = Elasticsearch(
     verify_certs=False,  # à durcir en prod
 )
 
+_async_es_client = None
+
+
+def get_async_es_client():
+    """AsyncElasticsearch (même config que es_client), créé au premier appel async."""
+    global _async_es_client
+    if _async_es_client is None:
+        from elasticsearch import AsyncElasticsearch
+
+        _async_es_client = AsyncElasticsearch(
+            ELASTICSEARCH_URL,
+            basic_auth=(ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD),
+            verify_certs=False,  # à durcir en prod
+        )
+    return _async_es_client
+
+
+async def close_async_es_client() -> None:
+    global _async_es_client
+    if _async_es_client is not None:
+        await _async_es_client.close()
+        _async_es_client = None
+
+# à incrémenter à chaque modification des mappings ci-dessous (visible dans _meta)
+MAPPING_VERSION = 2
+
 WINKER_MAPPING = {
     "mappings": {
+        "_meta": {"mapping_version": MAPPING_VERSION},
         "properties": {
             "username": {"type": "keyword"},
             "email": {"type": "keyword"},
@@ -39,6 +70,7 @@ WINKER_MAPPING = {
 
 EVENT_MAPPING = {
     "mappings": {
+        "_meta": {"mapping_version": MAPPING_VERSION},
         "properties": {
             "titre": {"type": "text"},
             "bioEvent": {"type": "text"},
@@ -62,12 +94,17 @@ EVENT_MAPPING = {
             "maxNumberParticipant": {"type": "integer"},
             "isFull": {"type": "boolean"},
             "vectorPreferenceEvent": {"type": "dense_vector", "dims": 16},
+            # popularité décroissante dans le temps (app/jobs/popularity.py)
+            "boost": {"type": "float"},
+            # carte hydratée (mode dénormalisé): stockée dans _source, non indexée
+            EVENT_CARD_FIELD: {"type": "object", "enabled": False},
         }
     }
 }
 
 CONVERSATION_MAPPING = {
     "mappings": {
+        "_meta": {"mapping_version": MAPPING_VERSION},
         "properties": {
             "title": {"type": "text"},
             "description": {"type": "text"},
@@ -87,11 +124,69 @@ CONVERSATION_MAPPING = {
 
 
 def init_indices():
-    if not es_client.indices.exists(index=INDEX_WINKERS):
-        es_client.indices.create(index=INDEX_WINKERS, **WINKER_MAPPING)
+    for index, mapping in (
+        (INDEX_WINKERS, WINKER_MAPPING),
+        (INDEX_EVENTS, EVENT_MAPPING),
+        (INDEX_CONVERSATIONS, CONVERSATION_MAPPING),
+    ):
+        if not es_client.indices.exists(index=index):
+            es_client.indices.create(index=index, **mapping)
+            continue
+
+        if index == INDEX_EVENTS:
+            # index déjà créé avant l'ajout de la carte dénormalisée / du boost
+            event_props = EVENT_MAPPING["mappings"]["properties"]
+            for field in ("boost", EVENT_CARD_FIELD):
+                try:
+                    es_client.indices.put_mapping(index=INDEX_EVENTS, properties={field: event_props[field]})
+                except ApiError:
+                    # champ déjà mappé autrement (mapping dynamique): on garde l'existant
+                    pass
+        # version du mapping sur les index existants aussi (diagnostics)
+        es_client.indices.put_mapping(index=index, meta=mapping["mappings"]["_meta"])
+
+
+def _vector_fields(index: str) -> Dict[str, int]:
+    """dense_vector du mapping (champ -> dims), y compris ceux ajoutés hors de ce service."""
+    mapping = es_client.indices.get_mapping(index=index)
+    fields: Dict[str, int] = {}
+    for idx_mapping in mapping.values():
+        props = (idx_mapping.get("mappings") or {}).get("properties") or {}
+        for name, prop in props.items():
+            if prop.get("type") == "dense_vector" and prop.get("dims"):
+                fields[name] = int(prop["dims"])
+    return fields
+
+
+def warm_up_index(index: str, rounds: int = 3) -> Dict[str, Any]:
+    """
+    Charge les structures "froides" (page cache, graphes HNSW) avant le trafic :
+    quelques recherches simples + un kNN par champ vectoriel.
+    """
+    report: Dict[str, Any] = {"index": index, "searches": 0, "knn": {}}
+
+    for _ in range(max(1, rounds)):
+        es_client.search(index=index, size=10, query={"match_all": {}}, request_cache=False)
+        report["searches"] += 1
+
+    for field, dims in _vector_fields(index).items():
+        # vecteur unitaire constant (un vecteur nul est refusé en cosine)
+        vector = [1.0 / math.sqrt(dims)] * dims
+        try:
+            for _ in range(max(1, rounds)):
+                es_client.search(
+                    index=index,
+                    knn={"field": field, "query_vector": vector, "k": 10, "num_candidates": 100},
+                    size=10,
+                    source=False,
+                )
+            report["knn"][field] = dims
+        except ApiError as e:
+            # ex: dense_vector non indexé (pas de HNSW) => rien à chauffer
+            report["knn"][field] = f"skipped: {getattr(e, 'message', e)}"
+
+    return report
 
-    if not es_client.indices.exists(index=INDEX_EVENTS):
-        es_client.indices.create(index=INDEX_EVENTS, **EVENT_MAPPING)
 
-    if not es_client.indices.exists(index=INDEX_CONVERSATIONS):
-        es_client.indices.create(index=INDEX_CONVERSATIONS, **CONVERSATION_MAPPING)
+def warm_up_indices(rounds: int = 3) -> List[Dict[str, Any]]:
+    return [warm_up_index(index, rounds=rounds) for index in (INDEX_WINKERS, INDEX_EVENTS, INDEX_CONVERSATIONS)]
@@ -0,0 +1,90 @@
+# app/core/metrics.py
+"""
+Métriques in-process (par worker) : latences des dernières requêtes + compteurs.
+Pas de dépendance externe; exposé par /events/debug/es/diagnostics.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+RECENT_LATENCIES_MAX = int(os.getenv("METRICS_RECENT_LATENCIES", "500"))
+
+_lock = threading.Lock()
+_recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_LATENCIES_MAX)
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+
+
+def record_latency(name: str, ms: float, **meta: Any) -> None:
+    entry = {"name": name, "ms": round(ms, 2), "at": time.time(), **meta}
+    with _lock:
+        _recent.append(entry)
+
+
+@contextmanager
+def timed(name: str, **meta: Any) -> Iterator[None]:
+    """`with timed("es.search.events"): ...` => enregistre la latence (même en cas d'erreur)."""
+    t0 = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        extra = dict(meta)
+        if error:
+            extra["error"] = error
+        record_latency(name, (time.perf_counter() - t0) * 1000.0, **extra)
+
+
+def incr(name: str, value: float = 1.0) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0.0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _lock:
+        _gauges[name] = value
+
+
+def recent_latencies(limit: int = 50, prefix: str = "") -> List[Dict[str, Any]]:
+    with _lock:
+        items = [e for e in _recent if e["name"].startswith(prefix)]
+    return items[-limit:][::-1]
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def latency_summary(prefix: str = "") -> Dict[str, Dict[str, float]]:
+    """p50 / p95 / max par nom, sur la fenêtre des dernières requêtes."""
+    with _lock:
+        items = [e for e in _recent if e["name"].startswith(prefix)]
+
+    by_name: Dict[str, List[float]] = {}
+    for e in items:
+        by_name.setdefault(e["name"], []).append(e["ms"])
+
+    summary: Dict[str, Dict[str, float]] = {}
+    for name, values in by_name.items():
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "p50_ms": _percentile(values, 0.50),
+            "p95_ms": _percentile(values, 0.95),
+            "max_ms": values[-1],
+        }
+    return summary
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges)}
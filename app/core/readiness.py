@@ -0,0 +1,120 @@
+# app/core/readiness.py
+"""
+Démarrage non bloquant du worker.
+
+Le hook startup lance un thread qui :
+  1) vérifie / crée les index ES avec retry (backoff exponentiel)
+  2) chauffe les index (recherches + kNN) et le modèle d'embedding
+puis passe le worker "ready". /health/ready renvoie 503 tant que ce n'est pas fait.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .config import (
+    API_ROUTERS,
+    STARTUP_RETRY_INITIAL_S,
+    STARTUP_RETRY_MAX_S,
+    WARMUP_EMBEDDINGS,
+    WARMUP_QUERIES,
+)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+_state: Dict[str, Any] = {
+    "ready": False,
+    "indices_ok": False,
+    "warm": False,
+    "attempts": 0,
+    "last_error": None,
+    "started_at": None,
+    "ready_at": None,
+    "warmup": None,
+}
+
+
+def _set(**kwargs: Any) -> None:
+    with _lock:
+        _state.update(kwargs)
+
+
+def _init_indices_with_retry() -> bool:
+    from .es import init_indices
+
+    delay = STARTUP_RETRY_INITIAL_S
+    while not _stop.is_set():
+        with _lock:
+            _state["attempts"] += 1
+        try:
+            init_indices()
+            _set(indices_ok=True, last_error=None)
+            return True
+        except Exception as e:  # ES injoignable, timeout, 5xx...
+            logger.warning("init_indices failed (retry in %.1fs): %s", delay, e)
+            _set(last_error=str(e))
+            _stop.wait(delay)
+            delay = min(delay * 2, STARTUP_RETRY_MAX_S)
+    return False
+
+
+def _warm_up() -> None:
+    from .es import warm_up_indices
+
+    report: Dict[str, Any] = {}
+    try:
+        report["indices"] = warm_up_indices(rounds=WARMUP_QUERIES)
+    except Exception as e:
+        # le warm-up est best effort: il ne doit pas bloquer la readiness
+        logger.warning("ES warm-up failed: %s", e)
+        report["indices_error"] = str(e)
+
+    # un worker d'indexation seule n'embed jamais: inutile de charger le modèle
+    needs_embeddings = not API_ROUTERS or any(r != "indexing" for r in API_ROUTERS)
+    if WARMUP_EMBEDDINGS and needs_embeddings:
+        try:
+            from app.embeddings.service import embed_text
+
+            t0 = time.perf_counter()
+            embed_text("warm-up")
+            report["embedding_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        except Exception as e:
+            logger.warning("Embedding warm-up failed: %s", e)
+            report["embedding_error"] = str(e)
+
+    _set(warm=True, warmup=report)
+
+
+def _run() -> None:
+    if not _init_indices_with_retry():
+        return
+    _warm_up()
+    _set(ready=True, ready_at=time.time())
+    logger.info("Worker ready")
+
+
+def start_background_startup() -> None:
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        _state["started_at"] = time.time()
+        _thread = threading.Thread(target=_run, name="startup-warmup", daemon=True)
+        _thread.start()
+
+
+def stop_background_startup() -> None:
+    _stop.set()
+
+
+def is_ready() -> bool:
+    with _lock:
+        return bool(_state["ready"])
+
+
+def readiness_status() -> Dict[str, Any]:
+    with _lock:
+        return dict(_state)
@@ -0,0 +1,104 @@
+# app/core/singleflight.py
+"""
+Single-flight: des appels identiques simultanés (même clé normalisée) ne lancent
+le travail qu'une fois; les autres attendent et reçoivent le même résultat
+(ou la même exception). Rien n'est gardé une fois l'appel terminé: ce n'est
+pas un cache, seulement la fusion des requêtes en vol (ex: notification push
+=> des milliers de /events/search identiques dans la même seconde).
+
+Local au worker. Le résultat est partagé entre appelants: ne pas le modifier.
+  - coalesce(namespace, key, fn)              appels sync (threadpool FastAPI)
+  - await coalesce_async(namespace, key, fn)  coroutines (une boucle par worker)
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from app.core.config import SINGLEFLIGHT_ENABLED
+from app.core.metrics import incr
+
+T = TypeVar("T")
+
+
+def body_key(payload: Any) -> str:
+    """Empreinte stable d'un corps JSON (requête ES...): clés triées, blake2b."""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_calls: Dict[Tuple[str, Hashable], _Call] = {}
+_lock = threading.Lock()
+
+
+def coalesce(namespace: str, key: Hashable, fn: Callable[[], T]) -> T:
+    if not SINGLEFLIGHT_ENABLED:
+        return fn()
+
+    full_key = (namespace, key)
+    with _lock:
+        call = _calls.get(full_key)
+        leader = call is None
+        if leader:
+            call = _calls[full_key] = _Call()
+
+    if not leader:
+        incr(f"singleflight.{namespace}.shared")
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    incr(f"singleflight.{namespace}.leader")
+    try:
+        call.result = fn()
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _calls.pop(full_key, None)
+        call.done.set()
+
+
+_async_calls: Dict[Tuple[str, Hashable], "asyncio.Future[Any]"] = {}
+
+
+def _forget_async(full_key: Tuple[str, Hashable], task: "asyncio.Future[Any]") -> None:
+    if _async_calls.get(full_key) is task:
+        del _async_calls[full_key]
+    if not task.cancelled():
+        task.exception()  # marquée comme lue: pas d'avertissement si tous les appelants sont partis
+
+
+async def coalesce_async(namespace: str, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+    if not SINGLEFLIGHT_ENABLED:
+        return await fn()
+
+    full_key = (namespace, key)
+    task = _async_calls.get(full_key)
+    if task is None:
+        incr(f"singleflight.{namespace}.leader")
+        # tâche à part: le calcul ne dépend d'aucun appelant, pas même du premier
+        task = _async_calls[full_key] = asyncio.ensure_future(fn())
+        task.add_done_callback(functools.partial(_forget_async, full_key))
+    else:
+        incr(f"singleflight.{namespace}.shared")
+    # shield: l'annulation d'un appelant (leader compris) n'annule pas le calcul partagé
+    return await asyncio.shield(task)
+
+
+def singleflight_stats() -> Dict[str, int]:
+    return {"in_flight": len(_calls), "in_flight_async": len(_async_calls)}
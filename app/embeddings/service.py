@@ -1,11 +1,16 @@
 # app/embeddings/service.py
 from __future__ import annotations
 
-from typing import List, Optional
-from sentence_transformers import SentenceTransformer
+from typing import TYPE_CHECKING, List, Optional
 import os
 import threading
-import torch
+
+from app.core.singleflight import coalesce
+
+# torch / sentence_transformers sont lourds (plusieurs secondes d'import):
+# chargés seulement au premier embed, pas à l'import de l'app.
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 _MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
 
@@ -31,6 +36,9 @@ def _resolve_device() -> str:
     """
     if _DEVICE_ENV == "cpu":
         return "cpu"
+
+    import torch
+
     if _DEVICE_ENV == "cuda":
         return "cuda" if torch.cuda.is_available() else "cpu"
     return "cuda" if torch.cuda.is_available() else "cpu"
@@ -45,6 +53,8 @@ def _get_model() -> SentenceTransformer:
         if _model is not None:
             return _model
 
+        from sentence_transformers import SentenceTransformer
+
         # ✅ NE PAS passer device= ici (évite le self.to(device) qui peut crasher avec meta)
         _model = SentenceTransformer(_MODEL_NAME)
         return _model
@@ -55,6 +65,11 @@ def embed_text(text: str, normalize: bool = True) -> List[float]:
     if not text:
         return []
 
+    # même texte en cours d'encodage (rafale de requêtes identiques): un seul encode
+    return coalesce("embed", (text, normalize), lambda: _encode(text, normalize))
+
+
+def _encode(text: str, normalize: bool) -> List[float]:
     model = _get_model()
     device = _resolve_device()
 
@@ -69,3 +84,30 @@ def embed_text(text: str, normalize: bool = True) -> List[float]:
 
     # JSON-safe
     return [float(x) for x in emb]
+
+
+def embed_texts(texts: List[str], normalize: bool = True, batch_size: int = 64) -> List[List[float]]:
+    """
+    Embeddings d'une liste de textes en un seul encode() (batché par le modèle).
+    Les textes vides donnent [] (même contrat que embed_text).
+    """
+    cleaned = [(t or "").strip() for t in texts]
+    todo = [i for i, t in enumerate(cleaned) if t]
+    out: List[List[float]] = [[] for _ in cleaned]
+    if not todo:
+        return out
+
+    model = _get_model()
+    device = _resolve_device()
+
+    embs = model.encode(
+        [cleaned[i] for i in todo],
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=normalize,
+        device=device,
+        show_progress_bar=False,
+    )
+    for i, emb in zip(todo, embs):
+        out[i] = [float(x) for x in emb]
+    return out
@@ -0,0 +1,99 @@
+# app/jobs/coparticipation.py
+"""
+Filtrage collaboratif item-item par co-participation aux events.
+
+Matrice creuse X (winkers x events, 1 = a participé), puis
+    C = Xᵀ X                       (co-participations entre events)
+    sim(i, j) = C_ij / sqrt(n_i n_j)   (cosinus binaire, n_i = participants de i)
+On garde les CF_TOP_N meilleurs voisins par event (C_ij >= CF_MIN_COPARTICIPATION),
+stockés en CSR compact (app/services/neighbors.py) et lus par get_events_for_winker.
+
+À lancer périodiquement (Airflow) :
+    python -m app.jobs.coparticipation
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import CF_MIN_COPARTICIPATION, CF_NEIGHBORS_PATH, CF_TOP_N
+from app.core.db import get_read_conn
+from app.services.neighbors import save_neighbors
+
+# Participations (modèle Django ParticipeWinker: participeWinker -> winker, event -> event)
+PARTICIPATIONS_SQL = """
+SELECT DISTINCT p."participeWinker_id", p.event_id
+FROM profil_participeWinker p
+WHERE p."participeWinker_id" IS NOT NULL
+  AND p.event_id IS NOT NULL
+"""
+
+# lignes d'events traitées par bloc de Xᵀ X (borne la mémoire du produit)
+_BLOCK_SIZE = 2048
+
+
+def fetch_participations() -> List[Tuple[int, int]]:
+    with get_read_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(PARTICIPATIONS_SQL)
+            return cur.fetchall()
+
+
+def compute_coparticipation_neighbors(
+    pairs: List[Tuple[int, int]],
+    top_n: int = CF_TOP_N,
+    min_coparticipation: int = CF_MIN_COPARTICIPATION,
+) -> Dict[int, List[Tuple[int, float]]]:
+    """event_id -> [(event_id voisin, similarité)] triés par similarité décroissante."""
+    import numpy as np
+    from scipy import sparse
+
+    if not pairs:
+        return {}
+
+    data = np.asarray(pairs, dtype=np.int64)
+    winker_ids, winker_idx = np.unique(data[:, 0], return_inverse=True)
+    event_ids, event_idx = np.unique(data[:, 1], return_inverse=True)
+
+    x = sparse.csr_matrix(
+        (np.ones(len(data), dtype=np.float32), (winker_idx, event_idx)),
+        shape=(len(winker_ids), len(event_ids)),
+    )
+    xt = x.T.tocsr()
+    counts = np.asarray(x.sum(axis=0)).ravel()
+    inv_norm = 1.0 / np.sqrt(np.maximum(counts, 1.0))
+
+    neighbors: Dict[int, List[Tuple[int, float]]] = {}
+    for start in range(0, len(event_ids), _BLOCK_SIZE):
+        stop = min(start + _BLOCK_SIZE, len(event_ids))
+        co = (xt[start:stop] @ x).tocsr()  # co-participations du bloc, creux
+
+        for local in range(stop - start):
+            row = start + local
+            lo, hi = co.indptr[local], co.indptr[local + 1]
+            cols = co.indices[lo:hi]
+            vals = co.data[lo:hi]
+
+            keep = (cols != row) & (vals >= min_coparticipation)
+            cols, vals = cols[keep], vals[keep]
+            if not len(cols):
+                continue
+
+            sims = vals * inv_norm[row] * inv_norm[cols]
+            if len(sims) > top_n:
+                top = np.argpartition(-sims, top_n - 1)[:top_n]
+                cols, sims = cols[top], sims[top]
+            order = np.argsort(-sims, kind="stable")
+            neighbors[int(event_ids[row])] = [
+                (int(event_ids[c]), round(float(s), 4)) for c, s in zip(cols[order], sims[order])
+            ]
+
+    return neighbors
+
+
+def rebuild_coparticipation_neighbors(path: Optional[str] = None) -> Dict[str, Any]:
+    pairs = fetch_participations()
+    neighbors = compute_coparticipation_neighbors(pairs)
+    written = save_neighbors(path or CF_NEIGHBORS_PATH, neighbors)
+    return {"participations": len(pairs), **written}
+
+
+if __name__ == "__main__":
+    print(rebuild_coparticipation_neighbors())
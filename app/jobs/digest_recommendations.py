@@ -0,0 +1,37 @@
+# app/jobs/digest_recommendations.py
+"""
+CLI des recos en masse (digests / notifications), sans passer par HTTP :
+    python -m app.jobs.digest_recommendations --ids-file ids.txt > recos.ndjson
+    echo "12 34 56" | python -m app.jobs.digest_recommendations
+Un id par ligne (ou séparés par des espaces / virgules); sortie NDJSON sur stdout.
+"""
+import argparse
+import re
+import sys
+from typing import List, TextIO
+
+from app.api.v1.endpoints.recommendations_batch import iter_events_for_winkers, to_ndjson
+
+
+def _read_ids(stream: TextIO) -> List[int]:
+    return [int(tok) for tok in re.split(r"[\s,]+", stream.read()) if tok]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recos d'events en masse (NDJSON)")
+    parser.add_argument("--ids-file", help="fichier d'ids (défaut: stdin)")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.ids_file:
+        with open(args.ids_file, encoding="utf-8") as f:
+            user_ids = _read_ids(f)
+    else:
+        user_ids = _read_ids(sys.stdin)
+
+    for line in to_ndjson(iter_events_for_winkers(user_ids, args.chunk_size)):
+        sys.stdout.write(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# app/jobs/event_vector_snapshot.py
+"""
+Snapshot des vecteurs d'events pour le moteur vectoriel en process
+(app/services/vector_engine.py). Écrit une nouvelle version puis bascule
+VECTOR_SNAPSHOT_DIR/CURRENT; les workers la rechargent au rafraîchissement suivant.
+
+    python -m app.jobs.event_vector_snapshot
+"""
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict
+
+from app.core.config import VECTOR_SNAPSHOT_DIR
+from app.jobs.similar_events import load_event_vectors
+
+# versions gardées (les workers peuvent encore lire la précédente)
+_KEEP_VERSIONS = 2
+
+
+def write_snapshot(data: Dict[str, Any], root: str = VECTOR_SNAPSHOT_DIR) -> Dict[str, Any]:
+    import numpy as np
+
+    version = time.strftime("%Y%m%d%H%M%S")
+    path = os.path.join(root, version)
+    os.makedirs(path, exist_ok=True)
+
+    ids = data["ids"]
+    if len(ids):
+        np.save(os.path.join(path, "vectors.npy"), np.ascontiguousarray(data["matrix"], dtype=np.float32))
+        np.save(os.path.join(path, "lat.npy"), data["lat"])
+        np.save(os.path.join(path, "lon.npy"), data["lon"])
+        np.save(os.path.join(path, "day.npy"), data["day"])
+    else:
+        np.save(os.path.join(path, "vectors.npy"), np.empty((0, 0), dtype=np.float32))
+        for name in ("lat", "lon"):
+            np.save(os.path.join(path, f"{name}.npy"), np.empty(0, dtype=np.float64))
+        np.save(os.path.join(path, "day.npy"), np.empty(0, dtype=np.int32))
+    np.save(os.path.join(path, "ids.npy"), ids)
+
+    meta = {
+        "count": int(len(ids)),
+        "dims": int(data["matrix"].shape[1]) if len(ids) else 0,
+        "max_published": data.get("max_published"),
+        "built_at": time.time(),
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    current_tmp = os.path.join(root, "CURRENT.tmp")
+    with open(current_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(root, "CURRENT"))
+
+    versions = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    for old in versions[:-_KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+    return {"version": version, **meta}
+
+
+def build_event_vector_snapshot() -> Dict[str, Any]:
+    return write_snapshot(load_event_vectors())
+
+
+if __name__ == "__main__":
+    print(build_event_vector_snapshot())
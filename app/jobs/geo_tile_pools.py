@@ -0,0 +1,107 @@
+# app/jobs/geo_tile_pools.py
+"""
+Pools de candidats events par tuile geohash (app/services/geo_pools.py).
+
+Events à venir et géolocalisés -> tuiles de précision GEO_POOLS_PRECISION.
+Pour chaque tuile à portée d'un event (anneaux de tuiles voisines couvrant le
+rayon de reco), pool = events à moins de rayon + demi-diagonale du centre.
+
+À lancer chaque nuit (Airflow), après l'indexation des events :
+    python -m app.jobs.geo_tile_pools
+"""
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from app.core.config import GEO_POOLS_PATH, GEO_POOLS_PRECISION
+from app.jobs.similar_events import load_event_vectors
+from app.api.v1.endpoints.recommendations import EVENTS_RADIUS_KM
+
+_KM_PER_DEG = 111.2
+
+
+def compute_geo_pools(
+    data: Dict[str, Any],
+    precision: int = GEO_POOLS_PRECISION,
+    radius_km: float = EVENTS_RADIUS_KM,
+) -> Dict[str, Any]:
+    """Tableaux du format décrit dans app/services/geo_pools.py."""
+    import numpy as np
+
+    from app.services.geo_pools import haversine_to, tile_keys, tile_size
+
+    n_events = len(data["ids"])
+    keep = data["upcoming"] & ~np.isnan(data["lat"]) if n_events else np.zeros(0, dtype=bool)
+    ids = data["ids"][keep]
+    dims = data["matrix"].shape[1] if n_events else 0
+    matrix = data["matrix"][keep] if n_events else np.empty((0, dims), dtype=np.float32)
+    lat = data["lat"][keep] if n_events else np.empty(0)
+    lon = data["lon"][keep] if n_events else np.empty(0)
+    day = data["day"][keep] if n_events else np.empty(0, dtype=np.int32)
+
+    dlat, dlon = tile_size(precision)
+    n_lon = int(round(360.0 / dlon))
+    n_lat = int(round(180.0 / dlat))
+
+    event_tiles = np.unique(tile_keys(np.degrees(lat), np.degrees(lon), precision))
+    # anneaux de voisines: en longitude, la largeur d'une tuile rétrécit avec la latitude
+    max_abs_lat = min(float(np.degrees(np.abs(lat)).max()) + dlat, 85.0) if len(lat) else 0.0
+    ring_lat = int(math.ceil(radius_km / (dlat * _KM_PER_DEG))) + 1
+    ring_lon = min(int(math.ceil(radius_km / (dlon * _KM_PER_DEG * math.cos(math.radians(max_abs_lat))))) + 1, n_lon // 2)
+
+    ilat, ilon = event_tiles // n_lon, event_tiles % n_lon
+    di, dj = np.meshgrid(np.arange(-ring_lat, ring_lat + 1), np.arange(-ring_lon, ring_lon + 1), indexing="ij")
+    all_lat = (ilat[:, None] + di.ravel()[None, :]).ravel()
+    all_lon = ((ilon[:, None] + dj.ravel()[None, :]) % n_lon).ravel()
+    valid = (all_lat >= 0) & (all_lat < n_lat)
+    tiles = np.unique(all_lat[valid] * n_lon + all_lon[valid])
+
+    pools: List[np.ndarray] = []
+    kept_tiles: List[int] = []
+    for key in tiles:
+        t_lat = (key // n_lon + 0.5) * dlat - 90.0
+        t_lon = (key % n_lon + 0.5) * dlon - 180.0
+        half_diag = 0.5 * math.hypot(dlat * _KM_PER_DEG, dlon * _KM_PER_DEG * math.cos(math.radians(t_lat)))
+        dist = haversine_to(math.radians(t_lat), math.radians(t_lon), lat, lon)
+        rows = np.flatnonzero(dist <= radius_km + half_diag).astype(np.int32)
+        if len(rows):
+            kept_tiles.append(int(key))
+            pools.append(rows)
+
+    indptr = np.zeros(len(pools) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in pools], out=indptr[1:])
+    return {
+        "tiles": np.asarray(kept_tiles, dtype=np.int64),
+        "indptr": indptr,
+        "rows": np.concatenate(pools) if pools else np.empty(0, dtype=np.int32),
+        "ids": ids.astype(np.int32),
+        "matrix": np.ascontiguousarray(matrix, dtype=np.float32),
+        "lat": lat,
+        "lon": lon,
+        "day": day.astype(np.int32),
+        "precision": np.asarray([precision], dtype=np.int64),
+    }
+
+
+def save_geo_pools(path: str, pools: Dict[str, Any]) -> Dict[str, Any]:
+    """Fichier temporaire puis rename atomique (rechargé par les workers sur mtime)."""
+    import numpy as np
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, **pools)
+    os.replace(tmp, path)
+    return {
+        "tiles": int(len(pools["tiles"])),
+        "events": int(len(pools["ids"])),
+        "pool_entries": int(pools["indptr"][-1]),
+        "bytes": os.path.getsize(path),
+    }
+
+
+def rebuild_geo_pools(path: Optional[str] = None) -> Dict[str, Any]:
+    return save_geo_pools(path or GEO_POOLS_PATH, compute_geo_pools(load_event_vectors()))
+
+
+if __name__ == "__main__":
+    print(rebuild_geo_pools())
@@ -0,0 +1,165 @@
+# app/jobs/materialize_recommendations.py
+"""
+Matérialisation quotidienne des recos des winkers actifs :
+  - events  : même requête que get_events_for_winker
+  - winkers : même requête que get_winkers_for_winker (limit / rayon par défaut)
+  - même passe MMR qu'en live quand MMR_EVENTS_LAMBDA / MMR_WINKERS_LAMBDA < 1
+Écrit deux stores compacts (app/services/neighbors.py) lus par les endpoints,
+qui repassent en live sur un user absent ou un fichier calculé un autre jour
+(jour de calcul écrit dans le fichier).
+
+À lancer chaque nuit (Airflow), après les jobs de popularité / co-participation :
+    python -m app.jobs.materialize_recommendations
+"""
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import (
+    BATCH_RECO_CHUNK_SIZE,
+    INDEX_WINKERS,
+    MATERIALIZE_ACTIVE_DAYS,
+    MATERIALIZED_EVENTS_PATH,
+    MATERIALIZED_WINKERS_PATH,
+    MMR_EVENTS_CANDIDATES,
+    MMR_EVENTS_LAMBDA,
+    MMR_WINKERS_LAMBDA,
+    WINKERS_FOR_WINKER_LIMIT,
+    WINKERS_FOR_WINKER_RADIUS_KM,
+)
+from app.core.es import es_client
+from app.core.metrics import timed
+from app.services.follow_graph import get_follow_graph, refresh_follow_graph
+from app.services.impressions import overfetch
+from app.services.materialized import build_day_field
+from app.services.neighbors import save_neighbors
+from app.api.v1.endpoints.recommendations import (
+    EVENTS_FOR_WINKER_SIZE,
+    age_from_birth_year,
+    build_winkers_for_winker_body,
+    diversified_ids,
+    hit_scores,
+    parse_geo,
+    rank_winker_hits,
+    social_candidates,
+)
+from app.api.v1.endpoints.recommendations_batch import (
+    load_profiles_and_vectors,
+    msearch_per_user,
+    search_events_for_users,
+)
+
+logger = logging.getLogger(__name__)
+
+Ranked = List[Tuple[int, float]]
+
+
+def fetch_active_winker_ids(days: int = MATERIALIZE_ACTIVE_DAYS) -> List[int]:
+    """Winkers actifs, non bannis, connectés sur la fenêtre (index ES des winkers)."""
+    from elasticsearch.helpers import scan
+
+    query = {
+        "query": {
+            "bool": {
+                "filter": [
+                    {"term": {"is_active": True}},
+                    {"term": {"is_banned": False}},
+                    {"range": {"lastConnection": {"gte": f"now-{days}d"}}},
+                ]
+            }
+        }
+    }
+    ids: List[int] = []
+    for hit in scan(es_client, index=INDEX_WINKERS, query=query, _source=False, size=1000):
+        try:
+            ids.append(int(hit["_id"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return ids
+
+
+def _diversified(ranked: Ranked, hits: List[Dict[str, Any]], lambda_: float, k: int) -> Ranked:
+    """Même passe MMR qu'en live (no-op à lambda 1); les scores d'origine sont conservés."""
+    scores = dict(ranked)
+    return [(item_id, scores[item_id]) for item_id in diversified_ids(ranked, hits, lambda_, k=k)]
+
+
+def _winkers_for_chunk(
+    user_ids: List[int],
+    profiles: Dict[int, Dict[str, Any]],
+    vectors: Dict[int, List[float]],
+) -> Dict[int, Ranked]:
+    size = overfetch(WINKERS_FOR_WINKER_LIMIT)
+    diversify = MMR_WINKERS_LAMBDA < 1.0
+    bodies: Dict[int, Dict[str, Any]] = {}
+    contexts: Dict[int, Tuple[Dict[str, float], int]] = {}
+    for uid in user_ids:
+        user_geo = parse_geo(profiles.get(uid) or {})
+        if uid not in vectors or not user_geo:
+            continue
+        user_age = age_from_birth_year(profiles[uid].get("birthYear"))
+        contexts[uid] = (user_geo, user_age)
+        bodies[uid] = build_winkers_for_winker_body(
+            uid,
+            vectors[uid],
+            user_geo,
+            user_age,
+            size,
+            WINKERS_FOR_WINKER_RADIUS_KM,
+            social_candidates(uid),
+            with_vectors=diversify,
+        )
+    hits_by_user, _ = msearch_per_user(INDEX_WINKERS, bodies, "es.msearch.winkers_for_winkers")
+    # même re-ranking qu'en live (RERANK_MODE)
+    return {
+        uid: _diversified(rank_winker_hits(hits, *contexts[uid])[0], hits, MMR_WINKERS_LAMBDA, size)[:size]
+        for uid, hits in hits_by_user.items()
+    }
+
+
+def materialize_recommendations(
+    user_ids: Optional[List[int]] = None,
+    chunk_size: int = BATCH_RECO_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    user_ids = user_ids if user_ids is not None else fetch_active_winker_ids()
+    # jour de la graine du ranking live pendant ce calcul (relu par materialized_ids)
+    extra = build_day_field(date.today())
+
+    # candidats amis d'amis comme en live (process à part: graphe chargé ici)
+    if get_follow_graph() is None:
+        try:
+            refresh_follow_graph(full=True)
+        except Exception as e:
+            logger.warning("follow graph unavailable, no friend-of-friend candidates: %s", e)
+
+    diversify_events = MMR_EVENTS_LAMBDA < 1.0
+    events_size = overfetch(EVENTS_FOR_WINKER_SIZE)
+    events: Dict[int, Ranked] = {}
+    winkers: Dict[int, Ranked] = {}
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        with timed("materialize.chunk", n=len(chunk)):
+            profiles, vectors = load_profiles_and_vectors(chunk)
+            # listes sur-échantillonnées: les déjà vus sont écartés au moment de servir
+            hits_by_user, _ = search_events_for_users(
+                chunk,
+                profiles,
+                vectors,
+                size=max(events_size, MMR_EVENTS_CANDIDATES) if diversify_events else events_size,
+                with_vectors=diversify_events,
+            )
+            events.update({
+                uid: _diversified(hit_scores(hits), hits, MMR_EVENTS_LAMBDA, events_size)[:events_size]
+                for uid, hits in hits_by_user.items()
+            })
+            winkers.update(_winkers_for_chunk(chunk, profiles, vectors))
+
+    return {
+        "users": len(user_ids),
+        "events": save_neighbors(MATERIALIZED_EVENTS_PATH, events, extra),
+        "winkers": save_neighbors(MATERIALIZED_WINKERS_PATH, winkers, extra),
+    }
+
+
+if __name__ == "__main__":
+    print(materialize_recommendations())
@@ -0,0 +1,119 @@
+# app/jobs/popularity.py
+"""
+Calcul batch de la popularité des events => champ ES `boost`.
+
+Utilisé par les scorers (`field_value_factor` sur `boost`) de /events/search
+et des recommandations. À lancer périodiquement (Airflow) :
+    python -m app.jobs.popularity
+ou via POST /api/v1/index/events/boost.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core.config import (
+    INDEX_EVENTS,
+    POPULARITY_BOOST_SCALE,
+    POPULARITY_HALF_LIFE_DAYS,
+    POPULARITY_WEIGHTS,
+)
+from app.core.db import get_read_conn
+from app.core.es import es_client
+
+# âge calculé côté SQL => pas de datetimes Python (tz) à convertir
+POPULARITY_SIGNALS_SQL = """
+SELECT
+    e.id,
+    COALESCE(e."currentNbParticipants", 0) AS "currentNbParticipants",
+    COALESCE(e."nbComment", 0) AS "nbComment",
+    COALESCE(e."numberView", 0) AS "numberView",
+    COALESCE(e."nbStories", 0) AS "nbStories",
+    GREATEST(
+        COALESCE(EXTRACT(EPOCH FROM (now() - e."datePublication")) / 86400.0, 0),
+        0
+    ) AS age_days
+FROM profil_event e
+"""
+
+
+def fetch_popularity_signals() -> List[tuple]:
+    # scan complet du catalogue: sur une réplica (quelques secondes de retard sans effet sur le boost)
+    with get_read_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(POPULARITY_SIGNALS_SQL)
+            return cur.fetchall()
+
+
+def compute_boosts(
+    rows: Sequence[tuple],
+    half_life_days: float = POPULARITY_HALF_LIFE_DAYS,
+    scale: float = POPULARITY_BOOST_SCALE,
+) -> Dict[int, float]:
+    """
+    boost = scale * pop / max(pop)
+    pop   = sum(w_i * log1p(signal_i)) * 0.5 ** (age_days / half_life)
+
+    Tout est vectorisé (numpy) sur l'ensemble du catalogue.
+    """
+    import numpy as np
+
+    if not rows:
+        return {}
+
+    data = np.asarray([r[1:] for r in rows], dtype=np.float64)
+    ids = np.asarray([r[0] for r in rows], dtype=np.int64)
+
+    signal_cols = ["currentNbParticipants", "nbComment", "numberView", "nbStories"]
+    weights = np.asarray([POPULARITY_WEIGHTS[c] for c in signal_cols], dtype=np.float64)
+
+    signals = np.log1p(np.clip(data[:, :4], 0, None)) @ weights
+    decay = np.power(0.5, data[:, 4] / max(half_life_days, 1e-6))
+    pop = signals * decay
+
+    top = float(pop.max()) if pop.size else 0.0
+    if top > 0:
+        pop = pop * (scale / top)
+
+    return {int(i): round(float(b), 4) for i, b in zip(ids, pop)}
+
+
+def write_boosts(boosts: Dict[int, float], chunk_size: int = 500) -> Dict[str, int]:
+    """
+    Mises à jour partielles bulk (`update` + `doc`): on ne touche que `boost`.
+    Les events absents de l'index sont ignorés (erreurs 404 comptées).
+    """
+    if not boosts:
+        return {"updated": 0, "errors": 0}
+
+    from elasticsearch.helpers import bulk
+
+    actions = (
+        {
+            "_op_type": "update",
+            "_index": INDEX_EVENTS,
+            "_id": str(event_id),
+            "doc": {"boost": boost},
+        }
+        for event_id, boost in boosts.items()
+    )
+
+    updated, errors = bulk(
+        es_client,
+        actions,
+        chunk_size=chunk_size,
+        raise_on_error=False,
+        stats_only=True,
+    )
+    return {"updated": int(updated), "errors": int(errors)}
+
+
+def recompute_event_boosts(half_life_days: Optional[float] = None) -> Dict[str, Any]:
+    rows = fetch_popularity_signals()
+    boosts = compute_boosts(
+        rows,
+        half_life_days=half_life_days if half_life_days is not None else POPULARITY_HALF_LIFE_DAYS,
+    )
+    result = write_boosts(boosts)
+    return {"events": len(rows), **result}
+
+
+if __name__ == "__main__":
+    print(recompute_event_boosts())
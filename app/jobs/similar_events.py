@@ -0,0 +1,204 @@
+# app/jobs/similar_events.py
+"""
+"Events similaires" précalculés, servis par GET /events/{event_id}/similar.
+
+Tous les vecteurs d'events (embedding_vector) sont chargés en une matrice
+normalisée; les cosinus sont calculés par blocs de lignes (V_bloc · Vᵀ) et
+on garde, par event, les SIMILAR_EVENTS_TOP_K meilleurs voisins :
+  - à venir (dateEvent >= aujourd'hui, ou sans date)
+  - à moins de SIMILAR_EVENTS_RADIUS_KM (quand les deux events sont géolocalisés)
+  - de similarité >= SIMILAR_EVENTS_MIN_SCORE
+Stockage CSR compact (app/services/neighbors.py).
+
+À lancer périodiquement (Airflow), au moins une fois par jour (dates) :
+    python -m app.jobs.similar_events
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import (
+    INDEX_EVENTS,
+    SIMILAR_EVENTS_MIN_SCORE,
+    SIMILAR_EVENTS_PATH,
+    SIMILAR_EVENTS_RADIUS_KM,
+    SIMILAR_EVENTS_TOP_K,
+)
+from app.core.es import es_client
+from app.services.neighbors import save_neighbors
+
+VECTOR_FIELD = "embedding_vector"
+GEO_FIELD = "localisation"
+DATE_FIELD = "dateEvent"
+PUBLISHED_FIELD = "datePublication"
+
+# lignes par bloc: bloc x N cosinus en float32 (1024 x 50k ~ 200 Mo)
+_BLOCK_SIZE = 1024
+_EARTH_RADIUS_KM = 6371.0
+
+
+def _parse_geo(value: Any) -> Tuple[float, float]:
+    """geo_point ES ({lat, lon} | [lon, lat] | "lat,lon") -> (lat, lon), nan si absent."""
+    nan = float("nan")
+    try:
+        if isinstance(value, dict):
+            return float(value["lat"]), float(value["lon"])
+        if isinstance(value, (list, tuple)) and len(value) == 2:
+            return float(value[1]), float(value[0])
+        if isinstance(value, str) and "," in value:
+            lat, lon = value.split(",", 1)
+            return float(lat), float(lon)
+    except (KeyError, TypeError, ValueError):
+        pass
+    return nan, nan
+
+
+def _parse_day(value: Any) -> int:
+    """Date ES ("YYYY-MM-DD...") -> numéro de jour (ordinal), -1 si absente / illisible."""
+    if not value:
+        return -1
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return -1
+
+
+def load_event_vectors(query: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Scan de l'index: ids, vecteurs normalisés (float32), lat/lon (radians, nan si absent),
+    jour de l'event (ordinal, -1 si absent), événement à venir, datePublication max.
+    `query` restreint le scan (rafraîchissement incrémental du moteur vectoriel).
+    """
+    import numpy as np
+    from elasticsearch.helpers import scan
+
+    ids: List[int] = []
+    vectors: List[List[float]] = []
+    geo: List[Tuple[float, float]] = []
+    days: List[int] = []
+    max_published: Optional[str] = None
+
+    filters: List[Dict[str, Any]] = [{"exists": {"field": VECTOR_FIELD}}]
+    if query:
+        filters.append(query)
+
+    for hit in scan(
+        es_client,
+        index=INDEX_EVENTS,
+        query={"query": {"bool": {"filter": filters}}},
+        _source=[VECTOR_FIELD, GEO_FIELD, DATE_FIELD, PUBLISHED_FIELD],
+        size=1000,
+    ):
+        src = hit.get("_source") or {}
+        vec = src.get(VECTOR_FIELD)
+        try:
+            event_id = int(hit["_id"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not vec:
+            continue
+        ids.append(event_id)
+        vectors.append(vec)
+        geo.append(_parse_geo(src.get(GEO_FIELD)))
+        days.append(_parse_day(src.get(DATE_FIELD)))
+        published = src.get(PUBLISHED_FIELD)
+        if published and (max_published is None or str(published) > max_published):
+            max_published = str(published)
+
+    if not ids:
+        return {"ids": np.empty(0, dtype=np.int32), "max_published": None}
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.maximum(norms, 1e-12)
+
+    coords = np.radians(np.asarray(geo, dtype=np.float64))
+    day = np.asarray(days, dtype=np.int32)
+    return {
+        "ids": np.asarray(ids, dtype=np.int32),
+        "matrix": matrix,
+        "lat": coords[:, 0],
+        "lon": coords[:, 1],
+        "day": day,
+        "upcoming": (day < 0) | (day >= date.today().toordinal()),
+        "max_published": max_published,
+    }
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Distances (bloc x candidats) en km; coordonnées en radians, broadcast numpy."""
+    import numpy as np
+
+    dlat = lat2[None, :] - lat1[:, None]
+    dlon = lon2[None, :] - lon1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def compute_similar_events(
+    data: Dict[str, Any],
+    top_k: int = SIMILAR_EVENTS_TOP_K,
+    radius_km: float = SIMILAR_EVENTS_RADIUS_KM,
+    min_score: float = SIMILAR_EVENTS_MIN_SCORE,
+) -> Dict[int, List[Tuple[int, float]]]:
+    """event_id -> [(event_id similaire, cosinus)] (tous les events en source, voisins à venir)."""
+    import numpy as np
+
+    ids = data["ids"]
+    if not len(ids):
+        return {}
+
+    # candidats = events à venir seulement
+    cand = np.flatnonzero(data["upcoming"])
+    if not len(cand):
+        return {}
+    cand_matrix = data["matrix"][cand]
+    cand_lat, cand_lon = data["lat"][cand], data["lon"][cand]
+    cand_has_geo = ~np.isnan(cand_lat)
+    k = min(top_k, len(cand))
+
+    neighbors: Dict[int, List[Tuple[int, float]]] = {}
+    for start in range(0, len(ids), _BLOCK_SIZE):
+        stop = min(start + _BLOCK_SIZE, len(ids))
+        sims = data["matrix"][start:stop] @ cand_matrix.T  # (bloc, candidats)
+
+        # pas soi-même
+        rows_self, cols_self = np.nonzero(cand[None, :] == np.arange(start, stop)[:, None])
+        sims[rows_self, cols_self] = -np.inf
+
+        # rayon géo, seulement quand les deux events ont une position
+        lat, lon = data["lat"][start:stop], data["lon"][start:stop]
+        has_geo = ~np.isnan(lat)
+        if radius_km > 0 and has_geo.any() and cand_has_geo.any():
+            dist = _haversine_km(np.nan_to_num(lat), np.nan_to_num(lon), np.nan_to_num(cand_lat), np.nan_to_num(cand_lon))
+            too_far = (dist > radius_km) & has_geo[:, None] & cand_has_geo[None, :]
+            sims[too_far] = -np.inf
+
+        sims[sims < min_score] = -np.inf
+
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+        for local in range(stop - start):
+            valid = np.isfinite(top_sims[local])
+            if not valid.any():
+                continue
+            neighbors[int(ids[start + local])] = [
+                (int(ids[cand[c]]), round(float(s), 4))
+                for c, s in zip(top[local][valid], top_sims[local][valid])
+            ]
+
+    return neighbors
+
+
+def rebuild_similar_events(path: Optional[str] = None) -> Dict[str, Any]:
+    data = load_event_vectors()
+    neighbors = compute_similar_events(data)
+    written = save_neighbors(path or SIMILAR_EVENTS_PATH, neighbors)
+    return {"events": int(len(data["ids"])), **written}
+
+
+if __name__ == "__main__":
+    print(rebuild_similar_events())
@@ -1,5 +1,14 @@
 from fastapi import FastAPI
-from .core.es import init_indices
+from fastapi.responses import JSONResponse
+from .core.config import API_ROUTERS
+from .core.readiness import (
+    is_ready,
+    readiness_status,
+    start_background_startup,
+    stop_background_startup,
+)
+from .core.db import close_async_pool, close_async_replica_pools, close_pool, close_replica_pools
+from .core.es import close_async_es_client
 from .api.v1.api import api_router
 
 app = FastAPI(
@@ -7,8 +16,55 @@ app = FastAPI(
     version="0.1.0",
 )
 
+def _serves_recommendations() -> bool:
+    return not API_ROUTERS or any(r.startswith("recommendations") for r in API_ROUTERS)
+
+
 @app.on_event("startup")
 def startup():
-    init_indices()
+    # init des index + warm-up en arrière-plan: le worker démarre même si ES est lent
+    start_background_startup()
+    if not _serves_recommendations():
+        return
+    # importés ici: un worker sans routers de reco (API_ROUTERS=indexing) ne charge pas numpy
+    from .services.follow_graph import start_follow_graph_refresher
+    from .services.vector_engine import start_vector_engine_refresher
+
+    # graphe de follow (flags + amis d'amis) chargé en tâche de fond, SQL en attendant
+    start_follow_graph_refresher()
+    # moteur vectoriel local: snapshot memmap + events publiés depuis
+    start_vector_engine_refresher()
+
+@app.on_event("shutdown")
+def shutdown():
+    stop_background_startup()
+    if _serves_recommendations():
+        from .services.follow_graph import stop_follow_graph_refresher
+        from .services.vector_engine import stop_vector_engine_refresher
+
+        stop_follow_graph_refresher()
+        stop_vector_engine_refresher()
+    close_pool()
+    close_replica_pools()
+
+
+@app.on_event("shutdown")
+async def shutdown_async():
+    await close_async_pool()
+    await close_async_replica_pools()
+    await close_async_es_client()
+
+
+@app.get("/health/live", tags=["health"])
+def liveness():
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["health"])
+def readiness():
+    status = readiness_status()
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"status": "starting", **status})
+    return {"status": "ready", **status}
 
 app.include_router(api_router, prefix="/api/v1")
@@ -1,6 +1,7 @@
 from ..core.es import es_client
-from ..core.config import INDEX_EVENTS
+from ..core.config import INDEX_EVENTS, EVENTS_DENORMALIZED, EVENT_CARD_FIELD
 from ..schemas import EventIn
+from ..services.event_hydration import build_event_cards
 from typing import List
 
 
@@ -29,13 +30,18 @@ def index_event(e: EventIn) -> None:
         "isFull": e.isFull,
     }
 
-    if e.lat is not None and e.lon is not None:
-        doc["latlon"] = {"lat": e.lat, "lon": e.lon}
+    # mise à jour partielle: un event sans position efface l'ancienne
+    doc["latlon"] = {"lat": e.lat, "lon": e.lon} if e.lat is not None and e.lon is not None else None
 
-    if e.vectorPreferenceEvent is not None:
-        doc["vectorPreferenceEvent"] = e.vectorPreferenceEvent
+    # idem pour le vecteur et la carte: null explicite, sinon doc_as_upsert garde l'ancien
+    doc["vectorPreferenceEvent"] = e.vectorPreferenceEvent
 
-    es_client.index(index=INDEX_EVENTS, id=str(e.id), document=doc)
+    if EVENTS_DENORMALIZED:
+        doc[EVENT_CARD_FIELD] = build_event_cards([e.id]).get(e.id) or None
+
+    # update + upsert (pas index): les champs calculés à part (`boost`, app/jobs/popularity.py)
+    # ne sont pas effacés par une ré-indexation
+    es_client.update(index=INDEX_EVENTS, id=str(e.id), doc=doc, doc_as_upsert=True)
 
 
 def bulk_index_events(events: List[EventIn]) -> None:
@@ -44,6 +50,9 @@ def bulk_index_events(events: List[EventIn]) -> None:
 
     from elasticsearch.helpers import bulk
 
+    # mode dénormalisé: 1 seule requête SQL pour toutes les cartes du batch
+    cards = build_event_cards([e.id for e in events]) if EVENTS_DENORMALIZED else {}
+
     actions = []
     for e in events:
         source = {
@@ -70,17 +79,20 @@ def bulk_index_events(events: List[EventIn]) -> None:
             "isFull": e.isFull,
         }
 
-        if e.lat is not None and e.lon is not None:
-            source["latlon"] = {"lat": e.lat, "lon": e.lon}
+        source["latlon"] = {"lat": e.lat, "lon": e.lon} if e.lat is not None and e.lon is not None else None
+
+        source["vectorPreferenceEvent"] = e.vectorPreferenceEvent
 
-        if e.vectorPreferenceEvent is not None:
-            source["vectorPreferenceEvent"] = e.vectorPreferenceEvent
+        if EVENTS_DENORMALIZED:
+            source[EVENT_CARD_FIELD] = cards.get(e.id) or None
 
+        # update + upsert: conserve `boost` (voir index_event)
         actions.append({
-            "_op_type": "index",
+            "_op_type": "update",
             "_index": INDEX_EVENTS,
             "_id": str(e.id),
-            "_source": source,
+            "doc": source,
+            "doc_as_upsert": True,
         })
 
     bulk(es_client, actions)
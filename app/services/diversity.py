@@ -0,0 +1,74 @@
+# app/services/diversity.py
+"""
+Re-classement MMR (maximal marginal relevance) des candidats de reco.
+
+  mmr(i) = lambda * pertinence(i) - (1 - lambda) * max_{j choisi} cos(i, j)
+
+Pertinence = score ramené dans [0, 1] sur la fenêtre; vecteurs = embeddings des
+candidats, renvoyés par la même recherche ES (_source: embedding_vector).
+La matrice de similarité est calculée une fois (n x n); chaque sélection ne met à
+jour qu'un vecteur de "similarité max aux déjà choisis" => O(k·n) après la matrice.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VECTOR_FIELD = "embedding_vector"
+
+
+def hit_vectors(hits: List[Dict[str, Any]]) -> Dict[int, Sequence[float]]:
+    """id -> embedding lu dans le _source des hits (absent si non renvoyé)."""
+    out: Dict[int, Sequence[float]] = {}
+    for h in hits:
+        vec = (h.get("_source") or {}).get(VECTOR_FIELD)
+        if not vec:
+            continue
+        try:
+            out[int(h.get("_id"))] = vec
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+def mmr_order(
+    ranked: List[Tuple[int, float]],
+    vectors: Dict[int, Sequence[float]],
+    lambda_: float,
+    k: Optional[int] = None,
+) -> List[int]:
+    """
+    [(id, score)] classés -> ids ré-ordonnés: les k premiers choisis par MMR,
+    puis le reste dans l'ordre du score. lambda_ >= 1 (ou pas de vecteurs): ordre inchangé.
+    Un candidat sans vecteur n'est similaire à rien (il ne pénalise ni n'est pénalisé).
+    """
+    ids = [item_id for item_id, _ in ranked]
+    if lambda_ >= 1.0 or len(ids) < 3 or not vectors:
+        return ids
+
+    dims = len(next(iter(vectors.values())))
+    matrix = np.zeros((len(ids), dims), dtype=np.float32)
+    for row, item_id in enumerate(ids):
+        vec = vectors.get(item_id)
+        if vec is not None and len(vec) == dims:
+            matrix[row] = vec
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    sim = matrix @ matrix.T
+
+    scores = np.asarray([s for _, s in ranked], dtype=np.float64)
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones(len(ids))
+
+    k = len(ids) if k is None else min(k, len(ids))
+    max_sim = np.zeros(len(ids))
+    chosen = np.zeros(len(ids), dtype=bool)
+    picked: List[int] = []
+    for _ in range(k):
+        mmr = lambda_ * relevance - (1.0 - lambda_) * max_sim
+        mmr[chosen] = -np.inf
+        best = int(np.argmax(mmr))
+        picked.append(best)
+        chosen[best] = True
+        np.maximum(max_sim, sim[best], out=max_sim)
+
+    rest = [i for i in range(len(ids)) if not chosen[i]]
+    return [ids[i] for i in picked + rest]
@@ -0,0 +1,174 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.cache import TTLCache, register_cache
+from app.core.config import (
+    EVENTS_DENORMALIZED,
+    EVENT_CARD_FIELD,
+    EVENT_CACHE_ENABLED,
+    EVENT_CACHE_MAX,
+    EVENT_CACHE_TTL_S,
+)
+from app.core.metrics import incr, timed
+from app.core.singleflight import coalesce, coalesce_async
+from app.api.v1.sql.fetch_events_with_relations_by_ids import (
+    fetch_events_with_relations_by_ids,
+    fetch_events_with_relations_by_ids_async,
+)
+
+# event_id -> ligne hydratée (FETCH_EVENTS_SQL). Invalidé par /index/events(/bulk).
+_event_cache = register_cache("events_hydration", TTLCache(EVENT_CACHE_MAX, EVENT_CACHE_TTL_S))
+
+
+def _event_id(ev: Dict[str, Any]) -> Optional[int]:
+    raw_id = ev.get("id") or ev.get("event_id") or ev.get("eventId")
+    try:
+        return int(raw_id)
+    except Exception:
+        return None
+
+
+def event_source_filter(*includes: str) -> Union[bool, Dict[str, Any]]:
+    """
+    `_source` à envoyer à ES pour une recherche d'events.
+    - mode classique: seulement les champs demandés (ou rien)
+    - mode dénormalisé: on ajoute la carte pour éviter le SQL
+    """
+    fields = list(includes)
+    if EVENTS_DENORMALIZED:
+        fields.append(EVENT_CARD_FIELD)
+    if not fields:
+        return False
+    return {"includes": fields}
+
+
+def build_event_cards(event_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Cartes JSON-safe (même contenu que FETCH_EVENTS_SQL) à stocker dans ES.
+    Appelé à l'indexation: c'est le chemin d'écriture qui paye le SQL.
+    """
+    cards: Dict[int, Dict[str, Any]] = {}
+    for ev in fetch_events_with_relations_by_ids(list(event_ids)):
+        eid = _event_id(ev)
+        if eid is not None:
+            cards[eid] = jsonable_encoder(ev)
+    return cards
+
+
+def fetch_events_cached(event_ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    fetch_events_with_relations_by_ids avec cache par event:
+    les hits viennent de la mémoire, les ids manquants partent en 1 seule requête.
+    Ordre des ids conservé.
+    """
+    if not event_ids:
+        return []
+    if not EVENT_CACHE_ENABLED:
+        return fetch_events_with_relations_by_ids(list(event_ids))
+
+    by_id: Dict[int, Dict[str, Any]] = _event_cache.get_many(event_ids)
+    missing = [eid for eid in dict.fromkeys(event_ids) if eid not in by_id]
+    if missing:
+        # même lot d'ids déjà en cours de chargement (requêtes identiques simultanées): on l'attend
+        key = tuple(sorted(missing))
+        by_id.update(coalesce("hydrate.events", key, lambda: _cache_rows(fetch_events_with_relations_by_ids(missing))))
+
+    return [by_id[eid] for eid in event_ids if eid in by_id]
+
+
+async def fetch_events_cached_async(event_ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """Version async de fetch_events_cached (pool async pour les ids manquants)."""
+    if not event_ids:
+        return []
+    if not EVENT_CACHE_ENABLED:
+        return await fetch_events_with_relations_by_ids_async(list(event_ids))
+
+    by_id: Dict[int, Dict[str, Any]] = _event_cache.get_many(event_ids)
+    missing = [eid for eid in dict.fromkeys(event_ids) if eid not in by_id]
+    if missing:
+
+        async def load() -> Dict[int, Dict[str, Any]]:
+            return _cache_rows(await fetch_events_with_relations_by_ids_async(missing))
+
+        by_id.update(await coalesce_async("hydrate.events", tuple(sorted(missing)), load))
+
+    return [by_id[eid] for eid in event_ids if eid in by_id]
+
+
+def _cache_rows(rows: Iterable[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    fetched: Dict[int, Dict[str, Any]] = {}
+    for ev in rows:
+        eid = _event_id(ev)
+        if eid is not None:
+            fetched[eid] = ev
+    _event_cache.set_many(fetched)
+    return fetched
+
+
+def invalidate_events(event_ids: Iterable[int]) -> None:
+    """Appelé par les endpoints d'indexation: l'event a changé côté source."""
+    _event_cache.delete_many(int(eid) for eid in event_ids)
+
+
+def _cards_from_hits(hits: Optional[Iterable[Dict[str, Any]]]) -> Dict[int, Dict[str, Any]]:
+    by_id: Dict[int, Dict[str, Any]] = {}
+    if EVENTS_DENORMALIZED and hits:
+        for h in hits:
+            card = (h.get("_source") or {}).get(EVENT_CARD_FIELD)
+            if not card:
+                continue
+            eid = _event_id(card)
+            if eid is not None:
+                by_id[eid] = card
+    return by_id
+
+
+def hydrate_events(
+    event_ids: Sequence[int],
+    hits: Optional[Iterable[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Events complets dans l'ordre de `event_ids`.
+    Les cartes présentes dans le _source des hits sont utilisées telles quelles,
+    seuls les ids sans carte (docs pas encore ré-indexés) passent par Postgres.
+    """
+    if not event_ids:
+        return []
+
+    by_id = _cards_from_hits(hits)
+    missing = [eid for eid in event_ids if eid not in by_id]
+    incr("hydration.events.from_card", len(by_id))
+    if missing:
+        incr("hydration.events.from_db_or_cache", len(missing))
+        with timed("db.hydrate.events", ids=len(missing)):
+            rows = fetch_events_cached(missing)
+        for ev in rows:
+            eid = _event_id(ev)
+            if eid is not None:
+                by_id[eid] = ev
+
+    return [by_id[eid] for eid in event_ids if eid in by_id]
+
+
+async def hydrate_events_async(
+    event_ids: Sequence[int],
+    hits: Optional[Iterable[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """Version async de hydrate_events."""
+    if not event_ids:
+        return []
+
+    by_id = _cards_from_hits(hits)
+    missing = [eid for eid in event_ids if eid not in by_id]
+    incr("hydration.events.from_card", len(by_id))
+    if missing:
+        incr("hydration.events.from_db_or_cache", len(missing))
+        with timed("db.hydrate.events_async", ids=len(missing)):
+            rows = await fetch_events_cached_async(missing)
+        for ev in rows:
+            eid = _event_id(ev)
+            if eid is not None:
+                by_id[eid] = ev
+
+    return [by_id[eid] for eid in event_ids if eid in by_id]
@@ -0,0 +1,71 @@
+# app/services/feed_sessions.py
+"""
+Sessions de feed: la liste classée de candidats d'un user est calculée une fois,
+gardée en mémoire (LRU + TTL), puis servie page par page via un curseur opaque.
+
+Curseur = base64url(JSON {s: session, u: user, k: type, o: offset}).
+Les sessions sont locales au worker: si elle a expiré (ou si la page suivante
+arrive sur un autre worker), l'appelant recalcule la liste et reprend à l'offset.
+La session garde la liste brute du ranking (stable sur la journée), sans le
+filtre des déjà vus: celui-ci change entre deux pages, il est appliqué page par
+page (impressions.unseen_page) et l'offset indexe toujours la liste brute.
+"""
+import base64
+import binascii
+import json
+import secrets
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import TTLCache, register_cache
+from app.core.config import FEED_SESSION_TTL_S, FEED_SESSIONS_MAX
+
+_sessions = register_cache("feed_sessions", TTLCache(FEED_SESSIONS_MAX, FEED_SESSION_TTL_S))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(session_id: str, user_id: int, kind: str, offset: int) -> str:
+    raw = json.dumps({"s": session_id, "u": user_id, "k": kind, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, user_id: int, kind: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        parsed = {"s": str(data["s"]), "u": int(data["u"]), "k": str(data["k"]), "o": int(data["o"])}
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Curseur invalide") from e
+    if parsed["u"] != user_id or parsed["k"] != kind or parsed["o"] < 0:
+        raise InvalidCursor("Curseur invalide pour ce feed")
+    return parsed
+
+
+def create_session(
+    user_id: int,
+    kind: str,
+    ids: List[int],
+    context: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """context: ce dont la sérialisation des pages a besoin (geo du user, ...)."""
+    session = {
+        "id": session_id or secrets.token_urlsafe(12),
+        "user_id": user_id,
+        "kind": kind,
+        "ids": ids,
+        "context": context or {},
+        "created_at": time.time(),
+    }
+    _sessions.set(session["id"], session)
+    return session
+
+
+def get_session(session_id: str, user_id: int, kind: str) -> Optional[Dict[str, Any]]:
+    session = _sessions.get(session_id)
+    if session is None or session["user_id"] != user_id or session["kind"] != kind:
+        return None
+    return session
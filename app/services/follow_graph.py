@@ -0,0 +1,452 @@
+# app/services/follow_graph.py
+"""
+Graphe de follow en mémoire (par worker), au format CSR avec des ids int32.
+
+profil_friends(winker=cible, friends=follower) est chargé en bloc, puis rafraîchi
+incrémentalement, toujours sur le primaire (une réplica en retard ferait passer
+des lignes pas encore rejouées pour des unfollows):
+  - lignes d'id > dernier id vu - FOLLOW_GRAPH_REREAD_IDS: nouvelles lignes,
+    lignes commitées en retard sous le dernier id vu, et unfollows dans cette fenêtre
+  - sous la fenêtre, unfollows détectés par un count(*) comparé aux lignes chargées
+Ces changements vont dans un petit delta fusionné dans le CSR au-delà de
+FOLLOW_GRAPH_DELTA_MAX; rechargement complet toutes les FOLLOW_GRAPH_FULL_REFRESH_S
+par sécurité.
+
+Sert, sans SQL sur le chemin de requête :
+  - les flags isFollowing / isFollowBack
+  - les candidats "amis d'amis" (+ nb de connexions communes) des recos winkers
+Tant que le graphe n'est pas chargé, get_follow_graph() renvoie None et les
+appelants repassent par le SQL.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.core.config import (
+    API_ROUTERS,
+    FOLLOW_GRAPH_DELTA_MAX,
+    FOLLOW_GRAPH_ENABLED,
+    FOLLOW_GRAPH_FULL_REFRESH_S,
+    FOLLOW_GRAPH_REFRESH_S,
+    FOLLOW_GRAPH_REREAD_IDS,
+)
+from app.core.db import get_conn
+from app.core.metrics import incr, set_gauge, timed
+
+logger = logging.getLogger(__name__)
+
+# follower -> cible, par id croissant (reprise incrémentale sur l'id)
+FOLLOW_EDGES_SQL = """
+SELECT id, friends_id, winker_id
+FROM profil_friends
+WHERE id > %s
+ORDER BY id
+"""
+
+# détection des unfollows sous la fenêtre relue: nb de lignes encore présentes
+FOLLOW_EDGES_COUNT_SQL = "SELECT count(*) FROM profil_friends WHERE id <= %s"
+FOLLOW_EDGE_IDS_SQL = "SELECT id FROM profil_friends WHERE id <= %s ORDER BY id"
+
+_FETCH_CHUNK = 50000
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+class _CSR:
+    """Adjacence compressée: voisins de `node` = indices[indptr[node]:indptr[node + 1]] (triés)."""
+
+    def __init__(self, src: np.ndarray, dst: np.ndarray, num_nodes: int):
+        order = np.lexsort((dst, src))
+        self.indices = dst[order].astype(np.int32, copy=False)
+        counts = np.bincount(src, minlength=num_nodes)
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+
+    def row(self, node: int) -> np.ndarray:
+        if node < 0 or node + 1 >= len(self.indptr):
+            return _EMPTY
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+
+class _Base:
+    """Lignes chargées (id, follower, cible) triées par id + CSR des deux sens (immuable)."""
+
+    def __init__(self, ids: np.ndarray, src: np.ndarray, dst: np.ndarray):
+        self.ids = ids
+        self.src = src
+        self.dst = dst
+        self.built_at = time.time()
+
+        # dédup (follower, cible) via une clé 64 bits
+        if len(src):
+            keys = np.unique((src.astype(np.int64) << 32) | dst.astype(np.int64))
+            src = (keys >> 32).astype(np.int32)
+            dst = (keys & 0xFFFFFFFF).astype(np.int32)
+        num_nodes = int(max(src.max(), dst.max())) + 1 if len(src) else 0
+        self.num_edges = len(src)
+        self.following = _CSR(src, dst, num_nodes)   # u -> ceux que u suit
+        self.followers = _CSR(dst, src, num_nodes)   # v -> ceux qui suivent v
+
+    def rows_for(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(ids, follower, cible) des lignes de la base parmi `ids`."""
+        if not len(self.ids):
+            return self.ids, self.src, self.dst
+        pos = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        pos = pos[self.ids[pos] == ids]
+        return self.ids[pos], self.src[pos], self.dst[pos]
+
+
+class _Delta:
+    """
+    Changements depuis la dernière fusion, petits et en dict/set:
+    lignes ajoutées (id -> paire) et lignes de la base supprimées (id -> paire),
+    plus les surcouches par nœud lues par les requêtes.
+    """
+
+    def __init__(self) -> None:
+        self.added: Dict[int, Tuple[int, int]] = {}
+        self.removed: Dict[int, Tuple[int, int]] = {}
+        self.out_add: Dict[int, Set[int]] = {}
+        self.out_del: Dict[int, Set[int]] = {}
+        self.in_add: Dict[int, Set[int]] = {}
+        self.in_del: Dict[int, Set[int]] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.added) + len(self.removed)
+
+    def copy(self) -> "_Delta":
+        d = _Delta()
+        d.added = dict(self.added)
+        d.removed = dict(self.removed)
+        for name in ("out_add", "out_del", "in_add", "in_del"):
+            setattr(d, name, {k: set(v) for k, v in getattr(self, name).items()})
+        return d
+
+    def add(self, edge_id: int, src: int, dst: int) -> None:
+        self.added[edge_id] = (src, dst)
+        self.out_add.setdefault(src, set()).add(dst)
+        self.in_add.setdefault(dst, set()).add(src)
+        self.out_del.get(src, set()).discard(dst)
+        self.in_del.get(dst, set()).discard(src)
+
+    def remove(self, edge_id: int, src: int, dst: int) -> None:
+        if self.added.pop(edge_id, None) is None:
+            self.removed[edge_id] = (src, dst)
+        self.out_add.get(src, set()).discard(dst)
+        self.in_add.get(dst, set()).discard(src)
+        # une paire en double (deux lignes) est rétablie à la prochaine fusion
+        self.out_del.setdefault(src, set()).add(dst)
+        self.in_del.setdefault(dst, set()).add(src)
+
+
+def _overlay(base: np.ndarray, added: Optional[Set[int]], removed: Optional[Set[int]]) -> np.ndarray:
+    if removed:
+        base = base[~np.isin(base, np.fromiter(removed, dtype=np.int32, count=len(removed)))]
+    if added:
+        base = np.union1d(base, np.fromiter(added, dtype=np.int32, count=len(added)))
+    return base
+
+
+class FollowGraph:
+    """
+    Instantané immuable: base CSR + petit delta (ajouts, unfollows).
+    Un refresh publie un nouvel instantané qui partage la base; la base n'est
+    reconstruite qu'à la fusion du delta (FOLLOW_GRAPH_DELTA_MAX) ou au rechargement complet.
+    """
+
+    def __init__(self, base: _Base, last_edge_id: int, delta: Optional[_Delta] = None):
+        self.base = base
+        self.delta = delta or _Delta()
+        self.last_edge_id = last_edge_id
+
+    @classmethod
+    def from_rows(cls, ids: np.ndarray, src: np.ndarray, dst: np.ndarray, last_edge_id: int) -> "FollowGraph":
+        return cls(_Base(ids, src, dst), last_edge_id)
+
+    @property
+    def num_edges(self) -> int:
+        return self.base.num_edges + len(self.delta.added) - len(self.delta.removed)
+
+    @property
+    def num_rows(self) -> int:
+        """Lignes profil_friends représentées."""
+        return len(self.base.ids) + len(self.delta.added) - len(self.delta.removed)
+
+    def row_ids(self, after_id: int = -1, upto_id: Optional[int] = None) -> np.ndarray:
+        """Ids des lignes représentées dans ]after_id, upto_id], triés."""
+        upto = self.last_edge_id if upto_id is None else upto_id
+        ids = self.base.ids
+        ids = ids[np.searchsorted(ids, after_id, side="right"):np.searchsorted(ids, upto, side="right")]
+        removed = [i for i in self.delta.removed if after_id < i <= upto]
+        if removed:
+            ids = ids[~np.isin(ids, np.asarray(removed, dtype=np.int64))]
+        added = [i for i in self.delta.added if after_id < i <= upto]
+        if added:
+            ids = np.union1d(ids, np.asarray(added, dtype=np.int64))
+        return ids
+
+    def following_of(self, node: int) -> np.ndarray:
+        d = self.delta
+        return _overlay(self.base.following.row(node), d.out_add.get(node), d.out_del.get(node))
+
+    def followers_of(self, node: int) -> np.ndarray:
+        d = self.delta
+        return _overlay(self.base.followers.row(node), d.in_add.get(node), d.in_del.get(node))
+
+    def with_changes(
+        self,
+        ids: np.ndarray,
+        src: np.ndarray,
+        dst: np.ndarray,
+        removed_ids: np.ndarray,
+        last_edge_id: int,
+    ) -> "FollowGraph":
+        """Applique unfollows puis nouvelles lignes; fusionne dans la base si le delta devient gros."""
+        delta = self.delta.copy()
+        if len(removed_ids):
+            for edge_id in removed_ids.tolist():
+                pair = delta.added.get(edge_id)
+                if pair is not None:
+                    delta.remove(edge_id, *pair)
+            r_ids, r_src, r_dst = self.base.rows_for(removed_ids)
+            for edge_id, s, t in zip(r_ids.tolist(), r_src.tolist(), r_dst.tolist()):
+                delta.remove(edge_id, s, t)
+        for edge_id, s, t in zip(ids.tolist(), src.tolist(), dst.tolist()):
+            delta.add(edge_id, s, t)
+
+        graph = FollowGraph(self.base, last_edge_id, delta)
+        if delta.size > FOLLOW_GRAPH_DELTA_MAX:
+            graph = graph.merged()
+        return graph
+
+    def merged(self) -> "FollowGraph":
+        """Nouvelle base = lignes de la base encore présentes + lignes ajoutées, delta vide."""
+        base, delta = self.base, self.delta
+        keep = ~np.isin(base.ids, np.fromiter(delta.removed, dtype=np.int64)) if delta.removed else slice(None)
+        ids, src, dst = base.ids[keep], base.src[keep], base.dst[keep]
+        if delta.added:
+            added = sorted(delta.added.items())
+            ids = np.concatenate([ids, np.fromiter((i for i, _ in added), dtype=np.int64)])
+            src = np.concatenate([src, np.fromiter((p[0] for _, p in added), dtype=np.int32)])
+            dst = np.concatenate([dst, np.fromiter((p[1] for _, p in added), dtype=np.int32)])
+        incr("follow_graph.merge")
+        return FollowGraph.from_rows(ids, src, dst, self.last_edge_id)
+
+    def follow_flags(self, user_id: int, target_ids: Sequence[int]) -> Tuple[Set[int], Set[int]]:
+        """Même contrat que fetch_follow_flags_async: (ids que user_id suit, ids qui suivent user_id)."""
+        if not target_ids:
+            return set(), set()
+        targets = np.asarray(target_ids, dtype=np.int64)
+        following = targets[np.isin(targets, self.following_of(user_id), assume_unique=False)]
+        follow_back = targets[np.isin(targets, self.followers_of(user_id), assume_unique=False)]
+        return {int(i) for i in following}, {int(i) for i in follow_back}
+
+    def friends_of_friends(self, user_id: int, limit: int, max_fanout: int) -> List[Tuple[int, int]]:
+        """
+        Winkers suivis par ceux que user_id suit, hors lui-même et ceux qu'il suit déjà.
+        -> [(id, nb de connexions communes)], du plus connecté au moins connecté.
+        max_fanout borne le nombre de voisins directs explorés (comptes très suivis):
+        échantillon aléatoire, stable pour un même user_id (graine = user_id).
+        """
+        direct = self.following_of(user_id)
+        if not len(direct) or limit <= 0:
+            return []
+
+        if len(direct) > max_fanout:
+            rng = np.random.default_rng(user_id)
+            explored = rng.choice(direct, size=max_fanout, replace=False)
+        else:
+            explored = direct
+        rows = [self.following_of(int(n)) for n in explored]
+        reach = np.concatenate(rows) if rows else _EMPTY
+        if not len(reach):
+            return []
+
+        ids, counts = np.unique(reach, return_counts=True)
+        keep = (ids != user_id) & ~np.isin(ids, direct)
+        ids, counts = ids[keep], counts[keep]
+
+        top = np.argsort(-counts, kind="stable")[:limit]
+        return [(int(ids[i]), int(counts[i])) for i in top]
+
+
+_graph: Optional[FollowGraph] = None
+_refresh_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+_last_full_at = 0.0
+
+
+def get_follow_graph() -> Optional[FollowGraph]:
+    return _graph
+
+
+def _fetch_edges(conn: Any, after_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Lignes d'id > after_id, lues par paquets (curseur serveur) -> (ids int64, follower, cible int32)."""
+    id_parts: List[np.ndarray] = []
+    src_parts: List[np.ndarray] = []
+    dst_parts: List[np.ndarray] = []
+    last_id = after_id
+
+    with conn.cursor(name="follow_graph_edges") as cur:
+        cur.itersize = _FETCH_CHUNK
+        cur.execute(FOLLOW_EDGES_SQL, (after_id,))
+        while True:
+            rows = cur.fetchmany(_FETCH_CHUNK)
+            if not rows:
+                break
+            chunk = np.asarray(rows, dtype=np.int64)
+            last_id = int(chunk[-1, 0])
+            id_parts.append(chunk[:, 0])
+            src_parts.append(chunk[:, 1].astype(np.int32))
+            dst_parts.append(chunk[:, 2].astype(np.int32))
+
+    if not src_parts:
+        return np.empty(0, dtype=np.int64), _EMPTY, _EMPTY, last_id
+    return np.concatenate(id_parts), np.concatenate(src_parts), np.concatenate(dst_parts), last_id
+
+
+def _fetch_removed_ids(conn: Any, graph: FollowGraph, upto_id: int) -> np.ndarray:
+    """
+    Ids chargés d'id <= upto_id qui ont disparu de profil_friends (unfollows).
+    Un count(*) suffit tant que rien n'a été supprimé; la liste des ids n'est lue que sinon.
+    Une ligne commitée en retard sous upto_id peut masquer un unfollow (count égal):
+    rattrapé au rechargement complet.
+    """
+    loaded = graph.row_ids(upto_id=upto_id)
+    with conn.cursor() as cur:
+        cur.execute(FOLLOW_EDGES_COUNT_SQL, (upto_id,))
+        live_count = int(cur.fetchone()[0])
+    if live_count >= len(loaded):
+        return np.empty(0, dtype=np.int64)
+
+    parts: List[np.ndarray] = []
+    with conn.cursor(name="follow_graph_ids") as cur:
+        cur.itersize = _FETCH_CHUNK
+        cur.execute(FOLLOW_EDGE_IDS_SQL, (upto_id,))
+        while True:
+            rows = cur.fetchmany(_FETCH_CHUNK)
+            if not rows:
+                break
+            parts.append(np.asarray(rows, dtype=np.int64)[:, 0])
+    live_ids = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+    return np.setdiff1d(loaded, live_ids, assume_unique=True)
+
+
+def _window_changes(
+    graph: FollowGraph,
+    window_start: int,
+    ids: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lignes relues d'id > window_start, comparées au graphe:
+    -> (ids, follower, cible) absents du graphe, ids du graphe disparus de la fenêtre.
+    """
+    loaded = graph.row_ids(after_id=window_start)
+    live_window = ids[ids <= graph.last_edge_id]
+    removed = np.setdiff1d(loaded, live_window, assume_unique=True)
+    new = ~np.isin(ids, loaded)
+    return ids[new], src[new], dst[new], removed
+
+
+def refresh_follow_graph(full: bool = False) -> Dict[str, Any]:
+    """Rechargement complet (ou premier chargement) / ajouts + unfollows depuis le dernier refresh."""
+    global _graph, _last_full_at
+
+    with _refresh_lock:
+        current = _graph
+        full = full or current is None
+        after_id = 0 if full else max(0, current.last_edge_id - FOLLOW_GRAPH_REREAD_IDS)
+        removed = np.empty(0, dtype=np.int64)
+
+        with timed("follow_graph.refresh", full=full):
+            # primaire uniquement: l'état incrémental suppose une source qui ne recule pas
+            with get_conn() as conn:
+                ids, src, dst, last_id = _fetch_edges(conn, after_id)
+                if not full:
+                    removed = _fetch_removed_ids(conn, current, after_id)
+            if not full:
+                ids, src, dst, removed_window = _window_changes(current, after_id, ids, src, dst)
+                removed = np.concatenate([removed, removed_window])
+                last_id = max(last_id, current.last_edge_id)
+            if full:
+                graph = FollowGraph.from_rows(ids, src, dst, last_id)
+                _last_full_at = time.monotonic()
+            elif len(ids) or len(removed):
+                graph = current.with_changes(ids, src, dst, removed, last_id)
+            else:
+                graph = current
+
+        _graph = graph
+        set_gauge("follow_graph.edges", graph.num_edges)
+        set_gauge("follow_graph.delta", graph.delta.size)
+        incr("follow_graph.refresh.full" if full else "follow_graph.refresh.incremental")
+        return {
+            "full": full,
+            "new_edges": int(len(src)),
+            "removed_edges": int(len(removed)),
+            "edges": graph.num_edges,
+        }
+
+
+def _run() -> None:
+    while not _stop.is_set():
+        try:
+            due_full = time.monotonic() - _last_full_at >= FOLLOW_GRAPH_FULL_REFRESH_S
+            refresh_follow_graph(full=due_full)
+        except Exception as e:  # PG indisponible: on garde l'instantané courant
+            incr("follow_graph.refresh.errors")
+            logger.warning("follow graph refresh failed: %s", e)
+        _stop.wait(FOLLOW_GRAPH_REFRESH_S)
+
+
+def start_follow_graph_refresher() -> None:
+    """Chargement + rafraîchissement en tâche de fond (workers qui servent les recos)."""
+    global _thread
+    if not FOLLOW_GRAPH_ENABLED:
+        return
+    if API_ROUTERS and not any(r.startswith("recommendations") for r in API_ROUTERS):
+        return
+    with _refresh_lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_run, name="follow-graph", daemon=True)
+        _thread.start()
+
+
+def stop_follow_graph_refresher() -> None:
+    _stop.set()
+
+
+def follow_graph_stats() -> Dict[str, Any]:
+    graph = _graph
+    if graph is None:
+        return {"loaded": False, "enabled": FOLLOW_GRAPH_ENABLED}
+    base = graph.base
+    nbytes = sum(
+        a.nbytes
+        for a in (
+            base.ids,
+            base.src,
+            base.dst,
+            base.following.indices,
+            base.following.indptr,
+            base.followers.indices,
+            base.followers.indptr,
+        )
+    )
+    return {
+        "loaded": True,
+        "edges": graph.num_edges,
+        "delta": graph.delta.size,
+        "nodes": len(base.following.indptr) - 1,
+        "last_edge_id": graph.last_edge_id,
+        "age_s": round(time.time() - base.built_at, 1),
+        "memory_mb": round(nbytes / (1024 * 1024), 2),
+    }
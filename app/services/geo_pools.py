@@ -0,0 +1,129 @@
+# app/services/geo_pools.py
+"""
+Pools de candidats events par tuile geohash, précalculés par app/jobs/geo_tile_pools.py.
+
+Les tuiles sont les cellules geohash de précision GEO_POOLS_PRECISION, repérées
+par une clé entière (ligne * nb de colonnes + colonne de la grille équivalente).
+Le pool d'une tuile = events à venir à moins de rayon + demi-diagonale de son
+centre: tout event à moins du rayon d'un point de la tuile y figure.
+
+Format (.npz, CSR sur les tuiles, events stockés une seule fois) :
+  tiles      int64[t]       clés des tuiles, triées
+  indptr     int64[t + 1]   pool de tiles[i] = rows[indptr[i]:indptr[i + 1]]
+  rows       int32[nnz]     indices dans les tableaux d'events
+  ids        int32[n]
+  matrix     float32[n, d]  vecteurs normalisés
+  lat / lon  float64[n]     radians
+  day        int32[n]       jour de l'event (ordinal), -1 = sans date
+  precision  int64[1]
+Une requête ne score que le pool de la tuile du demandeur: coût indépendant de
+la taille du catalogue.
+"""
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import GEO_POOLS_MAX_AGE_S
+from app.core.metrics import incr
+from app.services.neighbors import NeighborStore, get_neighbor_store
+
+_EARTH_RADIUS_KM = 6371.0
+
+
+def tile_size(precision: int) -> Tuple[float, float]:
+    """(hauteur, largeur) en degrés d'une cellule geohash: 5 bits par caractère, lon en premier."""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def tile_keys(lat_deg: np.ndarray, lon_deg: np.ndarray, precision: int) -> np.ndarray:
+    """Clés des tuiles contenant les points (degrés, vectorisé)."""
+    dlat, dlon = tile_size(precision)
+    n_lon = int(round(360.0 / dlon))
+    n_lat = int(round(180.0 / dlat))
+    ilat = np.clip(np.floor((np.asarray(lat_deg) + 90.0) / dlat), 0, n_lat - 1).astype(np.int64)
+    ilon = np.floor((np.asarray(lon_deg) + 180.0) / dlon).astype(np.int64) % n_lon
+    return ilat * n_lon + ilon
+
+
+def haversine_to(lat0: float, lon0: float, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Distances (km) d'un point à un tableau de points; radians."""
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoPoolStore(NeighborStore):
+    FIELDS = ("tiles", "indptr", "rows", "ids", "matrix", "lat", "lon", "day", "precision")
+
+    def search(
+        self,
+        qvec: List[float],
+        geo: Dict[str, float],
+        radius_km: float,
+        k: int,
+        id_lt: Optional[int] = None,
+    ) -> Optional[List[Tuple[int, float]]]:
+        """
+        Top-k (id, cosinus) dans le pool de la tuile de `geo`.
+        None (=> ES) si pas de pools chargés ou fichier plus vieux que GEO_POOLS_MAX_AGE_S.
+        """
+        data = self._maybe_reload()
+        if data is None:
+            return None
+        if time.time() - self._mtime > GEO_POOLS_MAX_AGE_S:
+            incr("geo_pools.stale")
+            return None
+
+        key = int(tile_keys(np.asarray([geo["lat"]]), np.asarray([geo["lon"]]), int(data["precision"][0]))[0])
+        tiles = data["tiles"]
+        pos = int(np.searchsorted(tiles, key))
+        if pos >= len(tiles) or tiles[pos] != key:
+            incr("geo_pools.empty_tile")
+            return []  # aucun event à venir dans le rayon de cette tuile
+        rows = data["rows"][data["indptr"][pos]:data["indptr"][pos + 1]]
+
+        dist = haversine_to(np.radians(geo["lat"]), np.radians(geo["lon"]), data["lat"][rows], data["lon"][rows])
+        keep = dist <= radius_km
+        day = data["day"][rows]
+        keep &= (day < 0) | (day >= date.today().toordinal())
+        if id_lt is not None:
+            keep &= data["ids"][rows] < id_lt
+        rows = rows[keep]
+        if not len(rows):
+            return []
+
+        q = np.asarray(qvec, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        if q.shape[0] != data["matrix"].shape[1]:
+            return None
+        scores = data["matrix"][rows] @ q
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        incr("geo_pools.search")
+        return [(int(data["ids"][rows[i]]), float(scores[i])) for i in order]
+
+    def stats(self) -> Dict[str, Any]:
+        data = self._data
+        if data is None:
+            return {"loaded": False, "path": self.path}
+        sizes = np.diff(data["indptr"])
+        return {
+            "loaded": True,
+            "path": self.path,
+            "tiles": int(len(data["tiles"])),
+            "events": int(len(data["ids"])),
+            "pool_max": int(sizes.max()) if len(sizes) else 0,
+            "pool_mean": round(float(sizes.mean()), 1) if len(sizes) else 0.0,
+            "mtime": self._mtime,
+            "memory_mb": round(sum(a.nbytes for a in data.values()) / (1024 * 1024), 2),
+        }
+
+
+def get_geo_pool_store(path: str) -> GeoPoolStore:
+    return get_neighbor_store(path, GeoPoolStore)
@@ -0,0 +1,189 @@
+# app/services/impressions.py
+"""
+Items déjà vus par un winker (events / winkers recommandés), en filtres de Bloom.
+
+Par (user, type): deux générations de IMPRESSIONS_BLOOM_BITS bits. La génération
+courante reçoit les ajouts; quand elle atteint IMPRESSIONS_ROTATE_AFTER items,
+elle devient la précédente (l'ancienne est oubliée) => on retient les ~1 à 2 x
+IMPRESSIONS_ROTATE_AFTER derniers items vus, avec un taux de faux positifs borné.
+
+Persistance locale en SQLite (WAL), partagée par les workers de la machine;
+lecture servie par un petit cache mémoire (IMPRESSIONS_CACHE_TTL_S).
+Test d'appartenance: O(nb de hash) par candidat, sans toucher aux requêtes ES.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from app.core.cache import TTLCache, register_cache
+from app.core.config import (
+    IMPRESSIONS_BLOOM_BITS,
+    IMPRESSIONS_BLOOM_HASHES,
+    IMPRESSIONS_CACHE_TTL_S,
+    IMPRESSIONS_DB_PATH,
+    IMPRESSIONS_ENABLED,
+    IMPRESSIONS_OVERFETCH,
+    IMPRESSIONS_ROTATE_AFTER,
+)
+from app.core.metrics import incr
+
+KINDS = ("events", "winkers")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS impressions (
+    user_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    cur BLOB NOT NULL,
+    prev BLOB,
+    cur_count INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, kind)
+)
+"""
+
+_cache = register_cache("impressions", TTLCache(maxsize=50000, ttl_s=IMPRESSIONS_CACHE_TTL_S))
+_local = threading.local()
+
+
+class SeenFilter:
+    """Deux générations de Bloom (courante + précédente)."""
+
+    def __init__(self, cur: Optional[bytes] = None, prev: Optional[bytes] = None, cur_count: int = 0):
+        size = IMPRESSIONS_BLOOM_BITS // 8
+        self.cur = bytearray(cur) if cur and len(cur) == size else bytearray(size)
+        self.prev = bytes(prev) if prev and len(prev) == size else None
+        self.cur_count = cur_count
+
+    @staticmethod
+    def _positions(item_id: int) -> List[int]:
+        # double hashing (Kirsch-Mitzenmacher): h1 + i*h2
+        digest = hashlib.blake2b(str(item_id).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % IMPRESSIONS_BLOOM_BITS for i in range(IMPRESSIONS_BLOOM_HASHES)]
+
+    @staticmethod
+    def _has(bits: Optional[Sequence[int]], positions: List[int]) -> bool:
+        if bits is None:
+            return False
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def __contains__(self, item_id: int) -> bool:
+        positions = self._positions(item_id)
+        return self._has(self.cur, positions) or self._has(self.prev, positions)
+
+    def add(self, item_id: int) -> None:
+        positions = self._positions(item_id)
+        if self._has(self.cur, positions):
+            return
+        if self.cur_count >= IMPRESSIONS_ROTATE_AFTER:
+            self.prev = bytes(self.cur)
+            self.cur = bytearray(len(self.cur))
+            self.cur_count = 0
+        for p in positions:
+            self.cur[p >> 3] |= 1 << (p & 7)
+        self.cur_count += 1
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(IMPRESSIONS_DB_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(IMPRESSIONS_DB_PATH, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _load(conn: sqlite3.Connection, user_id: int, kind: str) -> SeenFilter:
+    row = conn.execute(
+        "SELECT cur, prev, cur_count FROM impressions WHERE user_id = ? AND kind = ?",
+        (user_id, kind),
+    ).fetchone()
+    return SeenFilter(*row) if row else SeenFilter()
+
+
+def get_seen_filter(user_id: int, kind: str) -> SeenFilter:
+    key = (user_id, kind)
+    seen = _cache.get(key)
+    if seen is None:
+        seen = _load(_conn(), user_id, kind)
+        _cache.set(key, seen)
+    return seen
+
+
+def record_impressions(user_id: int, kind: str, item_ids: Iterable[int]) -> int:
+    """Ajoute des items vus (lecture-modification-écriture dans une transaction SQLite)."""
+    ids = [int(i) for i in item_ids]
+    if not ids:
+        return 0
+
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        seen = _load(conn, user_id, kind)
+        for item_id in ids:
+            seen.add(item_id)
+        conn.execute(
+            "INSERT OR REPLACE INTO impressions (user_id, kind, cur, prev, cur_count, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, kind, bytes(seen.cur), seen.prev, seen.cur_count, time.time()),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    _cache.set((user_id, kind), seen)
+    incr(f"impressions.{kind}.recorded", len(ids))
+    return len(ids)
+
+
+def unseen_first(user_id: int, kind: str, item_ids: Sequence[int], keep: Optional[int] = None) -> List[int]:
+    """
+    Candidats non vus d'abord (ordre conservé), puis les vus pour compléter jusqu'à
+    `keep` (None = tous): mieux vaut re-montrer un item qu'une liste vide.
+    """
+    if not IMPRESSIONS_ENABLED or not item_ids:
+        return list(item_ids)[:keep] if keep is not None else list(item_ids)
+
+    seen = get_seen_filter(user_id, kind)
+    fresh: List[int] = []
+    already: List[int] = []
+    for item_id in item_ids:
+        (already if item_id in seen else fresh).append(item_id)
+
+    incr(f"impressions.{kind}.filtered", len(already))
+    ordered = fresh + already
+    return ordered[:keep] if keep is not None else ordered
+
+
+def unseen_page(user_id: int, kind: str, item_ids: Sequence[int], offset: int, size: int) -> Tuple[List[int], int]:
+    """
+    Page de `size` items non vus de item_ids à partir de `offset` -> (page, offset suivant).
+    Les vus sont sautés; si tout le reste a déjà été vu, la page est servie telle quelle.
+    """
+    if IMPRESSIONS_ENABLED:
+        seen = get_seen_filter(user_id, kind)
+        page: List[int] = []
+        pos = offset
+        while pos < len(item_ids) and len(page) < size:
+            if item_ids[pos] not in seen:
+                page.append(item_ids[pos])
+            pos += 1
+        if page:
+            incr(f"impressions.{kind}.filtered", pos - offset - len(page))
+            return page, pos
+
+    page = list(item_ids[offset:offset + size])
+    return page, offset + len(page)
+
+
+def overfetch(n: int) -> int:
+    """Taille à demander à ES pour garder n items après filtrage des vus."""
+    return n * IMPRESSIONS_OVERFETCH if IMPRESSIONS_ENABLED else n
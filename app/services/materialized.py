@@ -0,0 +1,64 @@
+# app/services/materialized.py
+"""
+Lecture des recos matérialisées (top-K par user), écrites par
+app/jobs/materialize_recommendations.py au format de app/services/neighbors.py,
+plus `built_day` (int32[1]): jour (ordinal) de la graine de ranking du calcul.
+
+Le ranking live est stable sur la journée (seed = user_id + date du jour):
+un fichier calculé pour le jour courant sert exactement ce contrat. Le jour est
+lu dans le fichier, pas déduit du mtime (copie / fuseau / job à cheval sur
+minuit); un fichier d'un autre jour est périmé => chemin live.
+"""
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import MATERIALIZED_ENABLED
+from app.core.metrics import incr, set_gauge
+from app.services.neighbors import NeighborStore, get_neighbor_store
+
+
+def build_day_field(day: date) -> Dict[str, np.ndarray]:
+    """Tableau `built_day` à passer en `extra` à save_neighbors."""
+    return {"built_day": np.asarray([day.toordinal()], dtype=np.int32)}
+
+
+class MaterializedStore(NeighborStore):
+    FIELDS = NeighborStore.FIELDS + ("built_day",)
+
+    def built_day(self) -> Optional[int]:
+        data = self._maybe_reload()
+        if data is None:
+            return None
+        return int(data["built_day"][0])
+
+
+def materialized_ids(path: str, kind: str, user_id: int) -> Optional[List[int]]:
+    """Ids matérialisés du jour pour user_id, ou None (absent / périmé) => chemin live."""
+    if not MATERIALIZED_ENABLED:
+        return None
+
+    store = get_neighbor_store(path, MaterializedStore)
+    built_day = store.built_day()
+    if built_day is None:
+        incr(f"materialized.{kind}.unavailable")
+        return None
+
+    set_gauge(f"materialized.{kind}.age_s", round(time.time() - store.mtime, 1))
+    if built_day != date.today().toordinal():
+        incr(f"materialized.{kind}.stale")
+        return None
+    rows = store.get(user_id)
+    if not rows:
+        incr(f"materialized.{kind}.miss")
+        return None
+
+    incr(f"materialized.{kind}.hit")
+    return [item_id for item_id, _ in rows]
+
+
+def materialized_built_day(path: str) -> Optional[int]:
+    """built_day du fichier chargé (version des ids matérialisés, commune à tous les hôtes)."""
+    return get_neighbor_store(path, MaterializedStore).built_day()
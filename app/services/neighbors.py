@@ -0,0 +1,156 @@
+# app/services/neighbors.py
+"""
+Listes de voisins précalculées (item -> [(voisin, score)]), produites par les jobs
+batch (app/jobs/) et lues par les endpoints.
+
+Format compact (.npz, CSR):
+  ids        int32[n]      ids des items, triés
+  indptr     int64[n + 1]  voisins de ids[i] = neighbors[indptr[i]:indptr[i + 1]]
+  neighbors  int32[nnz]    triés par score décroissant
+  scores     float32[nnz]
+Le fichier est remplacé atomiquement par le job; le store le recharge quand son
+mtime change (vérifié au plus toutes les NEIGHBORS_RELOAD_CHECK_S).
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from app.core.config import NEIGHBORS_RELOAD_CHECK_S
+from app.core.metrics import incr
+
+logger = logging.getLogger(__name__)
+
+
+def save_neighbors(
+    path: str,
+    lists: Dict[int, Sequence[Tuple[int, float]]],
+    extra: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, Any]:
+    """
+    Écrit les listes au format CSR (fichier temporaire puis rename atomique).
+    `extra`: tableaux supplémentaires (métadonnées lues par une sous-classe de NeighborStore).
+    """
+    ids = np.asarray(sorted(lists), dtype=np.int32)
+    counts = np.asarray([len(lists[int(i)]) for i in ids], dtype=np.int64)
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+
+    neighbors = np.empty(int(indptr[-1]), dtype=np.int32)
+    scores = np.empty(int(indptr[-1]), dtype=np.float32)
+    for pos, item_id in enumerate(ids):
+        row = lists[int(item_id)]
+        if row:
+            start, end = indptr[pos], indptr[pos + 1]
+            neighbors[start:end] = [n for n, _ in row]
+            scores[start:end] = [s for _, s in row]
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, ids=ids, indptr=indptr, neighbors=neighbors, scores=scores, **(extra or {}))
+    os.replace(tmp, path)
+    return {"items": int(len(ids)), "pairs": int(indptr[-1]), "bytes": os.path.getsize(path)}
+
+
+class NeighborStore:
+    # tableaux lus dans le .npz (les sous-classes d'autres formats redéfinissent la liste)
+    FIELDS = ("ids", "indptr", "neighbors", "scores")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, np.ndarray]] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = float("-inf")
+
+    def _maybe_reload(self) -> Optional[Dict[str, np.ndarray]]:
+        now = time.monotonic()
+        if now - self._checked_at < NEIGHBORS_RELOAD_CHECK_S:
+            return self._data
+
+        with self._lock:
+            if now - self._checked_at < NEIGHBORS_RELOAD_CHECK_S:
+                return self._data
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return self._data  # pas encore calculé: on garde l'existant (ou rien)
+            if mtime == self._mtime:
+                return self._data
+            try:
+                with np.load(self.path) as f:
+                    self._data = {k: f[k] for k in self.FIELDS}
+                self._mtime = mtime
+                incr("neighbors.reload")
+            except Exception as e:  # fichier corrompu / en cours d'écriture
+                logger.warning("neighbor store %s reload failed: %s", self.path, e)
+            return self._data
+
+    @property
+    def mtime(self) -> Optional[float]:
+        """mtime du fichier actuellement chargé (None si rien de chargé)."""
+        return self._mtime
+
+    def is_loaded(self) -> bool:
+        return self._maybe_reload() is not None
+
+    def get(self, item_id: int, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        data = self._maybe_reload()
+        if data is None:
+            return []
+        ids = data["ids"]
+        pos = int(np.searchsorted(ids, item_id))
+        if pos >= len(ids) or ids[pos] != item_id:
+            return []
+        start, end = int(data["indptr"][pos]), int(data["indptr"][pos + 1])
+        if limit is not None:
+            end = min(end, start + limit)
+        return [
+            (int(n), float(s))
+            for n, s in zip(data["neighbors"][start:end], data["scores"][start:end])
+        ]
+
+    def aggregate(self, item_ids: Iterable[int], limit: int, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """Somme des scores des voisins de plusieurs items (ex: events déjà vus) -> top `limit`."""
+        totals: Dict[int, float] = {}
+        for item_id in item_ids:
+            for n, s in self.get(int(item_id)):
+                totals[n] = totals.get(n, 0.0) + s
+        for item_id in exclude:
+            totals.pop(int(item_id), None)
+        return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        data = self._data
+        if data is None:
+            return {"loaded": False, "path": self.path}
+        return {
+            "loaded": True,
+            "path": self.path,
+            "items": int(len(data["ids"])),
+            "pairs": int(len(data["neighbors"])),
+            "mtime": self._mtime,
+            "memory_mb": round(sum(a.nbytes for a in data.values()) / (1024 * 1024), 2),
+        }
+
+
+_stores: Dict[str, NeighborStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_neighbor_store(path: str, store_cls: Type[NeighborStore] = NeighborStore) -> NeighborStore:
+    """Un store par fichier et par worker."""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = store_cls(path)
+        return store
+
+
+def neighbor_stores_stats() -> Dict[str, Dict[str, Any]]:
+    with _stores_lock:
+        return {os.path.basename(path): store.stats() for path, store in _stores.items()}
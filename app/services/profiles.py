@@ -0,0 +1,110 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.cache import TTLCache, register_cache
+from app.core.config import (
+    BATCH_PROFILE_VECTORS_MAX,
+    PROFILE_CACHE_MAX,
+    PROFILE_CACHE_MAX_AGE_S,
+    PROFILE_CACHE_TTL_S,
+)
+from app.core.metrics import incr
+from app.api.v1.sql.fetch_winker_profile import (
+    fetch_requester_profile,
+    fetch_requester_profile_async,
+    fetch_requester_profiles,
+    fetch_winker_profile_version,
+    fetch_winker_profile_version_async,
+)
+
+# user_id -> {"profile": dict, "version": xmin, "checked_at": monotonic}
+_profile_cache = register_cache("requester_profiles", TTLCache(PROFILE_CACHE_MAX, PROFILE_CACHE_MAX_AGE_S))
+
+# user_id -> (texte du profil, vecteur float32 via pack_vector): évite de ré-encoder un profil inchangé
+profile_vectors = register_cache("user_profile_vectors", TTLCache(maxsize=20000, ttl_s=3600))
+
+# même chose pour les endpoints / jobs batch, séparé pour ne pas évincer les vecteurs interactifs
+batch_profile_vectors = register_cache(
+    "batch_profile_vectors", TTLCache(maxsize=BATCH_PROFILE_VECTORS_MAX, ttl_s=3600)
+)
+
+
+def pack_vector(vec: List[float]):
+    """Forme stockée en cache: float32 numpy (~3 Ko pour 768 dims, ~24 Ko en liste de floats Python)."""
+    import numpy as np
+
+    return np.asarray(vec, dtype=np.float32)
+
+
+def unpack_vector(packed) -> List[float]:
+    """Liste de floats (JSON des requêtes ES), à partir de pack_vector."""
+    return packed.tolist()
+
+
+def _store(user_id: int, res) -> Optional[Dict[str, Any]]:
+    if res is None:
+        _profile_cache.delete(user_id)
+        return None
+    profile, version = res
+    _profile_cache.set(user_id, {"profile": profile, "version": version, "checked_at": time.monotonic()})
+    return profile
+
+
+def get_requester_profile(user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Profil du winker demandeur, partagé par les endpoints de reco.
+    - < PROFILE_CACHE_TTL_S: lecture mémoire
+    - au-delà: simple check de version (xmin); rechargé seulement si la ligne a changé
+    Ne pas modifier le dict retourné (partagé).
+    """
+    entry = _profile_cache.get(user_id)
+    if entry is None:
+        incr("profiles.miss")
+        return _store(user_id, fetch_requester_profile(user_id))
+
+    if time.monotonic() - entry["checked_at"] < PROFILE_CACHE_TTL_S:
+        incr("profiles.hit")
+        return entry["profile"]
+
+    version = fetch_winker_profile_version(user_id)
+    if version is not None and version == entry["version"]:
+        incr("profiles.revalidated")
+        entry["checked_at"] = time.monotonic()
+        return entry["profile"]
+
+    incr("profiles.changed")
+    return _store(user_id, fetch_requester_profile(user_id))
+
+
+async def get_requester_profile_async(user_id: int) -> Optional[Dict[str, Any]]:
+    """Même logique que get_requester_profile, SQL via le pool async."""
+    entry = _profile_cache.get(user_id)
+    if entry is None:
+        incr("profiles.miss")
+        return _store(user_id, await fetch_requester_profile_async(user_id))
+
+    if time.monotonic() - entry["checked_at"] < PROFILE_CACHE_TTL_S:
+        incr("profiles.hit")
+        return entry["profile"]
+
+    version = await fetch_winker_profile_version_async(user_id)
+    if version is not None and version == entry["version"]:
+        incr("profiles.revalidated")
+        entry["checked_at"] = time.monotonic()
+        return entry["profile"]
+
+    incr("profiles.changed")
+    return _store(user_id, await fetch_requester_profile_async(user_id))
+
+
+def get_requester_profiles(user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Version bulk (jobs / endpoints batch): une requête, sans lire ni remplir le cache
+    interactif (un digest de milliers de winkers en évincerait les utilisateurs actifs).
+    """
+    incr("profiles.batch", len(user_ids))
+    return {uid: profile for uid, (profile, _version) in fetch_requester_profiles(user_ids).items()}
+
+
+def invalidate_requester_profiles(user_ids: Iterable[int]) -> None:
+    _profile_cache.delete_many(int(uid) for uid in user_ids)
@@ -0,0 +1,179 @@
+# app/services/reranking.py
+"""
+Re-ranking des winkers en Python (RERANK_MODE=python), à la place du rescore
+function_score évalué par ES.
+
+ES renvoie toute la fenêtre kNN (sans rescore) avec les doc values utiles
+(docvalue_fields: lastConnection, localisation, age, boost); les décroissances
+gaussiennes et la somme pondérée sont calculées ici en NumPy sur la fenêtre.
+Mêmes formules et mêmes défauts que le rescore ES (build_winkers_for_winker_body):
+
+  score = knn * _score
+        + recency * gauss(lastConnection; origin=now, scale=3d, decay=0.4)
+        + geo     * gauss(distance; scale=10km, offset=1km, decay=0.5)
+        + age     * gauss(age; origin=âge du demandeur, scale=5, offset=1, decay=0.5)
+        + boost   * 0.05 * boost
+
+Les poids se règlent par RERANK_WINKER_WEIGHTS, sans réécrire de requête.
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import RERANK_WINKER_WEIGHTS
+
+WINKER_FEATURES = ("knn", "recency", "geo", "age", "boost")
+
+DEFAULT_WINKER_WEIGHTS: Dict[str, float] = {
+    "knn": 1.0,
+    "recency": 3.0,
+    "geo": 2.0,
+    "age": 1.5,
+    "boost": 1.0,
+}
+
+# à demander à ES avec les hits kNN
+WINKER_DOCVALUE_FIELDS: List[Any] = [
+    {"field": "lastConnection", "format": "epoch_millis"},
+    "localisation",
+    "age",
+    "boost",
+]
+
+_DAY_MS = 86400 * 1000.0
+_EARTH_RADIUS_KM = 6371.0
+_BOOST_FACTOR = 0.05
+
+
+def parse_weights(spec: str, defaults: Dict[str, float]) -> Dict[str, float]:
+    """"knn:1,geo:2.5" -> poids (les features absentes gardent leur défaut)."""
+    weights = dict(defaults)
+    for part in spec.split(","):
+        name, _, value = part.partition(":")
+        name = name.strip()
+        if name in weights and value.strip():
+            weights[name] = float(value)
+    return weights
+
+
+WINKER_WEIGHTS = parse_weights(RERANK_WINKER_WEIGHTS, DEFAULT_WINKER_WEIGHTS)
+
+
+def gauss_decay(values: np.ndarray, origin: float, scale: float, offset: float, decay: float) -> np.ndarray:
+    """Décroissance gaussienne d'ES: exp(-max(0, |v - origin| - offset)^2 / (2 sigma^2))."""
+    sigma2 = -(scale ** 2) / (2.0 * np.log(decay))
+    dist = np.maximum(np.abs(values - origin) - offset, 0.0)
+    return np.exp(-(dist ** 2) / (2.0 * sigma2))
+
+
+def _first(fields: Dict[str, Any], name: str) -> Any:
+    values = fields.get(name)
+    return values[0] if values else None
+
+
+def _parse_point(value: Any) -> Tuple[float, float]:
+    """Doc value geo_point (GeoJSON, {lat, lon} ou "lat,lon") -> (lat, lon), nan si absent."""
+    try:
+        if isinstance(value, dict):
+            if "coordinates" in value:
+                lon, lat = value["coordinates"][:2]
+                return float(lat), float(lon)
+            return float(value["lat"]), float(value["lon"])
+        if isinstance(value, str):
+            lat, lon = value.split(",")
+            return float(lat), float(lon)
+    except (KeyError, TypeError, ValueError):
+        pass
+    return float("nan"), float("nan")
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def winker_features(
+    hits: List[Dict[str, Any]],
+    user_geo: Dict[str, float],
+    user_age: int,
+    now_ms: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """-> (ids int64[n], features float64[n, len(WINKER_FEATURES)])."""
+    ids: List[int] = []
+    rows: List[Tuple[float, float, float, float, float, float]] = []
+    for h in hits:
+        try:
+            winker_id = int(h.get("_id"))
+        except (TypeError, ValueError):
+            continue
+        fields = h.get("fields") or {}
+        lat, lon = _parse_point(_first(fields, "localisation"))
+        ids.append(winker_id)
+        rows.append((
+            float(h.get("_score") or 0.0),
+            _to_float(_first(fields, "lastConnection")),
+            lat,
+            lon,
+            _to_float(_first(fields, "age")),
+            _to_float(_first(fields, "boost")),
+        ))
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(WINKER_FEATURES)))
+
+    raw = np.asarray(rows, dtype=np.float64)
+    knn, last_ms, lat, lon, age, boost = raw.T
+    now_ms = time.time() * 1000.0 if now_ms is None else now_ms
+
+    # filtre "exists" côté ES: pas de lastConnection / age => 0
+    recency = np.nan_to_num(gauss_decay(last_ms, now_ms, 3 * _DAY_MS, 0.0, 0.4), nan=0.0)
+
+    lat0, lon0 = np.radians(user_geo["lat"]), np.radians(user_geo["lon"])
+    lat, lon = np.radians(lat), np.radians(lon)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    dist_km = 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    # pas de filtre côté ES: champ absent => décroissance neutre (1)
+    geo = np.nan_to_num(gauss_decay(dist_km, 0.0, 10.0, 1.0, 0.5), nan=1.0)
+
+    if user_age > 0:
+        age_score = np.nan_to_num(gauss_decay(age, float(user_age), 5.0, 1.0, 0.5), nan=0.0)
+    else:
+        age_score = np.zeros(len(ids))
+
+    boost_score = _BOOST_FACTOR * np.nan_to_num(boost, nan=0.0)
+
+    features = np.column_stack([knn, recency, geo, age_score, boost_score])
+    return np.asarray(ids, dtype=np.int64), features
+
+
+def rerank_winkers(
+    hits: List[Dict[str, Any]],
+    user_geo: Dict[str, float],
+    user_age: int,
+    weights: Optional[Dict[str, float]] = None,
+    explain: bool = False,
+) -> Tuple[List[Tuple[int, float]], Dict[int, Dict[str, float]]]:
+    """
+    -> ([(id, score)] par score décroissant, {id: contribution pondérée par feature}).
+    Le détail par feature n'est calculé qu'avec explain=True (mode debug).
+    """
+    ids, features = winker_features(hits, user_geo, user_age)
+    if not len(ids):
+        return [], {}
+
+    w = weights or WINKER_WEIGHTS
+    contributions = features * np.asarray([w[f] for f in WINKER_FEATURES])
+    scores = contributions.sum(axis=1)
+    order = np.argsort(-scores, kind="stable")
+
+    ranked = [(int(ids[i]), float(scores[i])) for i in order]
+    breakdown: Dict[int, Dict[str, float]] = {}
+    if explain:
+        for i in order:
+            breakdown[int(ids[i])] = {
+                name: round(float(contributions[i, j]), 4) for j, name in enumerate(WINKER_FEATURES)
+            }
+    return ranked, breakdown
@@ -0,0 +1,313 @@
+# app/services/vector_engine.py
+"""
+Recherche vectorielle des events dans le process (sans aller-retour ES).
+
+Snapshot produit par app/jobs/event_vector_snapshot.py dans VECTOR_SNAPSHOT_DIR/<version>/ :
+  vectors.npy  float32[n, dims]  normalisés, ouverts en memmap (page cache partagé entre workers)
+  ids.npy      int32[n]
+  lat.npy / lon.npy  float64[n]  radians (nan = pas de localisation)
+  day.npy      int32[n]          jour de l'event (ordinal), -1 = sans date
+  meta.json    {count, dims, max_published, built_at}
+et VECTOR_SNAPSHOT_DIR/CURRENT qui désigne la version active (remplacé atomiquement).
+
+Entre deux snapshots, les events publiés depuis `max_published` sont ajoutés en
+mémoire (segment delta) par le rafraîchissement périodique.
+
+Top-k exact: cosinus = produit scalaire par blocs NumPy, après préfiltres
+(id, géo, date). Option VECTOR_ENGINE_INDEX=hnsw: index HNSW (hnswlib) sur le
+snapshot, résultats filtrés ensuite (repli exact s'il en reste trop peu).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import (
+    VECTOR_ENGINE_ENDPOINTS,
+    VECTOR_ENGINE_INDEX,
+    VECTOR_ENGINE_REFRESH_S,
+    VECTOR_SNAPSHOT_DIR,
+)
+from app.core.metrics import incr, set_gauge, timed
+
+logger = logging.getLogger(__name__)
+
+_BLOCK_ROWS = 65536
+_EARTH_RADIUS_KM = 6371.0
+_HNSW_OVERFETCH = 4
+
+
+class _Segment:
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, lat: np.ndarray, lon: np.ndarray, day: np.ndarray):
+        self.ids = ids
+        self.vectors = vectors
+        self.lat = lat
+        self.lon = lon
+        self.day = day
+        self.hidden = np.zeros(len(ids), dtype=bool)  # remplacés par une version plus récente
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mask(
+        self,
+        geo: Optional[Dict[str, float]],
+        radius_km: Optional[float],
+        min_day: Optional[int],
+        id_lt: Optional[int],
+    ) -> np.ndarray:
+        keep = ~self.hidden
+        if id_lt is not None:
+            keep &= self.ids < id_lt
+        if min_day is not None:
+            keep &= (self.day < 0) | (self.day >= min_day)
+        if geo and radius_km:
+            # comme geo_distance côté ES: un event sans localisation est exclu
+            lat0, lon0 = np.radians(float(geo["lat"])), np.radians(float(geo["lon"]))
+            a = (
+                np.sin((self.lat - lat0) / 2) ** 2
+                + np.cos(lat0) * np.cos(self.lat) * np.sin((self.lon - lon0) / 2) ** 2
+            )
+            dist = 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+            keep &= np.nan_to_num(dist, nan=np.inf) <= radius_km
+        return keep
+
+    def top_k(self, q: np.ndarray, k: int, keep: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # tranches contiguës du memmap (pas de copie des lignes), `keep` appliqué aux scores
+        best_ids = np.empty(0, dtype=np.int32)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self.ids), _BLOCK_ROWS):
+            end = start + _BLOCK_ROWS
+            rows = np.flatnonzero(keep[start:end])
+            if not len(rows):
+                continue
+            scores = (self.vectors[start:end] @ q)[rows]
+            ids = self.ids[start:end][rows]
+            if len(scores) > k:
+                part = np.argpartition(-scores, k - 1)[:k]
+                scores, ids = scores[part], ids[part]
+            best_ids = np.concatenate([best_ids, ids])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                part = np.argpartition(-best_scores, k - 1)[:k]
+                best_ids, best_scores = best_ids[part], best_scores[part]
+        return best_ids, best_scores
+
+
+class VectorEngine:
+    def __init__(self, version: str, base: _Segment, meta: Dict[str, Any]):
+        self.version = version
+        self.base = base
+        self.meta = meta
+        self.max_published: Optional[str] = meta.get("max_published")
+        self.delta: Optional[_Segment] = None
+        self.hnsw = None
+        self.loaded_at = time.time()
+        self._base_pos = {int(i): p for p, i in enumerate(base.ids)}
+
+    @classmethod
+    def load(cls, path: str) -> "VectorEngine":
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        base = _Segment(
+            ids=np.load(os.path.join(path, "ids.npy")),
+            vectors=np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"),
+            lat=np.load(os.path.join(path, "lat.npy")),
+            lon=np.load(os.path.join(path, "lon.npy")),
+            day=np.load(os.path.join(path, "day.npy")),
+        )
+        engine = cls(os.path.basename(path), base, meta)
+        if VECTOR_ENGINE_INDEX == "hnsw":
+            engine._build_hnsw()
+        return engine
+
+    def _build_hnsw(self) -> None:
+        try:
+            import hnswlib
+        except ImportError:
+            logger.warning("VECTOR_ENGINE_INDEX=hnsw mais hnswlib absent: recherche exacte")
+            return
+        if not len(self.base):
+            return
+        index = hnswlib.Index(space="ip", dim=int(self.base.vectors.shape[1]))
+        index.init_index(max_elements=len(self.base), ef_construction=200, M=16)
+        index.add_items(np.asarray(self.base.vectors), np.arange(len(self.base)))
+        index.set_ef(100)
+        self.hnsw = index
+
+    def add_events(self, data: Dict[str, Any]) -> int:
+        """Ajoute / remplace des events (segment delta en mémoire)."""
+        ids = data["ids"]
+        if not len(ids):
+            return 0
+        if self.delta is not None:
+            # la nouvelle version d'un event remplace l'ancienne dans le delta
+            keep = ~np.isin(self.delta.ids, ids)
+            d = self.delta
+            ids_all = np.concatenate([d.ids[keep], ids])
+            data = {
+                "matrix": np.concatenate([np.asarray(d.vectors)[keep], data["matrix"]]),
+                "lat": np.concatenate([d.lat[keep], data["lat"]]),
+                "lon": np.concatenate([d.lon[keep], data["lon"]]),
+                "day": np.concatenate([d.day[keep], data["day"]]),
+                "max_published": data.get("max_published"),
+            }
+        else:
+            ids_all = ids
+
+        for event_id in ids:
+            pos = self._base_pos.get(int(event_id))
+            if pos is not None:
+                self.base.hidden[pos] = True
+        self.delta = _Segment(ids_all, data["matrix"], data["lat"], data["lon"], data["day"])
+
+        published = data.get("max_published")
+        if published and (self.max_published is None or published > self.max_published):
+            self.max_published = published
+        return int(len(ids))
+
+    def search(
+        self,
+        qvec: List[float],
+        k: int,
+        geo: Optional[Dict[str, float]] = None,
+        radius_km: Optional[float] = None,
+        min_day: Optional[int] = None,
+        id_lt: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """Top-k (id, cosinus) avec préfiltres id / géo / date."""
+        q = np.asarray(qvec, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        if len(self.base) and q.shape[0] != self.base.vectors.shape[1]:
+            return []
+
+        parts: List[Tuple[np.ndarray, np.ndarray]] = []
+        for segment in (self.base, self.delta):
+            if segment is None or not len(segment):
+                continue
+            keep = segment.mask(geo, radius_km, min_day, id_lt)
+            if segment is self.base and self.hnsw is not None:
+                found = self._hnsw_top_k(q, k, keep)
+                if found is not None:
+                    parts.append(found)
+                    continue
+            parts.append(segment.top_k(q, k, keep))
+
+        if not parts:
+            return []
+        ids = np.concatenate([p[0] for p in parts])
+        scores = np.concatenate([p[1] for p in parts])
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+    def _hnsw_top_k(self, q: np.ndarray, k: int, keep: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        n = min(len(self.base), k * _HNSW_OVERFETCH)
+        labels, distances = self.hnsw.knn_query(q, k=n)
+        labels, scores = labels[0], 1.0 - distances[0]  # espace "ip": distance = 1 - <q, v>
+        ok = keep[labels]
+        if ok.sum() < k and keep.sum() >= k:
+            return None  # filtres trop sélectifs pour l'ANN: recherche exacte
+        return self.base.ids[labels[ok]], scores[ok].astype(np.float32)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": True,
+            "version": self.version,
+            "events": len(self.base) - int(self.base.hidden.sum()) + (len(self.delta) if self.delta else 0),
+            "delta": len(self.delta) if self.delta else 0,
+            "dims": int(self.base.vectors.shape[1]) if len(self.base) else None,
+            "index": "hnsw" if self.hnsw is not None else "exact",
+            "max_published": self.max_published,
+            "age_s": round(time.time() - self.loaded_at, 1),
+        }
+
+
+_engine: Optional[VectorEngine] = None
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def get_vector_engine() -> Optional[VectorEngine]:
+    return _engine
+
+
+def use_vector_engine(endpoint: str) -> bool:
+    """Endpoint configuré pour le moteur local (VECTOR_ENGINE_ENDPOINTS) et snapshot chargé."""
+    return endpoint in VECTOR_ENGINE_ENDPOINTS and _engine is not None
+
+
+def _current_version() -> Optional[str]:
+    try:
+        with open(os.path.join(VECTOR_SNAPSHOT_DIR, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def refresh_vector_engine() -> Dict[str, Any]:
+    """Recharge le snapshot s'il a changé, sinon ajoute les events publiés depuis."""
+    global _engine
+    from app.jobs.similar_events import PUBLISHED_FIELD, load_event_vectors
+
+    with _lock:
+        version = _current_version()
+        if version is None:
+            return {"loaded": False}
+
+        if _engine is None or _engine.version != version:
+            with timed("vector_engine.load"):
+                _engine = VectorEngine.load(os.path.join(VECTOR_SNAPSHOT_DIR, version))
+            incr("vector_engine.reload")
+            set_gauge("vector_engine.events", len(_engine.base))
+            return {"reloaded": version}
+
+        engine = _engine
+        since = engine.max_published
+
+    if since is None:
+        return {"added": 0}
+    with timed("vector_engine.refresh"):
+        data = load_event_vectors({"range": {PUBLISHED_FIELD: {"gt": since}}})
+    with _lock:
+        if _engine is engine:
+            added = engine.add_events(data)
+            incr("vector_engine.delta_events", added)
+            return {"added": added}
+    return {"added": 0}
+
+
+def _run() -> None:
+    while not _stop.is_set():
+        try:
+            refresh_vector_engine()
+        except Exception as e:  # ES / fichier indisponible: on garde l'état courant
+            incr("vector_engine.refresh.errors")
+            logger.warning("vector engine refresh failed: %s", e)
+        _stop.wait(VECTOR_ENGINE_REFRESH_S)
+
+
+def start_vector_engine_refresher() -> None:
+    global _thread
+    if not VECTOR_ENGINE_ENDPOINTS and not os.path.exists(os.path.join(VECTOR_SNAPSHOT_DIR, "CURRENT")):
+        return
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_run, name="vector-engine", daemon=True)
+        _thread.start()
+
+
+def stop_vector_engine_refresher() -> None:
+    _stop.set()
+
+
+def vector_engine_stats() -> Dict[str, Any]:
+    engine = _engine
+    if engine is None:
+        return {"loaded": False, "endpoints": VECTOR_ENGINE_ENDPOINTS}
+    return {**engine.stats(), "endpoints": VECTOR_ENGINE_ENDPOINTS}
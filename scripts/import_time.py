@@ -0,0 +1,87 @@
+"""
+Rapport du temps d'import de l'API (python -X importtime), agrégé par package.
+
+    python scripts/import_time.py                     # app.main, top 25
+    python scripts/import_time.py --module app.jobs.popularity
+    python scripts/import_time.py --budget-ms 1500    # exit 1 si dépassé (CI)
+    API_ROUTERS=indexing python scripts/import_time.py
+
+Chaque mesure tourne dans un interpréteur neuf (pas de cache sys.modules).
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str) -> List[Tuple[str, int, int]]:
+    """Lignes (module, self_us, cumulative_us) telles que rapportées par -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(proc.returncode)
+
+    rows: List[Tuple[str, int, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue
+        rows.append((parts[2].strip(), self_us, cumulative_us))
+    return rows
+
+
+def by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Temps propre (self) cumulé par package racine: torch, elasticsearch, app..."""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return totals
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    target = next((r for r in rows if r[0] == args.module), None)
+    total_ms = (target[2] if target else sum(r[1] for r in rows)) / 1000.0
+
+    print(f"import {args.module}: {total_ms:.1f} ms ({len(rows)} modules)")
+    print()
+    print(f"{'package':<32} {'self ms':>10}")
+    for name, us in sorted(by_package(rows).items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        print(f"{name:<32} {us / 1000.0:>10.1f}")
+
+    print()
+    print(f"{'module':<48} {'cumulative ms':>14}")
+    for name, _, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]:
+        print(f"{name:<48} {cumulative_us / 1000.0:>14.1f}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print()
+        print(f"❌ budget dépassé: {total_ms:.1f} ms > {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# `pytest` lancé depuis la racine du repo sans installation: `app` importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
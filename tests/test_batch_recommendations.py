@@ -0,0 +1,79 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.api.v1.endpoints import recommendations_batch as batch
+from app.services.profiles import batch_profile_vectors, profile_vectors
+
+
+@pytest.fixture(autouse=True)
+def clear_vectors():
+    batch_profile_vectors.clear()
+    profile_vectors.clear()
+    yield
+    batch_profile_vectors.clear()
+
+
+def test_profile_vectors_encode_only_new_or_changed(monkeypatch):
+    encoded = []
+
+    def embed(texts):
+        encoded.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(batch, "embed_texts", embed)
+    profiles = {1: {"bio": "a"}, 2: {"bio": "bb"}, 3: {}}  # 3: profil vide, ignoré
+
+    assert batch._profile_vectors(profiles) == {1: [1.0], 2: [2.0]}
+    assert batch._profile_vectors({**profiles, 2: {"bio": "ccc"}}) == {1: [1.0], 2: [3.0]}
+    assert encoded == [["a", "bb"], ["ccc"]]
+    # cache batch séparé du cache interactif, vecteurs stockés en float32
+    assert len(profile_vectors) == 0
+    assert batch_profile_vectors.get(1)[1].dtype == np.float32
+
+
+class FakeEs:
+    def __init__(self, responses):
+        self.responses = responses
+        self.searches = None
+
+    def msearch(self, searches):
+        self.searches = searches
+        return {"responses": self.responses}
+
+
+def test_msearch_per_user_maps_hits_and_errors(monkeypatch):
+    es = FakeEs([{"hits": {"hits": [{"_id": "5"}]}}, {"error": {"type": "boom"}}])
+    monkeypatch.setattr(batch, "get_es", lambda: es)
+
+    hits, errors = batch.msearch_per_user("events", {7: {"q": 1}, 8: {"q": 2}}, "m")
+    assert es.searches == [{"index": "events"}, {"q": 1}, {"index": "events"}, {"q": 2}]
+    assert hits == {7: [{"_id": "5"}]}
+    assert errors == {8: {"type": "boom"}}
+    assert batch.msearch_per_user("events", {}, "m") == ({}, {})
+
+
+def test_iter_events_dedups_chunks_and_reports_chunk_failures(monkeypatch):
+    chunks = []
+
+    def events_for_chunk(user_ids):
+        chunks.append(user_ids)
+        if 3 in user_ids:
+            raise RuntimeError("es down")
+        return [{"user_id": uid, "events": []} for uid in user_ids]
+
+    monkeypatch.setattr(batch, "_events_for_chunk", events_for_chunk)
+    lines = list(batch.iter_events_for_winkers([1, 2, 1, 3, 4, 5], chunk_size=2))
+
+    assert chunks == [[1, 2], [3, 4], [5]]
+    assert [line["user_id"] for line in lines] == [1, 2, 3, 4, 5]
+    assert lines[2] == {"user_id": 3, "error": "es down"} and lines[3]["error"] == "es down"
+    assert lines[4] == {"user_id": 5, "events": []}
+
+
+def test_to_ndjson_one_line_per_result():
+    out = list(batch.to_ndjson(iter([{"user_id": 1, "events": []}, {"user_id": 2, "error": "é"}])))
+    assert all(line.endswith("\n") for line in out)
+    assert [json.loads(line)["user_id"] for line in out] == [1, 2]
+    assert "é" in out[1]
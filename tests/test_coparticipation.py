@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.jobs import coparticipation
+from app.jobs.coparticipation import compute_coparticipation_neighbors
+from app.services.neighbors import NeighborStore, save_neighbors
+
+# (winker, event): events 10 et 20 faits ensemble par 1 et 2, 30 avec 10 par 3
+PAIRS = [(1, 10), (1, 20), (2, 10), (2, 20), (3, 10), (3, 30), (4, 40)]
+
+
+def test_cosine_on_binary_participations():
+    neighbors = compute_coparticipation_neighbors(PAIRS, top_n=10, min_coparticipation=1)
+
+    # n_10 = 3, n_20 = 2, n_30 = 1
+    sim_10_20 = pytest.approx(2 / math.sqrt(6), abs=1e-4)
+    sim_10_30 = pytest.approx(1 / math.sqrt(3), abs=1e-4)
+    assert neighbors[10] == [(20, sim_10_20), (30, sim_10_30)]
+    assert neighbors[20] == [(10, sim_10_20)]
+    assert neighbors[30] == [(10, sim_10_30)]
+    # pas de co-participation: absent; jamais voisin de lui-même
+    assert 40 not in neighbors
+    assert all(n != e for e, row in neighbors.items() for n, _ in row)
+
+
+def test_min_coparticipation_and_top_n():
+    assert compute_coparticipation_neighbors(PAIRS, top_n=10, min_coparticipation=2) == {
+        10: [(20, pytest.approx(2 / math.sqrt(6), abs=1e-4))],
+        20: [(10, pytest.approx(2 / math.sqrt(6), abs=1e-4))],
+    }
+    top1 = compute_coparticipation_neighbors(PAIRS, top_n=1, min_coparticipation=1)
+    assert [n for n, _ in top1[10]] == [20]
+    assert compute_coparticipation_neighbors([]) == {}
+
+
+def test_blocks_match_single_pass(monkeypatch):
+    rng = np.random.default_rng(0)
+    pairs = sorted({(int(w), int(e)) for w, e in rng.integers(0, 40, size=(300, 2))})
+    whole = compute_coparticipation_neighbors(pairs, top_n=5, min_coparticipation=1)
+    monkeypatch.setattr(coparticipation, "_BLOCK_SIZE", 7)
+    assert compute_coparticipation_neighbors(pairs, top_n=5, min_coparticipation=1) == whole
+
+
+def test_saved_neighbors_round_trip_and_aggregate(tmp_path):
+    path = str(tmp_path / "cf.npz")
+    neighbors = compute_coparticipation_neighbors(PAIRS, top_n=10, min_coparticipation=1)
+    assert save_neighbors(path, neighbors)["items"] == 3
+
+    store = NeighborStore(path)
+    assert [n for n, _ in store.get(10)] == [20, 30]
+    assert store.get(10, limit=1)[0][0] == 20
+    assert store.get(99) == []
+
+    # historique {20, 30}: 10 cumule les deux scores, les events déjà faits sont exclus
+    (event_id, score), = store.aggregate([20, 30], limit=5, exclude=[20, 30])
+    assert event_id == 10
+    assert score == pytest.approx(2 / math.sqrt(6) + 1 / math.sqrt(3), abs=1e-3)
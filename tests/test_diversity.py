@@ -0,0 +1,45 @@
+from app.services.diversity import VECTOR_FIELD, hit_vectors, mmr_order
+
+# a et b quasi identiques, c orthogonal
+VECTORS = {1: [1.0, 0.0], 2: [1.0, 0.01], 3: [0.0, 1.0]}
+RANKED = [(1, 1.0), (2, 0.9), (3, 0.8)]
+
+
+def test_mmr_promotes_dissimilar_candidate():
+    assert mmr_order(RANKED, VECTORS, lambda_=0.5) == [1, 3, 2]
+
+
+def test_mmr_pure_relevance_keeps_score_order():
+    assert mmr_order(RANKED, VECTORS, lambda_=1.0) == [1, 2, 3]
+
+
+def test_mmr_low_lambda_still_starts_with_best_score():
+    # premier choix: aucune similarité encore => le plus pertinent
+    assert mmr_order(RANKED, VECTORS, lambda_=0.1)[0] == 1
+
+
+def test_mmr_k_limits_reordering_to_the_head():
+    ranked = RANKED + [(4, 0.7), (5, 0.6)]
+    vectors = {**VECTORS, 4: [0.0, 1.0], 5: [1.0, 0.0]}
+    # 2 choix MMR, puis le reste dans l'ordre du score
+    assert mmr_order(ranked, vectors, lambda_=0.5, k=2) == [1, 3, 2, 4, 5]
+
+
+def test_mmr_candidate_without_vector_is_not_penalized():
+    vectors = {1: [1.0, 0.0], 2: [1.0, 0.0]}
+    assert mmr_order(RANKED, vectors, lambda_=0.5) == [1, 3, 2]
+
+
+def test_mmr_no_vectors_or_short_list_unchanged():
+    assert mmr_order(RANKED, {}, lambda_=0.5) == [1, 2, 3]
+    assert mmr_order(RANKED[:2], VECTORS, lambda_=0.5) == [1, 2]
+
+
+def test_hit_vectors_reads_source_and_skips_invalid():
+    hits = [
+        {"_id": "1", "_source": {VECTOR_FIELD: [0.1, 0.2]}},
+        {"_id": "2", "_source": {}},
+        {"_id": "x", "_source": {VECTOR_FIELD: [0.3, 0.4]}},
+        {"_id": "4"},
+    ]
+    assert hit_vectors(hits) == {1: [0.1, 0.2]}
@@ -0,0 +1,127 @@
+import base64
+import json
+
+import pytest
+
+from app.api.v1.endpoints import recommendations_feed as feed
+from app.services import impressions
+from app.services.feed_sessions import (
+    InvalidCursor,
+    create_session,
+    decode_cursor,
+    encode_cursor,
+    get_session,
+)
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("abc", 42, "events", 24)
+    assert decode_cursor(cursor, 42, "events") == {"s": "abc", "u": 42, "k": "events", "o": 24}
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor!",
+        "%%%%",
+        base64.urlsafe_b64encode(b"{not json").decode(),
+        raw_cursor({"s": "abc", "u": 42, "k": "events"}),            # offset manquant
+        raw_cursor({"s": "abc", "u": "x", "k": "events", "o": 0}),   # user non entier
+        raw_cursor(["abc", 42, "events", 0]),
+    ],
+)
+def test_tampered_cursor_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, 42, "events")
+
+
+def test_truncated_cursor_rejected():
+    cursor = encode_cursor("abc", 42, "events", 24)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor[:-6], 42, "events")
+
+
+@pytest.mark.parametrize(
+    "user_id, kind, offset",
+    [
+        (43, "events", 0),              # curseur d'un autre user
+        (42, "winkers:30", 0),          # curseur d'un autre feed
+        (42, "events", -12),            # offset négatif
+    ],
+)
+def test_mismatched_cursor_rejected(user_id, kind, offset):
+    cursor = raw_cursor({"s": "abc", "u": user_id, "k": kind, "o": offset})
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, 42, "events")
+
+
+def test_session_not_served_to_another_user_or_feed():
+    session = create_session(42, "events", [3, 2, 1])
+    assert get_session(session["id"], 42, "events")["ids"] == [3, 2, 1]
+    assert get_session(session["id"], 43, "events") is None
+    assert get_session(session["id"], 42, "winkers:30") is None
+    assert get_session("unknown", 42, "events") is None
+
+
+class Ranker:
+    """Ranking stable (comme sur la journée), compte les recalculs."""
+
+    def __init__(self, ids):
+        self.ids = list(ids)
+        self.calls = 0
+
+    def __call__(self, user_id):
+        self.calls += 1
+        return list(self.ids), {}
+
+
+@pytest.fixture
+def seen(monkeypatch):
+    items = set()
+    monkeypatch.setattr(impressions, "IMPRESSIONS_ENABLED", True)
+    monkeypatch.setattr(impressions, "get_seen_filter", lambda user_id, kind: items)
+    return items
+
+
+def test_pages_skip_seen_items_with_raw_offsets(seen):
+    rank = Ranker(range(1, 11))
+    seen.update({2, 3})
+    session, page, cursor = feed._page(7, "events", None, 3, rank)
+    assert page == [1, 4, 5]
+    assert session["ids"] == list(range(1, 11))  # liste brute en session
+    assert decode_cursor(cursor, 7, "events")["o"] == 5
+
+    # vu entre deux pages: sauté à la page suivante
+    seen.add(6)
+    _, page, cursor = feed._page(7, "events", cursor, 3, rank)
+    assert page == [7, 8, 9]
+    assert rank.calls == 1
+
+
+def test_rebuilt_session_resumes_at_the_same_position(seen, monkeypatch):
+    rank = Ranker(range(1, 11))
+    _, first, cursor = feed._page(7, "winkers:30", None, 4, rank)
+    # la 1re page est vue, puis la session expire (ou la page arrive sur un autre worker)
+    seen.update(first)
+    monkeypatch.setattr(feed, "get_session", lambda *args: None)
+
+    _, page, cursor = feed._page(7, "winkers:30", cursor, 4, rank)
+    assert first == [1, 2, 3, 4]
+    assert page == [5, 6, 7, 8]
+    assert rank.calls == 2
+
+
+def test_all_remaining_seen_serves_them_and_ends(seen):
+    rank = Ranker([1, 2, 3])
+    seen.update({1, 2, 3})
+    _, page, cursor = feed._page(7, "events", None, 5, rank)
+    assert page == [1, 2, 3] and cursor is None
+
+
+def test_unseen_page_disabled_is_a_plain_slice(monkeypatch):
+    monkeypatch.setattr(impressions, "IMPRESSIONS_ENABLED", False)
+    assert impressions.unseen_page(7, "events", [1, 2, 3, 4], 1, 2) == ([2, 3], 3)
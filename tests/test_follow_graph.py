@@ -0,0 +1,176 @@
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from app.services import follow_graph
+from app.services.follow_graph import FollowGraph
+
+def arrays(rows):
+    """[(id, follower, cible)] -> (ids int64, follower int32, cible int32)"""
+    data = np.asarray(rows, dtype=np.int64).reshape(-1, 3)
+    return data[:, 0], data[:, 1].astype(np.int32), data[:, 2].astype(np.int32)
+
+
+def graph_of(rows):
+    ids, src, dst = arrays(rows)
+    return FollowGraph.from_rows(ids, src, dst, int(ids.max()) if len(ids) else 0)
+
+
+def change(graph, rows=(), removed=()):
+    ids, src, dst = arrays(list(rows))
+    last_id = max([graph.last_edge_id, *ids.tolist()])
+    return graph.with_changes(ids, src, dst, np.asarray(removed, dtype=np.int64), last_id)
+
+
+def edges(graph, nodes=range(10)):
+    return {(u, int(v)) for u in nodes for v in graph.following_of(u)}
+
+
+def test_following_and_followers_from_rows():
+    graph = graph_of([(1, 1, 2), (2, 1, 3), (3, 2, 1), (4, 1, 2)])  # (1, 2) en double
+    assert graph.following_of(1).tolist() == [2, 3]
+    assert graph.followers_of(1).tolist() == [2]
+    assert graph.follow_flags(1, [2, 3, 4]) == ({2, 3}, {2})
+    assert graph.following_of(99).tolist() == []
+
+
+def test_follows_and_unfollows_through_delta():
+    graph = graph_of([(1, 1, 2), (2, 1, 3)])
+    graph = change(graph, rows=[(5, 1, 4), (6, 4, 1)], removed=[1])
+
+    assert graph.following_of(1).tolist() == [3, 4]
+    assert graph.followers_of(2).tolist() == []
+    assert graph.followers_of(1).tolist() == [4]
+    assert graph.row_ids().tolist() == [2, 5, 6]
+    assert graph.num_rows == 3 and graph.last_edge_id == 6
+
+
+def test_unfollow_of_a_delta_row_and_refollow():
+    graph = change(graph_of([(1, 1, 2)]), rows=[(2, 1, 3)])
+    graph = change(graph, removed=[2, 1])
+    assert graph.following_of(1).tolist() == []
+    assert graph.delta.added == {}
+
+    # re-follow: nouvelle ligne, même paire
+    graph = change(graph, rows=[(3, 1, 2)])
+    assert graph.following_of(1).tolist() == [2]
+    assert graph.followers_of(2).tolist() == [1]
+
+
+def test_merge_past_delta_max(monkeypatch):
+    monkeypatch.setattr(follow_graph, "FOLLOW_GRAPH_DELTA_MAX", 2)
+    graph = graph_of([(1, 1, 2), (2, 2, 3)])
+
+    small = change(graph, rows=[(3, 3, 1)])
+    assert small.base is graph.base and small.delta.size == 1
+
+    merged = change(small, rows=[(4, 1, 3)], removed=[2])
+    assert merged.base is not graph.base and merged.delta.size == 0
+    assert merged.base.ids.tolist() == [1, 3, 4]
+    assert edges(merged) == {(1, 2), (1, 3), (3, 1)}
+    assert merged.last_edge_id == 4
+
+
+def test_friends_of_friends_excludes_self_and_direct_follows():
+    graph = graph_of([
+        (1, 1, 2), (2, 1, 3),             # 1 suit 2 et 3
+        (3, 2, 3), (4, 2, 4), (5, 2, 1),  # 2 suit 3 (déjà suivi), 4, et 1 (lui-même)
+        (6, 3, 4), (7, 3, 5),
+    ])
+    assert graph.friends_of_friends(1, limit=10, max_fanout=10) == [(4, 2), (5, 1)]
+    assert graph.friends_of_friends(1, limit=1, max_fanout=10) == [(4, 2)]
+    assert graph.friends_of_friends(9, limit=10, max_fanout=10) == []
+
+
+def test_friends_of_friends_fanout_sample_is_stable_per_user():
+    rows = [(i, 0, i) for i in range(1, 21)] + [(100 + i, i, 50 + i) for i in range(1, 21)]
+    graph = graph_of(rows)
+    first = graph.friends_of_friends(0, limit=50, max_fanout=5)
+    assert len(first) == 5
+    assert graph.friends_of_friends(0, limit=50, max_fanout=5) == first
+
+
+class FakeCursor:
+    def __init__(self, table):
+        self.table = table
+        self.rows = []
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        (bound,) = params
+        if sql == follow_graph.FOLLOW_EDGES_SQL:
+            self.rows = [r for r in self.table if r[0] > bound]
+        elif sql == follow_graph.FOLLOW_EDGES_COUNT_SQL:
+            self.rows = [(sum(1 for r in self.table if r[0] <= bound),)]
+        elif sql == follow_graph.FOLLOW_EDGE_IDS_SQL:
+            self.rows = [(r[0],) for r in self.table if r[0] <= bound]
+        else:
+            raise AssertionError(sql)
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchmany(self, size):
+        out, self.rows = self.rows[:size], self.rows[size:]
+        return out
+
+
+@pytest.fixture
+def table(monkeypatch):
+    rows = []
+
+    @contextmanager
+    def conn():
+        class Conn:
+            def cursor(self, name=None):
+                return FakeCursor(sorted(rows))
+
+        yield Conn()
+
+    monkeypatch.setattr(follow_graph, "get_conn", conn)
+    monkeypatch.setattr(follow_graph, "_graph", None)
+    return rows
+
+
+def test_refresh_picks_up_late_commits_and_unfollows(table, monkeypatch):
+    monkeypatch.setattr(follow_graph, "FOLLOW_GRAPH_REREAD_IDS", 2)
+    table.extend([(1, 1, 2), (2, 1, 3), (4, 2, 3)])
+    assert follow_graph.refresh_follow_graph()["full"] is True
+
+    # id 3 commité après 4 (séquence allouée avant): relu dans la fenêtre ]2, 4];
+    # 1 et 2 supprimés sous la fenêtre (count + liste des ids)
+    table[:] = [(3, 2, 1), (4, 2, 3), (7, 3, 1)]
+    result = follow_graph.refresh_follow_graph()
+    graph = follow_graph.get_follow_graph()
+
+    assert result["full"] is False
+    assert result["new_edges"] == 2 and result["removed_edges"] == 2
+    assert graph.row_ids().tolist() == [3, 4, 7]
+    assert edges(graph) == {(2, 1), (2, 3), (3, 1)}
+    assert graph.last_edge_id == 7
+
+
+def test_refresh_unfollow_in_window_and_no_op_refresh(table, monkeypatch):
+    monkeypatch.setattr(follow_graph, "FOLLOW_GRAPH_REREAD_IDS", 3)
+    table.extend([(1, 1, 2), (2, 1, 3), (3, 2, 3), (10, 3, 4)])
+    follow_graph.refresh_follow_graph()
+
+    del table[1]  # unfollow id 2, sous la fenêtre ]7, 10]
+    table.append((9, 1, 4))  # commit tardif dans la fenêtre, unfollow 10
+    del table[2]
+    follow_graph.refresh_follow_graph()
+    assert follow_graph.get_follow_graph().row_ids().tolist() == [1, 3, 9]
+    assert follow_graph.get_follow_graph().following_of(1).tolist() == [2, 4]
+    assert follow_graph.get_follow_graph().following_of(3).tolist() == []
+
+    # rien de changé: pas de delta supplémentaire
+    size = follow_graph.get_follow_graph().delta.size
+    follow_graph.refresh_follow_graph()
+    assert follow_graph.get_follow_graph().delta.size == size
@@ -0,0 +1,79 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.jobs.geo_tile_pools import compute_geo_pools, save_geo_pools
+from app.services.geo_pools import GeoPoolStore, haversine_to, tile_keys
+
+RADIUS_KM = 200.0
+PRECISION = 3
+
+
+def make_events(n=3000, seed=7):
+    """Events aléatoires autour de la France (+ quelques-uns passés / sans position)."""
+    rng = np.random.default_rng(seed)
+    lat = np.radians(rng.uniform(41.0, 52.0, n))
+    lon = np.radians(rng.uniform(-5.0, 9.0, n))
+    lat[:20] = np.nan
+    lon[:20] = np.nan
+    upcoming = np.ones(n, dtype=bool)
+    upcoming[20:40] = False
+    matrix = rng.normal(size=(n, 8)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return {
+        "ids": np.arange(1, n + 1, dtype=np.int32),
+        "matrix": matrix,
+        "lat": lat,
+        "lon": lon,
+        "day": np.full(n, date.today().toordinal() + 1, dtype=np.int32),
+        "upcoming": upcoming,
+    }
+
+
+@pytest.fixture(scope="module")
+def pools():
+    return compute_geo_pools(make_events(), precision=PRECISION, radius_km=RADIUS_KM)
+
+
+def query_points(n=300, seed=11):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(40.0, 53.0, n), rng.uniform(-6.0, 10.0, n)
+
+
+def test_tile_pool_covers_every_event_within_radius(pools):
+    tiles = pools["tiles"]
+    for lat_deg, lon_deg in zip(*query_points()):
+        dist = haversine_to(np.radians(lat_deg), np.radians(lon_deg), pools["lat"], pools["lon"])
+        within = set(np.flatnonzero(dist <= RADIUS_KM).tolist())
+
+        key = int(tile_keys(np.asarray([lat_deg]), np.asarray([lon_deg]), PRECISION)[0])
+        pos = int(np.searchsorted(tiles, key))
+        if pos < len(tiles) and tiles[pos] == key:
+            pool = set(pools["rows"][pools["indptr"][pos]:pools["indptr"][pos + 1]].tolist())
+        else:
+            pool = set()
+        assert within <= pool, (lat_deg, lon_deg, sorted(within - pool)[:5])
+
+
+def test_pools_only_keep_upcoming_located_events(pools):
+    kept = set(pools["ids"].tolist())
+    assert not kept & set(range(1, 41))  # sans position (1-20) / passés (21-40)
+    assert len(kept) == 3000 - 40
+    assert not np.isnan(pools["lat"]).any()
+
+
+def test_store_search_returns_all_events_in_radius(pools, tmp_path):
+    path = str(tmp_path / "pools.npz")
+    save_geo_pools(path, pools)
+    store = GeoPoolStore(path)
+
+    lat_deg, lon_deg = 46.5, 2.5
+    q = pools["matrix"][0]
+    found = store.search(q.tolist(), {"lat": lat_deg, "lon": lon_deg}, RADIUS_KM, k=len(pools["ids"]))
+
+    dist = haversine_to(np.radians(lat_deg), np.radians(lon_deg), pools["lat"], pools["lon"])
+    expected = set(pools["ids"][dist <= RADIUS_KM].tolist())
+    assert {event_id for event_id, _ in found} == expected
+    scores = [score for _, score in found]
+    assert scores == sorted(scores, reverse=True)
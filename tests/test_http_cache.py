@@ -0,0 +1,130 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from app.api import http_cache
+from app.api.http_cache import data_version, doc_versions, matches, not_modified_or_none, reco_etag
+from app.api.v1.endpoints import recommendations, recommendations_async
+
+HITS = [
+    {"_id": "1", "_seq_no": 10, "_primary_term": 1},
+    {"_id": "2", "_seq_no": 11, "_primary_term": 1},
+]
+
+
+def test_matches_weak_list_and_star():
+    etag = '"abc"'
+    assert matches('"abc"', etag)
+    assert matches('W/"abc"', etag)
+    assert matches('"x", W/"abc"', etag)
+    assert matches("*", etag)
+    assert not matches('"abd"', etag)
+    assert not matches(None, etag) and not matches("", etag)
+
+
+def test_doc_versions_from_hits_and_mget_docs():
+    docs = HITS + [{"_id": "3", "_version": 4, "found": True}, {"_id": "4", "found": False}, {"_id": "x"}]
+    assert doc_versions(docs) == {1: "1.10", 2: "1.11", 3: "v4"}
+    assert doc_versions(None) == {}
+
+
+def test_etag_follows_ids_order_day_and_version(monkeypatch):
+    versions = doc_versions(HITS)
+    etag = reco_etag("k", 7, [1, 2], data_version("live", [1, 2], versions))
+    assert etag == reco_etag("k", 7, [1, 2], data_version("live", [1, 2], dict(versions)))
+    assert etag != reco_etag("k", 7, [2, 1], data_version("live", [2, 1], versions))
+    assert etag != reco_etag("k", 8, [1, 2], data_version("live", [1, 2], versions))
+    assert etag != reco_etag("k", 7, [1, 2], data_version("materialized.1", [1, 2], versions))
+    # event ré-indexé (seq_no qui bouge) => nouvel ETag
+    assert etag != reco_etag("k", 7, [1, 2], data_version("live", [1, 2], {**versions, 2: "1.12"}))
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(http_cache, "date", Tomorrow)
+    assert etag != reco_etag("k", 7, [1, 2], data_version("live", [1, 2], versions))
+
+
+def test_not_modified_only_with_matching_etag():
+    assert not_modified_or_none("k", '"a"', None) is None
+    assert not_modified_or_none("k", '"b"', '"a"') is None
+    response = not_modified_or_none("k", '"a"', '"a"')
+    assert response.status_code == 304 and response.headers["ETag"] == '"a"'
+
+
+class FakeEs:
+    def __init__(self):
+        self.mgets = []
+
+    def mget(self, index, ids, source):
+        self.mgets.append(ids)
+        return {"docs": [{"_id": i, "_seq_no": 5, "_primary_term": 2, "found": True} for i in ids]}
+
+
+class FakeAsyncEs(FakeEs):
+    async def mget(self, index, ids, source):
+        return FakeEs.mget(self, index, ids, source)
+
+
+@pytest.fixture
+def live(monkeypatch):
+    """Endpoints branchés sur le chemin live (ids 1, 2, 3 dont 2 hits ES), hydratation comptée."""
+    es, async_es, hydrated = FakeEs(), FakeAsyncEs(), []
+
+    def hydrate(ids, hits=None):
+        hydrated.append(list(ids))
+        return []
+
+    async def hydrate_async(ids, hits=None):
+        return hydrate(ids, hits)
+
+    async def live_async(user_id):
+        return [1, 2, 3], HITS
+
+    monkeypatch.setattr(recommendations, "materialized_ids", lambda path, kind, user_id: None)
+    monkeypatch.setattr(recommendations, "live_event_ids", lambda user_id: ([1, 2, 3], HITS))
+    monkeypatch.setattr(recommendations, "hydrate_events", hydrate)
+    monkeypatch.setattr(recommendations, "get_es", lambda: es)
+    monkeypatch.setattr(recommendations_async, "materialized_ids", lambda path, kind, user_id: None)
+    monkeypatch.setattr(recommendations_async, "_live_event_ids", live_async)
+    monkeypatch.setattr(recommendations_async, "hydrate_events_async", hydrate_async)
+    monkeypatch.setattr(recommendations_async, "get_async_es_client", lambda: async_es)
+    return es, async_es, hydrated
+
+
+def test_sync_endpoint_answers_304_before_hydration(live):
+    es, _, hydrated = live
+    first = recommendations.get_events_for_winker(7, None)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and hydrated == [[1, 2, 3]]
+    # seul l'id sans version dans les hits part en mget
+    assert es.mgets == [["3"]]
+
+    again = recommendations.get_events_for_winker(7, etag)
+    assert again.status_code == 304 and again.headers["ETag"] == etag
+    assert hydrated == [[1, 2, 3]]
+
+
+def test_async_endpoint_shares_the_sync_etag(live):
+    _, async_es, hydrated = live
+    etag = recommendations.get_events_for_winker(7, None).headers["ETag"]
+
+    again = asyncio.run(recommendations_async.get_events_for_winker_async(7, f"W/{etag}"))
+    assert again.status_code == 304 and async_es.mgets == [["3"]]
+    assert len(hydrated) == 1
+
+
+def test_versions_unavailable_serves_without_etag(live, monkeypatch):
+    _, _, hydrated = live
+
+    class DownEs:
+        def mget(self, **kwargs):
+            raise ConnectionError("es down")
+
+    monkeypatch.setattr(recommendations, "get_es", lambda: DownEs())
+    response = recommendations.get_events_for_winker(7, "*")
+    assert response.status_code == 200 and "ETag" not in response.headers
+    assert hydrated == [[1, 2, 3]]
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.api.v1.endpoints import recommendations_async
+from app.core.config import IMPRESSIONS_ROTATE_AFTER
+from app.services import impressions
+from app.services.impressions import SeenFilter, record_impressions, unseen_first
+
+
+def fill(seen, start, count):
+    ids = list(range(start, start + count))
+    for item_id in ids:
+        seen.add(item_id)
+    return ids
+
+
+def test_added_items_are_seen():
+    seen = SeenFilter()
+    ids = fill(seen, 1, 50)
+    assert all(i in seen for i in ids)
+    assert seen.cur_count == 50
+
+
+def test_rotation_keeps_previous_generation_then_forgets_it():
+    seen = SeenFilter()
+    first = fill(seen, 1_000_000, IMPRESSIONS_ROTATE_AFTER)
+    second = fill(seen, 2_000_000, IMPRESSIONS_ROTATE_AFTER)
+
+    # 1re rotation: la 1re génération est devenue `prev`, toujours vue
+    assert seen.prev is not None
+    assert all(i in seen for i in first)
+    assert all(i in seen for i in second)
+
+    fill(seen, 3_000_000, IMPRESSIONS_ROTATE_AFTER)
+    # 2e rotation: la 1re génération est oubliée (aux faux positifs près)
+    still_seen = sum(i in seen for i in first)
+    assert still_seen <= 0.02 * len(first)
+    assert all(i in seen for i in second)
+
+
+def test_false_positive_rate_with_two_full_generations():
+    seen = SeenFilter()
+    fill(seen, 1, IMPRESSIONS_ROTATE_AFTER)
+    fill(seen, 100_000, IMPRESSIONS_ROTATE_AFTER)
+
+    probes = range(10_000_000, 10_020_000)
+    false_positives = sum(i in seen for i in probes)
+    # ~0.25% attendu avec les défauts (8192 bits, 5 hashes, 2 x 500 items)
+    assert false_positives / len(probes) < 0.01
+
+
+def test_serialized_filter_round_trips():
+    seen = SeenFilter()
+    ids = fill(seen, 1, 30)
+    restored = SeenFilter(bytes(seen.cur), seen.prev, seen.cur_count)
+    assert all(i in restored for i in ids)
+    assert restored.cur_count == seen.cur_count
+
+
+def test_wrong_size_blobs_are_ignored():
+    seen = SeenFilter(cur=b"\xff" * 3, prev=b"\xff" * 3, cur_count=7)
+    assert 42 not in seen
+    assert seen.prev is None
+
+
+@pytest.fixture
+def impressions_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(impressions, "IMPRESSIONS_ENABLED", True)
+    monkeypatch.setattr(impressions, "IMPRESSIONS_DB_PATH", str(tmp_path / "impressions.db"))
+    monkeypatch.setattr(impressions, "_local", threading.local())
+    impressions._cache.clear()
+    yield
+    impressions._cache.clear()
+
+
+def test_unseen_first_keeps_order_and_pads_with_seen(impressions_db):
+    record_impressions(7, "events", [2, 4])
+    assert unseen_first(7, "events", [1, 2, 3, 4, 5]) == [1, 3, 5, 2, 4]
+    assert unseen_first(7, "events", [2, 4, 1], keep=2) == [1, 2]
+    # autre user / autre type: rien de vu
+    assert unseen_first(8, "events", [2, 4]) == [2, 4]
+    assert unseen_first(7, "winkers", [2, 4]) == [2, 4]
+
+
+def test_impressions_persisted_across_cache_expiry(impressions_db):
+    assert record_impressions(7, "winkers", [10, 11]) == 2
+    impressions._cache.clear()
+    assert 10 in impressions.get_seen_filter(7, "winkers")
+    assert record_impressions(7, "winkers", []) == 0
+
+
+def test_async_endpoint_filters_seen_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def fake_unseen_first(user_id, kind, ids, keep=None):
+        threads.append(threading.current_thread())
+        return list(ids)[:keep]
+
+    async def hydrate(ids, hits):
+        return []
+
+    async def versions(ids, hits):
+        return {}
+
+    monkeypatch.setattr(recommendations_async, "unseen_first", fake_unseen_first)
+    monkeypatch.setattr(recommendations_async, "materialized_ids", lambda path, kind, user_id: [1, 2])
+    monkeypatch.setattr(recommendations_async, "hydrate_events_async", hydrate)
+    monkeypatch.setattr(recommendations_async, "_event_versions", versions)
+
+    asyncio.run(recommendations_async.get_events_for_winker_async(7, None))
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.jobs.materialize_recommendations import _diversified
+from app.services import materialized
+from app.services.materialized import MaterializedStore, build_day_field, materialized_ids
+from app.services.neighbors import save_neighbors
+
+LISTS = {1: [(10, 0.9), (11, 0.8)], 2: [(12, 0.5)]}
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(materialized, "MATERIALIZED_ENABLED", True)
+
+    def write(day, name="events.npz"):
+        path = str(tmp_path / name)
+        save_neighbors(path, LISTS, build_day_field(day))
+        return path
+
+    return write
+
+
+def test_built_day_read_from_file(store_path):
+    path = store_path(date(2026, 1, 2))
+    assert MaterializedStore(path).built_day() == date(2026, 1, 2).toordinal()
+    assert MaterializedStore(path + ".absent").built_day() is None
+
+
+def test_today_file_serves_ids_in_stored_order(store_path):
+    path = store_path(date.today())
+    assert materialized_ids(path, "events", 1) == [10, 11]
+    # user absent du fichier => chemin live
+    assert materialized_ids(path, "events", 3) is None
+
+
+def test_other_day_or_missing_file_falls_back_to_live(store_path, tmp_path):
+    stale = store_path(date.today() - timedelta(days=1), name="stale.npz")
+    assert materialized_ids(stale, "events", 1) is None
+    assert materialized_ids(str(tmp_path / "none.npz"), "events", 1) is None
+
+
+def test_disabled(store_path, monkeypatch):
+    path = store_path(date.today(), name="disabled.npz")
+    monkeypatch.setattr(materialized, "MATERIALIZED_ENABLED", False)
+    assert materialized_ids(path, "events", 1) is None
+
+
+def test_diversified_keeps_original_scores_without_mmr():
+    ranked = [(3, 0.9), (1, 0.7), (2, 0.5)]
+    # lambda 1 (ou pas de vecteurs): ordre et scores du ranking, tronqués par l'appelant
+    assert _diversified(ranked, [], 1.0, k=2) == ranked
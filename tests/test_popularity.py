@@ -0,0 +1,105 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import POPULARITY_WEIGHTS
+from app.jobs import popularity
+from app.jobs.popularity import compute_boosts
+from app.repositories import events as events_repo
+
+
+def row(event_id, participants=0, comments=0, views=0, stories=0, age_days=0.0):
+    return (event_id, participants, comments, views, stories, age_days)
+
+
+def test_compute_boosts_scales_top_event_to_scale():
+    boosts = compute_boosts([row(1, participants=10), row(2, participants=1)], scale=10.0)
+    assert boosts[1] == pytest.approx(10.0)
+    expected = 10.0 * math.log1p(1) / math.log1p(10)
+    assert boosts[2] == pytest.approx(expected, abs=1e-4)
+
+
+def test_compute_boosts_half_life_decay():
+    # même signaux, l'un a exactement une demi-vie => moitié du boost
+    boosts = compute_boosts(
+        [row(1, views=100, age_days=0.0), row(2, views=100, age_days=7.0)],
+        half_life_days=7.0,
+        scale=4.0,
+    )
+    assert boosts == {1: pytest.approx(4.0), 2: pytest.approx(2.0)}
+
+
+def test_compute_boosts_weights_and_empty():
+    assert compute_boosts([]) == {}
+    boosts = compute_boosts([row(1, comments=5), row(2, stories=5)], scale=1.0)
+    ratio = POPULARITY_WEIGHTS["nbComment"] / POPULARITY_WEIGHTS["nbStories"]
+    assert boosts[1] / boosts[2] == pytest.approx(ratio, abs=1e-3)
+    # aucun signal => pas de division par zéro
+    assert compute_boosts([row(3)]) == {3: 0.0}
+
+
+def test_write_boosts_only_touches_boost(monkeypatch):
+    sent = []
+
+    def fake_bulk(client, actions, **kwargs):
+        sent.extend(actions)
+        return len(sent), 0
+
+    monkeypatch.setattr("elasticsearch.helpers.bulk", fake_bulk)
+    assert popularity.write_boosts({7: 1.5}) == {"updated": 1, "errors": 0}
+    assert sent == [{"_op_type": "update", "_index": popularity.INDEX_EVENTS, "_id": "7", "doc": {"boost": 1.5}}]
+
+
+EVENT_ATTRS = (
+    "titre bioEvent city region subregion pays codePostal dateEvent datePublication "
+    "ageMinimum ageMaximum accessFille accessGarcon accessTous hastagEvents meetEligible "
+    "planTripElligible currentNbParticipants maxNumberParticipant isFull lat lon "
+    "vectorPreferenceEvent"
+).split()
+
+
+def event(event_id, **fields):
+    # objet à attributs (index_event lit des champs que EventIn ne déclare pas tous)
+    return SimpleNamespace(id=event_id, **{**dict.fromkeys(EVENT_ATTRS), **fields})
+
+
+class FakeEs:
+    def __init__(self):
+        self.calls = []
+
+    def update(self, **kwargs):
+        self.calls.append(kwargs)
+
+
+def test_index_event_upserts_and_clears_missing_fields(monkeypatch):
+    es = FakeEs()
+    monkeypatch.setattr(events_repo, "es_client", es)
+    monkeypatch.setattr(events_repo, "EVENTS_DENORMALIZED", True)
+    monkeypatch.setattr(events_repo, "build_event_cards", lambda ids: {})
+
+    events_repo.index_event(event(3, titre="t"))
+
+    (call,) = es.calls
+    assert call["doc_as_upsert"] is True and call["id"] == "3"
+    # `boost` jamais écrit ici, les champs absents sont remis à null
+    assert "boost" not in call["doc"]
+    assert call["doc"]["latlon"] is None
+    assert call["doc"]["vectorPreferenceEvent"] is None
+    assert call["doc"][events_repo.EVENT_CARD_FIELD] is None
+
+
+def test_bulk_index_events_clears_missing_fields(monkeypatch):
+    sent = []
+    monkeypatch.setattr("elasticsearch.helpers.bulk", lambda client, actions: sent.extend(actions))
+    monkeypatch.setattr(events_repo, "EVENTS_DENORMALIZED", True)
+    monkeypatch.setattr(events_repo, "build_event_cards", lambda ids: {1: {"titre": "a"}})
+
+    events_repo.bulk_index_events([event(1, lat=1.0, lon=2.0), event(2)])
+
+    first, second = (action["doc"] for action in sent)
+    assert all(action["_op_type"] == "update" and action["doc_as_upsert"] for action in sent)
+    assert first[events_repo.EVENT_CARD_FIELD] == {"titre": "a"}
+    assert first["latlon"] == {"lat": 1.0, "lon": 2.0}
+    assert second[events_repo.EVENT_CARD_FIELD] is None
+    assert second["vectorPreferenceEvent"] is None and second["latlon"] is None
@@ -0,0 +1,66 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.api.v1.endpoints import recommendations, recommendations_async
+from app.services.profiles import pack_vector, profile_vectors, unpack_vector
+
+PROFILE = {"id": 1, "bio": "randonnée", "city": "Lyon"}
+
+
+@pytest.fixture(autouse=True)
+def clear_vectors():
+    profile_vectors.clear()
+    yield
+    profile_vectors.clear()
+
+
+def test_pack_vector_is_float32_and_round_trips():
+    vec = [0.25, -1.5, 3.0]
+    packed = pack_vector(vec)
+    assert packed.dtype == np.float32 and packed.nbytes == 12
+    # tolist(): floats Python sérialisables en JSON pour ES
+    assert unpack_vector(packed) == vec
+    assert all(type(x) is float for x in unpack_vector(packed))
+
+
+def test_sync_vector_cached_as_float32_and_reused(monkeypatch):
+    calls = []
+    monkeypatch.setattr(recommendations, "get_requester_profile", lambda uid: dict(PROFILE))
+    monkeypatch.setattr(recommendations, "get_embedding", lambda text: calls.append(text) or [0.5, 0.25])
+
+    assert recommendations.requester_profile_and_vector(1, "vide") == (PROFILE, [0.5, 0.25])
+    text, stored = profile_vectors.get(1)
+    assert isinstance(stored, np.ndarray) and stored.dtype == np.float32
+
+    winker, vec = recommendations.requester_profile_and_vector(1, "vide")
+    assert vec == [0.5, 0.25] and isinstance(vec, list)
+    assert len(calls) == 1
+
+
+def test_sync_vector_recomputed_when_profile_text_changes(monkeypatch):
+    profiles = iter([dict(PROFILE), {**PROFILE, "bio": "escalade"}])
+    monkeypatch.setattr(recommendations, "get_requester_profile", lambda uid: next(profiles))
+    monkeypatch.setattr(recommendations, "get_embedding", lambda text: [float(len(text))])
+
+    _, first = recommendations.requester_profile_and_vector(1, "vide")
+    _, second = recommendations.requester_profile_and_vector(1, "vide")
+    assert first != second
+
+
+def test_async_vector_shares_the_packed_cache(monkeypatch):
+    async def profile(uid):
+        return dict(PROFILE)
+
+    monkeypatch.setattr(recommendations_async, "get_requester_profile_async", profile)
+    monkeypatch.setattr(recommendations_async, "get_embedding", lambda text: [1.0, 2.0])
+
+    _, vec = asyncio.run(recommendations_async._profile_and_vector(1, "vide"))
+    assert vec == [1.0, 2.0]
+    assert profile_vectors.get(1)[1].dtype == np.float32
+
+    # la version sync relit le même cache sans ré-encoder
+    monkeypatch.setattr(recommendations, "get_requester_profile", lambda uid: dict(PROFILE))
+    monkeypatch.setattr(recommendations, "get_embedding", lambda text: pytest.fail("ré-encodé"))
+    assert recommendations.requester_profile_and_vector(1, "vide")[1] == [1.0, 2.0]
@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+
+import psycopg
+import pytest
+from psycopg_pool import PoolTimeout
+
+from app.core import db
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, *args, **kwargs):
+        if self.conn.fail_lag_check:
+            raise psycopg.OperationalError("boom")
+
+    def fetchone(self):
+        return (self.conn.lag_s,)
+
+
+class FakeConn:
+    def __init__(self, name, lag_s=0.0, fail_lag_check=False):
+        self.name = name
+        self.lag_s = lag_s
+        self.fail_lag_check = fail_lag_check
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+
+class FakePool:
+    def __init__(self, conn=None, error=None):
+        self.conn = conn
+        self.error = error
+
+    @contextmanager
+    def connection(self):
+        if self.error is not None:
+            raise self.error
+        yield self.conn
+
+
+def replica(index, **pool_kwargs):
+    r = db._Replica(index, f"postgresql://replica{index}")
+    r.pool = FakePool(**pool_kwargs)
+    return r
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    @contextmanager
+    def primary():
+        yield FakeConn("primary")
+
+    monkeypatch.setattr(db, "get_conn", primary)
+
+    def install(*items):
+        monkeypatch.setattr(db, "_replicas", list(items))
+        return items
+
+    return install
+
+
+def read_target():
+    with db.get_read_conn() as conn:
+        return conn.name
+
+
+def test_no_replica_reads_primary(replicas):
+    replicas()
+    assert read_target() == "primary"
+
+
+def test_healthy_replicas_round_robin(replicas):
+    replicas(replica(0, conn=FakeConn("r0")), replica(1, conn=FakeConn("r1")))
+    assert {read_target() for _ in range(4)} == {"r0", "r1"}
+
+
+def test_lagging_replica_falls_back_to_primary(replicas):
+    (lagging,) = replicas(replica(0, conn=FakeConn("r0", lag_s=db.DB_REPLICA_MAX_LAG_S + 1)))
+    assert read_target() == "primary"
+    assert lagging.lag_s > db.DB_REPLICA_MAX_LAG_S
+    # retard mémorisé: pas de nouvelle connexion avant le prochain check
+    lagging.pool = FakePool(error=AssertionError("reconnected"))
+    assert read_target() == "primary"
+
+
+def test_replica_not_streaming_is_set_aside(replicas):
+    (detached,) = replicas(replica(0, conn=FakeConn("r0", lag_s=None)))
+    assert read_target() == "primary"
+    assert detached.down_until > 0 and not detached.usable(detached.down_until - 1)
+
+
+@pytest.mark.parametrize(
+    "pool_kwargs",
+    [{"error": PoolTimeout("full")}, {"conn": FakeConn("r0", fail_lag_check=True)}],
+)
+def test_replica_errors_mark_down_and_use_next(replicas, pool_kwargs):
+    broken, healthy = replicas(replica(0, **pool_kwargs), replica(1, conn=FakeConn("r1")))
+    targets = {read_target() for _ in range(2)}
+    assert targets == {"r1"}
+    assert broken.down_until > 0
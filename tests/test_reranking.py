@@ -0,0 +1,106 @@
+import math
+import time
+
+import numpy as np
+import pytest
+
+from app.services.reranking import (
+    DEFAULT_WINKER_WEIGHTS,
+    gauss_decay,
+    parse_weights,
+    rerank_winkers,
+    winker_features,
+)
+
+DAY_MS = 86400 * 1000.0
+PARIS = {"lat": 48.8566, "lon": 2.3522}
+KM_PER_DEG_LAT = 6371.0 * math.pi / 180.0
+
+
+def es_gauss(value, origin, scale, offset, decay):
+    """Formule gauss de function_score (doc ES), écrite indépendamment du code testé."""
+    sigma2 = -(scale ** 2) / (2.0 * math.log(decay))
+    dist = max(0.0, abs(value - origin) - offset)
+    return math.exp(-(dist ** 2) / (2.0 * sigma2))
+
+
+def hit(winker_id, score, last_ms=None, lat=None, lon=None, age=None, boost=None):
+    fields = {}
+    if last_ms is not None:
+        fields["lastConnection"] = [last_ms]
+    if lat is not None:
+        fields["localisation"] = [{"lat": lat, "lon": lon}]
+    if age is not None:
+        fields["age"] = [age]
+    if boost is not None:
+        fields["boost"] = [boost]
+    return {"_id": str(winker_id), "_score": score, "fields": fields}
+
+
+@pytest.mark.parametrize(
+    "origin, scale, offset, decay",
+    [(0.0, 10.0, 1.0, 0.5), (30.0, 5.0, 1.0, 0.5), (0.0, 3 * DAY_MS, 0.0, 0.4)],
+)
+def test_gauss_decay_matches_es_formula(origin, scale, offset, decay):
+    values = origin + np.linspace(-3 * scale, 3 * scale, 25)
+    expected = [es_gauss(v, origin, scale, offset, decay) for v in values]
+    assert gauss_decay(values, origin, scale, offset, decay) == pytest.approx(expected)
+
+
+def test_gauss_decay_reference_points():
+    # 1 dans l'offset, `decay` à offset + scale (définition de scale/decay côté ES)
+    out = gauss_decay(np.asarray([0.5, 11.0, -11.0]), 0.0, 10.0, 1.0, 0.5)
+    assert out == pytest.approx([1.0, 0.5, 0.5])
+
+
+def test_winker_features_follow_es_rescore():
+    now_ms = 1_700_000_000_000.0
+    north_11km = PARIS["lat"] + 11.0 / KM_PER_DEG_LAT
+    hits = [
+        hit(1, 0.9, last_ms=now_ms, lat=PARIS["lat"], lon=PARIS["lon"], age=30, boost=2.0),
+        hit(2, 0.7, last_ms=now_ms - 3 * DAY_MS, lat=north_11km, lon=PARIS["lon"], age=36),
+    ]
+    ids, features = winker_features(hits, PARIS, user_age=30, now_ms=now_ms)
+
+    assert ids.tolist() == [1, 2]
+    # colonnes: knn, recency, geo, age, boost
+    assert features[0] == pytest.approx([0.9, 1.0, 1.0, 1.0, 0.05 * 2.0])
+    assert features[1] == pytest.approx(
+        [0.7, 0.4, 0.5, es_gauss(36, 30, 5.0, 1.0, 0.5), 0.0], rel=1e-6
+    )
+
+
+def test_winker_features_missing_fields():
+    # pas de lastConnection / age => 0 (filtre exists d'ES), pas de localisation => 1
+    ids, features = winker_features([hit(5, 0.3)], PARIS, user_age=30, now_ms=0.0)
+    assert ids.tolist() == [5]
+    assert features[0] == pytest.approx([0.3, 0.0, 1.0, 0.0, 0.0])
+
+
+def test_rerank_winkers_weighted_sum_and_order():
+    now_ms = time.time() * 1000.0  # rerank_winkers prend l'heure courante
+    hits = [
+        # meilleur kNN mais inactif depuis longtemps et loin
+        hit(1, 1.0, last_ms=now_ms - 60 * DAY_MS, lat=PARIS["lat"] + 1.0, lon=PARIS["lon"], age=30),
+        # kNN plus faible, actif et sur place
+        hit(2, 0.6, last_ms=now_ms, lat=PARIS["lat"], lon=PARIS["lon"], age=30),
+    ]
+    ranked, breakdown = rerank_winkers(hits, PARIS, 30, weights=DEFAULT_WINKER_WEIGHTS, explain=True)
+
+    assert [winker_id for winker_id, _ in ranked] == [2, 1]
+    for winker_id, score in ranked:
+        assert score == pytest.approx(sum(breakdown[winker_id].values()), abs=1e-3)
+    assert breakdown[2]["recency"] == pytest.approx(DEFAULT_WINKER_WEIGHTS["recency"], rel=1e-3)
+
+
+def test_rerank_winkers_skips_bad_ids_and_empty():
+    assert rerank_winkers([], PARIS, 30) == ([], {})
+    ranked, breakdown = rerank_winkers([{"_id": "x", "_score": 1.0}], PARIS, 30)
+    assert ranked == [] and breakdown == {}
+
+
+def test_parse_weights_overrides_known_features_only():
+    weights = parse_weights("geo:2.5, unknown:9, knn:", DEFAULT_WINKER_WEIGHTS)
+    assert weights["geo"] == 2.5
+    assert weights["knn"] == DEFAULT_WINKER_WEIGHTS["knn"]
+    assert "unknown" not in weights
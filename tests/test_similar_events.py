@@ -0,0 +1,91 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.jobs import similar_events
+from app.jobs.similar_events import _parse_day, _parse_geo, compute_similar_events
+
+NAN = float("nan")
+
+
+def dataset(rows):
+    """rows: [(id, vecteur, (lat, lon) en degrés ou None, à venir)] -> format de load_event_vectors"""
+    matrix = np.asarray([r[1] for r in rows], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    coords = np.radians(np.asarray([r[2] or (NAN, NAN) for r in rows], dtype=np.float64))
+    return {
+        "ids": np.asarray([r[0] for r in rows], dtype=np.int32),
+        "matrix": matrix,
+        "lat": coords[:, 0],
+        "lon": coords[:, 1],
+        "upcoming": np.asarray([r[3] for r in rows]),
+    }
+
+
+PARIS = (48.8566, 2.3522)
+LYON = (45.764, 4.8357)
+
+
+def test_top_k_by_cosine_without_self():
+    data = dataset([
+        (1, [1.0, 0.0], None, True),
+        (2, [0.9, 0.1], None, True),
+        (3, [0.0, 1.0], None, True),
+    ])
+    out = compute_similar_events(data, top_k=1, radius_km=0, min_score=0.0)
+    assert [n for n, _ in out[1]] == [2]
+    assert [n for n, _ in out[3]] == [2]
+    assert out[1][0][1] == pytest.approx(0.9 / np.hypot(0.9, 0.1), abs=1e-4)
+
+
+def test_past_events_are_sources_not_neighbors():
+    data = dataset([
+        (1, [1.0, 0.0], None, False),
+        (2, [1.0, 0.05], None, True),
+        (3, [1.0, 0.1], None, True),
+    ])
+    out = compute_similar_events(data, top_k=5, radius_km=0, min_score=0.0)
+    assert [n for n, _ in out[1]] == [2, 3]
+    assert all(n != 1 for row in out.values() for n, _ in row)
+
+
+def test_radius_only_applies_when_both_are_located():
+    data = dataset([
+        (1, [1.0, 0.0], PARIS, True),
+        (2, [1.0, 0.01], LYON, True),   # ~390 km
+        (3, [1.0, 0.02], None, True),   # sans position: gardé
+    ])
+    out = compute_similar_events(data, top_k=5, radius_km=100, min_score=0.0)
+    assert [n for n, _ in out[1]] == [3]
+    assert {n for n, _ in out[3]} == {1, 2}
+
+
+def test_min_score_and_empty_inputs():
+    data = dataset([(1, [1.0, 0.0], None, True), (2, [0.0, 1.0], None, True)])
+    assert compute_similar_events(data, top_k=5, radius_km=0, min_score=0.5) == {}
+    assert compute_similar_events({"ids": np.empty(0, dtype=np.int32)}) == {}
+    data["upcoming"][:] = False
+    assert compute_similar_events(data, top_k=5, radius_km=0, min_score=0.0) == {}
+
+
+def test_blocks_match_single_pass(monkeypatch):
+    rng = np.random.default_rng(1)
+    rows = [(i, rng.normal(size=8).tolist(), None, bool(i % 3)) for i in range(1, 40)]
+    whole = compute_similar_events(dataset(rows), top_k=4, radius_km=0, min_score=-1.0)
+    monkeypatch.setattr(similar_events, "_BLOCK_SIZE", 5)
+    assert compute_similar_events(dataset(rows), top_k=4, radius_km=0, min_score=-1.0) == whole
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [({"lat": 1.5, "lon": 2.5}, (1.5, 2.5)), ([2.5, 1.5], (1.5, 2.5)), ("1.5,2.5", (1.5, 2.5))],
+)
+def test_parse_geo_formats(value, expected):
+    assert _parse_geo(value) == expected
+
+
+def test_parse_geo_and_day_missing():
+    assert all(np.isnan(_parse_geo(None)))
+    assert _parse_day(None) == -1 and _parse_day("bad") == -1
+    assert _parse_day("2026-10-19T20:00:00") == date(2026, 10, 19).toordinal()
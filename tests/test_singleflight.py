@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core import singleflight
+from app.core.singleflight import body_key, coalesce, coalesce_async
+
+
+@pytest.fixture(autouse=True)
+def shared(monkeypatch):
+    """Compte les appelants qui ont rejoint un appel en vol."""
+    joined = []
+    monkeypatch.setattr(singleflight, "SINGLEFLIGHT_ENABLED", True)
+    monkeypatch.setattr(singleflight, "incr", lambda name, n=1: name.endswith(".shared") and joined.append(name))
+    return joined
+
+
+def wait_for(predicate, timeout_s=5.0):
+    deadline = time.monotonic() + timeout_s
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_body_key_ignores_key_order():
+    assert body_key({"a": 1, "b": [1, 2]}) == body_key({"b": [1, 2], "a": 1})
+    assert body_key({"a": 1}) != body_key({"a": 2})
+
+
+def test_coalesce_runs_once_for_concurrent_callers(shared):
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {"hits": 3}
+
+    def call():
+        return coalesce("t", "same", work)
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(call) for _ in range(4)]
+        wait_for(lambda: len(shared) == 3)
+        release.set()
+        results = [f.result(5) for f in futures]
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert singleflight.singleflight_stats()["in_flight"] == 0
+
+
+def test_coalesce_fans_out_the_error_then_forgets_it(shared):
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("es down")
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(coalesce, "t", "err", failing) for _ in range(3)]
+        wait_for(lambda: len(shared) == 2)
+        release.set()
+        errors = [f.exception(5) for f in futures]
+
+    assert all(isinstance(e, ValueError) for e in errors)
+    # rien de gardé: l'appel suivant relance le travail
+    assert coalesce("t", "err", lambda: "ok") == "ok"
+
+
+def test_coalesce_disabled_calls_every_time(monkeypatch):
+    monkeypatch.setattr(singleflight, "SINGLEFLIGHT_ENABLED", False)
+    calls = []
+    coalesce("t", "k", lambda: calls.append(1))
+    coalesce("t", "k", lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_coalesce_async_shares_one_call():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return [1, 2]
+
+    async def main():
+        return await asyncio.gather(*(coalesce_async("t", "k", work) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1 and all(r == [1, 2] for r in results)
+    assert singleflight.singleflight_stats()["in_flight_async"] == 0
+
+
+def test_coalesce_async_leader_cancellation_spares_followers():
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(coalesce_async("t", "cancel", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(coalesce_async("t", "cancel", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_coalesce_async_fans_out_the_error():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("es down")
+
+    async def main():
+        results = await asyncio.gather(
+            *(coalesce_async("t", "err", failing) for _ in range(3)), return_exceptions=True
+        )
+        # rien de gardé après l'échec
+        again = await coalesce_async("t", "err", lambda: asyncio.sleep(0, result="ok"))
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert again == "ok"
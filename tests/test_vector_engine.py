@@ -0,0 +1,100 @@
+import os
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.api.v1.endpoints import recommendations
+from app.jobs.event_vector_snapshot import write_snapshot
+from app.services.vector_engine import VectorEngine
+
+NAN = float("nan")
+PARIS = {"lat": 48.8566, "lon": 2.3522}
+LYON = (45.764, 4.8357)
+TODAY = date.today().toordinal()
+
+
+def dataset(rows, max_published=None):
+    """rows: [(id, vecteur, (lat, lon) ou None, jour ordinal ou -1)] -> format de load_event_vectors"""
+    matrix = np.asarray([r[1] for r in rows], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    coords = np.radians(np.asarray([r[2] or (NAN, NAN) for r in rows], dtype=np.float64))
+    return {
+        "ids": np.asarray([r[0] for r in rows], dtype=np.int32),
+        "matrix": matrix,
+        "lat": coords[:, 0],
+        "lon": coords[:, 1],
+        "day": np.asarray([r[3] for r in rows], dtype=np.int32),
+        "max_published": max_published,
+    }
+
+
+@pytest.fixture
+def engine(tmp_path):
+    data = dataset([
+        (1, [1.0, 0.0, 0.0], (PARIS["lat"], PARIS["lon"]), TODAY + 3),
+        (2, [0.9, 0.1, 0.0], (PARIS["lat"], PARIS["lon"]), TODAY - 1),  # passé
+        (3, [0.8, 0.2, 0.0], LYON, -1),                                  # loin, sans date
+        (4, [0.0, 1.0, 0.0], None, TODAY),                               # sans position
+        (700, [1.0, 0.05, 0.0], (PARIS["lat"], PARIS["lon"]), TODAY),
+    ], max_published="2026-01-01")
+    written = write_snapshot(data, root=str(tmp_path))
+    return VectorEngine.load(os.path.join(str(tmp_path), written["version"]))
+
+
+def ids(found):
+    return [event_id for event_id, _ in found]
+
+
+def test_search_exact_cosine_order(engine):
+    found = engine.search([1.0, 0.0, 0.0], k=3)
+    assert ids(found) == [1, 700, 2]
+    assert found[0][1] == pytest.approx(1.0)
+    # vecteur non normalisé côté requête: même classement
+    assert ids(engine.search([5.0, 0.0, 0.0], k=3)) == [1, 700, 2]
+
+
+def test_search_prefilters(engine):
+    q = [1.0, 0.0, 0.0]
+    assert 700 not in ids(engine.search(q, k=10, id_lt=678))
+    # géo: hors rayon et sans position exclus (comme geo_distance côté ES)
+    assert ids(engine.search(q, k=10, geo=PARIS, radius_km=50)) == [1, 700, 2]
+    # date: passés exclus, sans date gardés
+    assert sorted(ids(engine.search(q, k=10, min_day=TODAY))) == [1, 3, 4, 700]
+
+
+def test_search_wrong_dims_returns_nothing(engine):
+    assert engine.search([1.0, 0.0], k=3) == []
+
+
+def test_add_events_replaces_base_and_delta_versions(engine):
+    # l'event 1 change de vecteur, 9 est nouveau
+    added = engine.add_events(dataset(
+        [(1, [0.0, 0.0, 1.0], None, -1), (9, [1.0, 0.0, 0.0], None, -1)],
+        max_published="2026-02-01",
+    ))
+    assert added == 2 and engine.max_published == "2026-02-01"
+    assert ids(engine.search([1.0, 0.0, 0.0], k=2)) == [9, 700]
+    assert ids(engine.search([0.0, 0.0, 1.0], k=1)) == [1]
+
+    # nouvelle version de 9 dans le delta: une seule occurrence
+    engine.add_events(dataset([(9, [0.0, 1.0, 0.0], None, -1)]))
+    found = ids(engine.search([0.0, 1.0, 0.0], k=10))
+    assert found.count(9) == 1 and found.count(1) == 1
+    assert engine.stats()["events"] == 6 and engine.stats()["delta"] == 2
+    assert engine.add_events({"ids": np.empty(0, dtype=np.int32)}) == 0
+
+
+def test_local_event_ids_excludes_past_events(monkeypatch):
+    calls = {}
+
+    class Engine:
+        def search(self, qvec, k, **filters):
+            calls.update(filters)
+            return [(5, 0.9)]
+
+    monkeypatch.setattr(recommendations, "get_vector_engine", lambda: Engine())
+    assert recommendations.local_event_ids([1.0], PARIS, 4) == [5]
+    assert calls["min_day"] == TODAY
+    assert calls["id_lt"] == recommendations.EVENT_ID_LT
+    assert calls["radius_km"] == recommendations.EVENTS_RADIUS_KM